@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+# balancesheet/agent_cache.py
+"""
+On-disk memo of agent results.
+
+An agent run is a pure function of (agent definition, input, documents it
+can search), and the filing documents under /Archives/edgar/ never change,
+so identical runs can return the previous `final_output` instead of another
+o3 round trip.  The key is a sha256 over
+
+    agent name, model, model settings, rendered instructions, output type,
+    tool names, input payload, and `doc_key`
+
+where `doc_key` is a content hash of the documents behind the agent's
+search tool (see docs_key).  The run date in the instructions (the update
+agent's "Today is ...") is masked: what an agent finds depends on the
+documents, which `doc_key` covers, not on the day it ran.
+
+Outputs are stored as JSON and re-validated against the agent's
+`output_type` on the way out, so a schema change in models.py turns old
+entries into misses instead of bad objects.
+
+Entries older than `ttl_days` are ignored and the least recently used
+entries are dropped once the cache exceeds `max_bytes`.
+"""
+
+import dataclasses
+import datetime as dt
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterable
+
+from pydantic import BaseModel
+
+from settings import CACHE_DIR
+
+_DEFAULT_PATH = os.path.join(CACHE_DIR, "agent_runs.sqlite")
+_DAY = 24 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (key         TEXT PRIMARY KEY,
+                                 agent       TEXT NOT NULL,
+                                 output      TEXT NOT NULL,
+                                 size        INTEGER NOT NULL,
+                                 created     REAL NOT NULL,
+                                 last_access REAL NOT NULL);
+"""
+
+
+def docs_key(digests: Iterable[str], variant: str = "") -> str:
+    """
+    Identity of a document set from the content digests of its filings
+    (vs_registry.document_set_key per filing, see tools.filing_digests)
+    plus `variant` (retrieval mode and preprocessing).
+    """
+    h = hashlib.sha256(variant.encode())
+    for digest in sorted(set(digests)):
+        h.update(digest.encode())
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def _settings_json(settings) -> Any:
+    if settings is None:
+        return None
+    if hasattr(settings, "to_json_dict"):
+        return settings.to_json_dict()
+    if dataclasses.is_dataclass(settings):
+        return dataclasses.asdict(settings)
+    return repr(settings)
+
+
+def _instructions_hash(instructions) -> str:
+    if callable(instructions):                # dynamic instructions: best effort
+        instructions = f"{instructions.__module__}.{instructions.__qualname__}"
+    text = str(instructions or "").replace(dt.date.today().isoformat(), "{today}")
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def run_key(agent, input, doc_key: str = "") -> str:
+    output_type = getattr(agent, "output_type", None)
+    parts = {
+        "agent":        agent.name,
+        "model":        str(getattr(agent, "model", None)),
+        "settings":     _settings_json(getattr(agent, "model_settings", None)),
+        "instructions": _instructions_hash(getattr(agent, "instructions", None)),
+        "output_type":  getattr(output_type, "__qualname__", str(output_type)),
+        "tools":        sorted(getattr(t, "name", type(t).__name__) for t in getattr(agent, "tools", []) or []),
+        "input":        input,
+        "docs":         doc_key,
+    }
+    blob = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+@dataclasses.dataclass
+class CachedRunResult:
+    """Stand-in for agents.RunResult on a cache hit; only final_output is set."""
+    final_output: Any
+    cached:       bool = True
+
+
+class AgentCache:
+    """SQLite-backed store of agent final outputs."""
+
+    def __init__(self, path: str | None = None, ttl_days: float = 30,
+                 max_bytes: int = 256 * 1024 ** 2):
+        self.path      = path or _DEFAULT_PATH
+        self.ttl_days  = ttl_days
+        self.max_bytes = max_bytes
+        self._lock     = threading.Lock()
+        self.hits = self.misses = self.stores = self.evictions = 0
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    # -- lookup / store -----------------------------------------------------
+
+    def get(self, key: str, output_type=None) -> CachedRunResult | None:
+        cutoff = time.time() - self.ttl_days * _DAY
+        with self._connect() as db:
+            row = db.execute("SELECT output, created FROM runs WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] >= cutoff:
+                db.execute("UPDATE runs SET last_access = ? WHERE key = ?", (time.time(), key))
+        output = None
+        if row is not None and row[1] >= cutoff:
+            try:
+                output = self._decode(row[0], output_type)
+            except Exception:                  # schema changed since it was stored
+                output = None
+        with self._lock:
+            if output is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return CachedRunResult(output) if output is not None else None
+
+    def put(self, key: str, agent_name: str, final_output: Any) -> None:
+        payload = self._encode(final_output)
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                       (key, agent_name, payload, len(payload), now, now))
+        with self._lock:
+            self.stores += 1
+        self._evict()
+
+    @staticmethod
+    def _encode(output: Any) -> str:
+        if isinstance(output, BaseModel):
+            return output.model_dump_json()
+        return json.dumps(output)
+
+    @staticmethod
+    def _decode(payload: str, output_type) -> Any:
+        if isinstance(output_type, type) and issubclass(output_type, BaseModel):
+            return output_type.model_validate_json(payload)
+        return json.loads(payload)
+
+    def _evict(self) -> None:
+        cutoff = time.time() - self.ttl_days * _DAY
+        with self._connect() as db:
+            expired = db.execute("DELETE FROM runs WHERE created < ?", (cutoff,)).rowcount
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM runs").fetchone()[0]
+            dropped = 0
+            if total > self.max_bytes:
+                target = int(self.max_bytes * 0.9)
+                for key, size in db.execute(
+                        "SELECT key, size FROM runs ORDER BY last_access").fetchall():
+                    if total <= target:
+                        break
+                    db.execute("DELETE FROM runs WHERE key = ?", (key,))
+                    total -= size
+                    dropped += 1
+        with self._lock:
+            self.evictions += expired + dropped
+
+    def clear(self) -> None:
+        with self._connect() as db:
+            db.execute("DELETE FROM runs")
+
+    # -- stats --------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits":      self.hits,
+                "misses":    self.misses,
+                "stores":    self.stores,
+                "evictions": self.evictions,
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        looked_up = s["hits"] + s["misses"]
+        rate = s["hits"] / looked_up if looked_up else 0.0
+        return (f"Agent cache: {s['hits']} hits / {s['misses']} misses ({rate:.0%}), "
+                f"{s['stores']} stored, {s['evictions']} evicted")
@@ -13,7 +13,8 @@ the updated sheet.
 
 from __future__ import annotations
 
-from typing import List
+import asyncio
+from typing import Awaitable, Callable, Dict, List
 from models import (
     FullBalanceSheet,
     BalanceSheetLine,
@@ -23,10 +24,14 @@ from models import (
     FailedChange,
     SectionTable,
 )
+from validation import check_delta, resolve_line_item, summarize_problems
+
+# reprice(change, problems) -> the change with a corrected delta
+Repricer = Callable[[FilingChange, List[str]], Awaitable[FilingChange]]
 
 
 def _apply_line(section: SectionTable, line_item: str, delta_value: float) -> None:
-    line = next((l for l in section.lines if l.line_item == line_item), None)
+    line = resolve_line_item(section, line_item)
     if line:
         line.value = (line.value or 0.0) + delta_value
     else:
@@ -42,20 +47,98 @@ def _apply_delta(bs: FullBalanceSheet, delta: BalanceSheetDelta) -> None:
         _apply_line(bs.equity, entry.line_item, entry.value)
 
 
+def _validate(initial: FullBalanceSheet, changes: List[FilingChange]) -> Dict[int, List[str]]:
+    """Problems per change index, each delta checked against the sheet it lands on."""
+    bs = initial.model_copy(deep=True)
+    problems: Dict[int, List[str]] = {}
+    for i, change in enumerate(changes):
+        if change.delta is None:
+            problems[i] = ["accountant returned no delta"]
+            continue
+        found = check_delta(change.delta, bs)
+        if found:
+            problems[i] = found
+        else:
+            _apply_delta(bs, change.delta)
+    return problems
+
+
+async def _repair(
+    initial: FullBalanceSheet,
+    changes: List[FilingChange],
+    reprice: Repricer,
+    max_attempts: int,
+    write: Callable[[str], None] | None = None,
+) -> tuple[List[FilingChange], Dict[int, List[str]], Dict[int, int]]:
+    """
+    Re-prices the failing changes, all of them concurrently, in up to
+    `max_attempts` rounds; each round re-validates the whole sequence (a
+    fixed change can move the sheet under a later one), with progress
+    notes to `write(message)`.  Returns the current changes, what still
+    fails and the attempts spent per change.
+    """
+    current  = list(changes)
+    problems = _validate(initial, current)
+    attempts: Dict[int, int] = {}
+    note = write or (lambda message: None)
+    for round_ in range(1, max_attempts + 1):
+        if not problems:
+            break
+        failing = sorted(problems)
+        note(f"Repair round {round_}: re-pricing {len(failing)} change(s) that failed validation")
+        fixes = await asyncio.gather(*(reprice(current[i], problems[i]) for i in failing),
+                                     return_exceptions=True)
+        for i, fix in zip(failing, fixes):
+            attempts[i] = attempts.get(i, 0) + 1
+            if isinstance(fix, BaseException):
+                note(f"Repair of {current[i].update_log!r} failed: {type(fix).__name__}: {fix}")
+            elif fix.delta is not None:
+                current[i] = fix
+        problems = _validate(initial, current)
+    if attempts:
+        fixed = sum(1 for i in attempts if i not in problems)
+        note(f"Repair: {fixed}/{len(attempts)} change(s) fixed in "
+             f"{sum(attempts.values())} accountant run(s)")
+    return current, problems, attempts
+
+
 async def apply_updates(
     initial: FullBalanceSheet,
     summary: UpdateSummary,
+    reprice: Repricer | None = None,
+    max_repair_attempts: int = 2,
+    write: Callable[[str], None] | None = None,
 ) -> FullBalanceSheet:
     """Apply each FilingChange sequentially verifying that each delta balances.
 
-    Any change whose delta causes an imbalance is recorded on ``bs.update_errors``.
+    Every delta is checked against the sheet it is applied to
+    (validation.check_delta: balanced, line items resolvable, no asset or
+    liability driven negative).  With `reprice`, only the failing changes
+    are sent back to the accountant with their problems, for at most
+    `max_repair_attempts` rounds, reporting progress to `write(message)`.
+    Any change that still fails is skipped and recorded on
+    ``bs.update_errors``, with the last repair attempt in ``attempted_fix``.
     """
 
+    changes = sorted(summary.changes, key=lambda c: c.date)
+    if reprice is not None:
+        current, problems, attempts = await _repair(initial, changes, reprice, max_repair_attempts,
+                                                    write)
+    else:
+        current, problems, attempts = changes, _validate(initial, changes), {}
+
     bs = initial.model_copy(deep=True)
     failed: List[FailedChange] = []
     applied: List[FilingChange] = []
 
-    for change in sorted(summary.changes, key=lambda c: c.date):
+    for i, change in enumerate(current):
+        if i in problems:
+            failed.append(FailedChange(
+                change=changes[i],
+                attempted_fix=change if attempts.get(i) and change is not changes[i] else None,
+                reason=summarize_problems(problems[i]),
+            ))
+            continue
         _apply_delta(bs, change.delta)
         applied.append(change)
 
@@ -63,4 +146,4 @@ async def apply_updates(
     bs.shares_outstanding_preferred = summary.total_preferred_shares
     bs.update_errors = failed or None
     bs.applied_updates = applied or None
-    return bs
\ No newline at end of file
+    return bs
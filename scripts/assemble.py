@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+# balancesheet/assemble.py
+"""
+Deterministic replacement for the o3 assembler agent.
+
+Merging the three SectionTables into a FullBalanceSheet is bookkeeping,
+not reasoning: copy the tables, check each reported section subtotal
+against the sum of its lines, and check Assets = Liabilities + Equity.
+Every failed check becomes an AssemblyDiagnostic on the sheet, and an
+imbalance is carried as an "Imbalance detected" equity line exactly as the
+agent prompt (my_agents/assembler.py) asked for, so downstream code sees
+the same shape either way.
+
+Figures rounded in the filing (inline-XBRL decimals="-3": to the
+thousand) are compared with rounding_tolerance, the rule xbrl.py also
+validates with, so a sheet the XBRL fast path accepts assembles without
+diagnostics.
+"""
+
+from typing import List, Sequence
+
+from models import AssemblyDiagnostic, BalanceSheetLine, FullBalanceSheet, SectionTable
+
+IMBALANCE_LINE = "Imbalance detected"
+TOLERANCE = 0.01
+_SECTIONS = ("assets", "liabilities", "equity")
+
+
+def _check_label(table: SectionTable, section: str, out: List[AssemblyDiagnostic]) -> SectionTable:
+    if table.section == section:
+        return table
+    out.append(AssemblyDiagnostic(
+        check="section_label",
+        section=section,
+        message=f"table passed as {section} was labelled {table.section!r}; relabelled",
+    ))
+    return table.model_copy(update={"section": section})
+
+
+def rounding_tolerance(figures: int, rounding: float = 0.0, tolerance: float = TOLERANCE) -> float:
+    """
+    Largest gap allowed between two sides of a check that together add up
+    `figures` numbers, each rounded to `rounding` (1000 for figures in
+    thousands) and so off by up to half of it; never below `tolerance`.
+    """
+    return max(tolerance, rounding / 2 * figures)
+
+
+def _check_subtotal(table: SectionTable, tolerance: float, rounding: float,
+                    out: List[AssemblyDiagnostic]) -> None:
+    if table.subtotal is None:
+        return
+    diff = table.subtotal - table.total
+    if abs(diff) > rounding_tolerance(len(table.lines) + 1, rounding, tolerance):
+        out.append(AssemblyDiagnostic(
+            check="section_subtotal",
+            section=table.section,
+            expected=table.subtotal,
+            actual=table.total,
+            difference=diff,
+            message=(f"reported total {table.section} {table.subtotal:,.0f} != "
+                     f"sum of lines {table.total:,.0f} (off by {diff:,.0f})"),
+        ))
+
+
+def check_tables(tables: Sequence[SectionTable], tolerance: float = TOLERANCE,
+                 rounding: float = 0.0) -> List[AssemblyDiagnostic]:
+    """Subtotal checks of the assets, liabilities and equity tables, then the balance."""
+    out: List[AssemblyDiagnostic] = []
+    for t in tables:
+        _check_subtotal(t, tolerance, rounding, out)
+    assets, liabilities, equity = (t.total for t in tables)
+    diff = assets - (liabilities + equity)
+    if abs(diff) > rounding_tolerance(sum(len(t.lines) for t in tables), rounding, tolerance):
+        out.append(AssemblyDiagnostic(
+            check="balance",
+            expected=assets,
+            actual=liabilities + equity,
+            difference=diff,
+            message=(f"assets {assets:,.0f} != liabilities + equity "
+                     f"{liabilities + equity:,.0f} (off by {diff:,.0f})"),
+        ))
+    return out
+
+
+def assemble_balance_sheet(
+        company_name: str,
+        cik: str,
+        filing_date: str,
+        period_end: str | None,
+        assets: SectionTable,
+        liabilities: SectionTable,
+        equity: SectionTable,
+        tolerance: float = TOLERANCE,
+        rounding: float = 0.0,
+) -> FullBalanceSheet:
+    """
+    Builds the FullBalanceSheet from the three section tables (copied, never
+    mutated).  `diagnostics` is None when every check passes.  `rounding`
+    is how coarsely the filing rounds its figures (see rounding_tolerance).
+    """
+    diagnostics: List[AssemblyDiagnostic] = []
+    tables = [
+        _check_label(t.model_copy(deep=True), section, diagnostics)
+        for t, section in zip((assets, liabilities, equity), _SECTIONS)
+    ]
+    diagnostics.extend(check_tables(tables, tolerance, rounding))
+
+    sheet = FullBalanceSheet(
+        company_name=company_name,
+        cik=str(cik),
+        filing_date=filing_date,
+        period_end=period_end,
+        tables=tables,
+    )
+
+    imbalance = next((d for d in diagnostics if d.check == "balance"), None)
+    if imbalance is not None:
+        sheet.equity.lines.append(BalanceSheetLine(line_item=IMBALANCE_LINE, value=imbalance.difference))
+
+    sheet.diagnostics = diagnostics or None
+    return sheet
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+# balancesheet/batch.py
+"""
+Many filings, one event loop.
+
+`run_batch` runs `orchestrator.build_balance_sheet` for a list of
+(cik, index_url) pairs concurrently, all sharing the same EdgarCache
+client, OpenAI client and vector-store registry.  Three knobs bound the
+load:
+
+    max_filings  pipelines in flight at once
+    agent_runs   Runner.run calls in flight across all pipelines
+    uploads      vector-store uploads in flight across all pipelines
+
+(the last two are the process-wide caps in runner.py).  A failing filing
+never stops the batch; every filing gets a BatchResult with either the two
+balance sheets or the error.
+"""
+
+import asyncio
+import json
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Tuple
+
+from orchestrator import build_balance_sheet
+from runner import set_concurrency
+
+
+@dataclass
+class BatchResult:
+    cik:       int
+    index_url: str
+    initial:   Any = None          # FullBalanceSheet
+    updated:   Any = None          # pro forma FullBalanceSheet
+    error:     str | None = None
+    detail:    str | None = None   # traceback
+    elapsed:   float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def degraded(self) -> bool:
+        """Built, but the pro forma is missing the subsequent updates."""
+        return self.ok and getattr(self.updated, "update_status", None) not in (None, "ok")
+
+
+def load_filings(path: str) -> List[Tuple[int, str]]:
+    """
+    Reads a batch file: either {"<cik>": "<index_url>", ...} or a list of
+    {"cik": ..., "index_url": ...} objects.
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [(int(cik), url) for cik, url in data.items()]
+    return [(int(item["cik"]), item["index_url"]) for item in data]
+
+
+async def run_batch(
+        filings: Iterable[Tuple[int, str]],
+        ec,
+        openai_client=None,
+        registry=None,
+        max_filings: int = 4,
+        agent_runs: int | None = None,
+        uploads: int | None = None,
+        on_result=None,
+        **options,
+) -> List[BatchResult]:
+    """
+    Builds every filing and returns the results in input order.
+    `on_result(result)` is called as each filing finishes; `options` go to
+    build_balance_sheet unchanged.
+    """
+    set_concurrency(agent_runs=agent_runs, uploads=uploads)
+    filings = list(filings)
+    slots   = asyncio.Semaphore(max_filings)
+
+    async def one(cik: int, url: str) -> BatchResult:
+        async with slots:
+            start  = time.perf_counter()
+            result = BatchResult(cik, url)
+            try:
+                result.initial, result.updated = await build_balance_sheet(
+                    cik, url, ec, openai_client=openai_client, registry=registry, **options
+                )
+            except Exception as exc:
+                result.error  = f"{type(exc).__name__}: {exc}"
+                result.detail = traceback.format_exc()
+            result.elapsed = time.perf_counter() - start
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    return list(await asyncio.gather(*(one(cik, url) for cik, url in filings)))
+
+
+def format_report(results: Iterable[BatchResult]) -> str:
+    results = list(results)
+    lines   = []
+    for r in results:
+        status = "FAILED" if not r.ok else "DEGR. " if r.degraded else "OK    "
+        line   = f"{status} {r.cik:>10}  {r.elapsed:7.1f}s  {r.index_url}"
+        if not r.ok:
+            line += f"\n       -> {r.error}"
+        elif r.degraded:
+            line += f"\n       -> no updates ({r.updated.update_status}): {r.updated.update_error}"
+        lines.append(line)
+    failed   = sum(not r.ok for r in results)
+    degraded = sum(r.degraded for r in results)
+    lines.append(f"{len(results) - failed}/{len(results)} filings succeeded"
+                 + (f", {degraded} without subsequent updates" if degraded else ""))
+    return "\n".join(lines)
+
+
+def write_report(results: Iterable[BatchResult], path: str) -> None:
+    """JSON report: one entry per filing with status, timing and both sheets."""
+    out = []
+    for r in results:
+        out.append({
+            "cik":       r.cik,
+            "index_url": r.index_url,
+            "ok":        r.ok,
+            "elapsed":   round(r.elapsed, 2),
+            "error":     r.error,
+            "detail":    r.detail,
+            "initial":   r.initial.model_dump(mode="json") if r.initial is not None else None,
+            "updated":   r.updated.model_dump(mode="json") if r.updated is not None else None,
+        })
+    with open(path, "w") as f:
+        json.dump(out, f, indent=2)
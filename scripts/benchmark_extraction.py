@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+# balancesheet/benchmark_extraction.py
+"""
+Benchmark: three section agents in parallel vs one combined agent.
+
+For every filing the base-filing retriever (vector store or local index) is
+built once and shared by both modes, then each mode runs `--repeat` times.
+Recorded per run:
+
+    seconds   wall time of the extraction call(s)
+    tokens    total tokens over all agent runs of the mode
+    searches  hosted file-search calls
+    recall    share of the inline-XBRL statement's line values found in
+              the extracted lines (ground truth from xbrl.py; blank when
+              the filing has no usable inline XBRL)
+    total_err largest |extracted - XBRL| section total, in USD
+    balanced  whether the assembled sheet balances
+
+Agent caching is off so every run is a real call.
+
+Usage
+-----
+python benchmark_extraction.py filings.json --repeat 2 --out bench.json
+python benchmark_extraction.py filings.json --modes combined --retrieval local
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import Dict, List, Tuple
+
+from tabulate import tabulate
+
+from EdgarCache.Client.Client import Client as EC
+from models import BalanceSheetLine, SectionTable
+from assemble import assemble_balance_sheet
+from batch import load_filings
+from doc_cache import CachedEdgarClient
+from orchestrator import load_filing, make_tool
+from runner import run_agent, usage_of
+from tools import ThreadLocalEdgarClient, create_local_index, create_vector_store
+from vs_registry import VectorStoreRegistry
+from xbrl import XbrlBalanceSheet, XbrlExtractionError, extract_from_filing
+from my_agents import (
+    make_assets_agent,
+    make_liabilities_agent,
+    make_equity_agent,
+    make_combined_section_agent,
+)
+
+PROMPT = "Return the most recent balance sheet."
+MODES  = ("llm", "combined")
+
+
+@dataclass
+class BenchRun:
+    cik:       int
+    mode:      str
+    repeat:    int
+    seconds:   float = 0.0
+    tokens:    int = 0
+    searches:  int = 0
+    recall:    float | None = None
+    total_err: float | None = None
+    balanced:  bool | None = None
+    error:     str | None = None
+
+
+# ---------------------------------------------------------------------------
+# 1. The two modes, returning tables + summed usage
+# ---------------------------------------------------------------------------
+
+def _add_usage(total: dict, result) -> None:
+    for key, value in usage_of(result).items():
+        total[key] = total.get(key, 0) + (value or 0)
+
+
+async def run_fanout(tool) -> Tuple[Tuple[SectionTable, ...], dict]:
+    agents = [make_assets_agent(tool), make_liabilities_agent(tool), make_equity_agent(tool)]
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(run_agent(a, PROMPT)) for a in agents]
+    usage: dict = {}
+    for t in tasks:
+        _add_usage(usage, t.result())
+    return tuple(t.result().final_output for t in tasks), usage
+
+
+async def run_combined(tool) -> Tuple[Tuple[SectionTable, ...], dict]:
+    result = await run_agent(make_combined_section_agent(tool), PROMPT)
+    usage: dict = {}
+    _add_usage(usage, result)
+    s = result.final_output
+    return (s.assets, s.liabilities, s.equity), usage
+
+
+_RUNNERS = {"llm": run_fanout, "combined": run_combined}
+
+
+# ---------------------------------------------------------------------------
+# 2. Accuracy against the inline-XBRL statement
+# ---------------------------------------------------------------------------
+
+def _values(lines: List[BalanceSheetLine]) -> List[float]:
+    out = []
+    for ln in lines:
+        out.append(ln.value)
+        if ln.components:
+            out.extend(_values(ln.components))
+    return out
+
+
+def _matches(a: float, b: float) -> bool:
+    # statements in thousands round to the nearest $1,000 once scaled
+    return abs(a - b) <= max(1000.0, 0.001 * abs(b))
+
+
+def score(tables: Tuple[SectionTable, ...], truth: XbrlBalanceSheet) -> Tuple[float, float]:
+    """(value recall, worst section-total error) of `tables` vs the XBRL sheet."""
+    found = total = 0
+    worst = 0.0
+    for got, want in zip(tables, truth.tables):
+        got_values = _values(got.lines)
+        for v in _values(want.lines):
+            total += 1
+            found += any(_matches(g, v) for g in got_values)
+        got_total  = got.subtotal if got.subtotal is not None else got.total
+        want_total = want.subtotal if want.subtotal is not None else want.total
+        worst = max(worst, abs(got_total - want_total))
+    return (found / total if total else 0.0), worst
+
+
+# ---------------------------------------------------------------------------
+# 3. Driver
+# ---------------------------------------------------------------------------
+
+def _build_retriever(ec, cik, doc_urls, retrieval: str, registry):
+    if retrieval == "local":
+        return create_local_index(ec, doc_urls)
+    return create_vector_store(ec, name=f"{cik}_10Q_vector", urls=doc_urls,
+                               registry=registry, preprocess=True).id
+
+
+async def bench_filing(ec, cik: int, index_url: str, modes, repeat: int,
+                       retrieval: str, registry) -> List[BenchRun]:
+    filing    = await asyncio.to_thread(load_filing, ec, cik, index_url)
+    retriever = await asyncio.to_thread(_build_retriever, ec, cik, filing["doc_urls"],
+                                        retrieval, registry)
+    try:
+        truth = await asyncio.to_thread(extract_from_filing, ec, filing["doc_urls"])
+    except XbrlExtractionError:
+        truth = None
+
+    runs = []
+    for i in range(repeat):
+        for mode in modes:
+            run = BenchRun(cik, mode, i)
+            start = time.perf_counter()
+            try:
+                tables, usage = await _RUNNERS[mode](make_tool(retriever))
+            except Exception as exc:
+                run.error = f"{type(exc).__name__}: {exc}"
+            else:
+                run.seconds  = time.perf_counter() - start
+                run.tokens   = usage.get("total_tokens", 0)
+                run.searches = usage.get("file_search_calls", 0)
+                run.balanced = assemble_balance_sheet(
+                    filing["company_name"], str(cik), filing["filing_date"],
+                    filing["period_end"], *tables).diagnostics is None
+                if truth is not None:
+                    run.recall, run.total_err = score(tables, truth)
+            runs.append(run)
+    return runs
+
+
+def summarize(runs: List[BenchRun]) -> str:
+    by_mode: Dict[str, List[BenchRun]] = {}
+    for r in runs:
+        by_mode.setdefault(r.mode, []).append(r)
+    rows = []
+    for mode, rs in by_mode.items():
+        ok      = [r for r in rs if r.error is None]
+        scored  = [r.recall for r in ok if r.recall is not None]
+        rows.append([
+            mode, len(rs), len(rs) - len(ok),
+            f"{statistics.median(r.seconds for r in ok):.1f}" if ok else "",
+            f"{statistics.mean(r.tokens for r in ok):,.0f}" if ok else "",
+            f"{statistics.mean(r.searches for r in ok):.1f}" if ok else "",
+            f"{statistics.mean(scored):.1%}" if scored else "",
+            f"{sum(bool(r.balanced) for r in ok)}/{len(ok)}",
+        ])
+    return tabulate(rows, headers=["Mode", "Runs", "Errors", "Median s", "Mean tokens",
+                                   "Mean searches", "Mean recall", "Balanced"],
+                    tablefmt="github")
+
+
+async def main(args: argparse.Namespace) -> None:
+    ec = CachedEdgarClient(ThreadLocalEdgarClient(partial(EC, args.ec_host, args.ec_port)))
+    registry = VectorStoreRegistry()
+    runs: List[BenchRun] = []
+    for cik, url in load_filings(args.filings):
+        try:
+            filing_runs = await bench_filing(ec, cik, url, args.modes, args.repeat,
+                                             args.retrieval, registry)
+        except Exception as exc:
+            print(f"❌ {cik} setup failed → {exc}")
+            continue
+        for r in filing_runs:
+            status = r.error or (f"{r.seconds:.1f}s {r.tokens:,} tokens"
+                                 + (f", recall {r.recall:.0%}" if r.recall is not None else ""))
+            print(f"{cik} {r.mode:<8} #{r.repeat}: {status}")
+        runs.extend(filing_runs)
+
+    print()
+    print(summarize(runs))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump([asdict(r) for r in runs], f, indent=2)
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog="benchmark_extraction")
+    p.add_argument("filings", help='JSON file: {"cik": "index_url", ...}')
+    p.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    p.add_argument("--repeat", type=int, default=1)
+    p.add_argument("--retrieval", choices=["hosted", "local"], default="hosted")
+    p.add_argument("--out", help="write every run as JSON here")
+    p.add_argument("--ec-host", default="ny4-35.bluefintrading.com")
+    p.add_argument("--ec-port", type=int, default=8361)
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
@@ -77,17 +77,34 @@ This file can now be:
 2. Run from the shell exactly like before:
        python build_balance_sheet.py 1849635 <url>
 
+3. Run a whole batch in one event loop:
+       python build_balance_sheet.py --batch filings.json --report out.json
+
+4. Consumed as a stream of progress events (see events.py):
+       async for event in stream_balance_sheet_async(1849635, some_url):
+           render_event(event)
+
 ---------------------------------------------------------------------
 """
 
 import asyncio
 import argparse
-from typing import Any
+from functools import partial
+from typing import Any, AsyncIterator
 
 from EdgarCache.Client.Client import Client as EC
 from orchestrator import build_balance_sheet as _orchestrator_build_balance_sheet
+from orchestrator import stream_balance_sheet as _orchestrator_stream_balance_sheet
+from orchestrator import BuildOptions
+from events import BuildEvent
+from vs_registry import VectorStoreRegistry
+from doc_cache import CachedEdgarClient
+from tools import ThreadLocalEdgarClient
+from agent_cache import AgentCache
+from batch import BatchResult, run_batch, load_filings, format_report, write_report
+from settings import get_openai_client
 import pprint as pprint
-from pretty import pretty_print
+from pretty import pretty_print, render_event
 
 ###############################################################################
 # 1. Low-level async “library” function
@@ -97,6 +114,10 @@ async def build_balance_sheet_async(
     index_url: str,
     ec_host: str = "ny4-35.bluefintrading.com",
     ec_port: int = 8361,
+    reuse_vector_stores: bool = False,
+    disk_cache: bool = False,
+    cache_agents: bool = False,
+    **options,
 ) -> Any:
     """
     The core coroutine that does the actual work.
@@ -109,14 +130,57 @@ async def build_balance_sheet_async(
         SEC index.html URL (10-K / 10-Q filing).
     ec_host, ec_port : str | int
         Where your in-house EDGAR-cache service lives.
+    reuse_vector_stores : bool
+        Reuse vector stores from earlier runs over identical documents
+        (see vs_registry.VectorStoreRegistry).
+    disk_cache : bool
+        Serve SEC archive documents from the local disk cache
+        (see doc_cache.CachedEdgarClient).
+    cache_agents : bool
+        Memoize agent runs on disk (see agent_cache.AgentCache); pick the
+        stages with `cache_stages=...`.
+    **options
+        Passed through to `orchestrator.build_balance_sheet`: an
+        `options=BuildOptions(...)` and/or single fields of it
+        (e.g. retrieval="local", preprocess=True).
 
     Returns
     -------
     Any   # whatever `orchestrator.build_balance_sheet` returns
     """
     print("Running async")
-    ec = EC(ec_host, ec_port)          # you can also `async with EC(...)`
-    return await _orchestrator_build_balance_sheet(cik, index_url, ec)
+    ec = ThreadLocalEdgarClient(partial(EC, ec_host, ec_port))
+    if disk_cache:
+        ec = CachedEdgarClient(ec)
+    registry = VectorStoreRegistry() if reuse_vector_stores else None
+    agent_cache = AgentCache() if cache_agents else None
+    return await _orchestrator_build_balance_sheet(cik, index_url, ec, registry=registry,
+                                                   agent_cache=agent_cache, **options)
+
+
+async def stream_balance_sheet_async(
+    cik: int,
+    index_url: str,
+    ec_host: str = "ny4-35.bluefintrading.com",
+    ec_port: int = 8361,
+    reuse_vector_stores: bool = False,
+    disk_cache: bool = False,
+    cache_agents: bool = False,
+    **options,
+) -> AsyncIterator[BuildEvent]:
+    """
+    Same as `build_balance_sheet_async`, but yields the progress events of
+    `orchestrator.stream_balance_sheet`; the last one (ProFormaReady)
+    carries both balance sheets.
+    """
+    ec = ThreadLocalEdgarClient(partial(EC, ec_host, ec_port))
+    if disk_cache:
+        ec = CachedEdgarClient(ec)
+    registry = VectorStoreRegistry() if reuse_vector_stores else None
+    agent_cache = AgentCache() if cache_agents else None
+    async for event in _orchestrator_stream_balance_sheet(cik, index_url, ec, registry=registry,
+                                                          agent_cache=agent_cache, **options):
+        yield event
 
 
 ###############################################################################
@@ -128,6 +192,7 @@ def get_balance_sheet(
     ec_host: str = "ny4-35.bluefintrading.com",
     ec_port: int = 8361,
     pretty: bool = False,
+    **options,
 ):
     """
     Synchronous helper around `build_balance_sheet_async`.
@@ -138,7 +203,7 @@ def get_balance_sheet(
     >>> bs = get_balance_sheet(1849635, some_url, pretty=True)
     """
     result = asyncio.run(
-        build_balance_sheet_async(cik, index_url)
+        build_balance_sheet_async(cik, index_url, ec_host, ec_port, **options)
     )
     if pretty:
         pretty_print(result)
@@ -146,19 +211,198 @@ def get_balance_sheet(
 
 
 ###############################################################################
-# 3. CLI wrapper (argparse) – unchanged behaviour
+# 3. Batch mode – many filings, one event loop, shared clients
 ###############################################################################
+async def build_balance_sheets_async(
+    filings,
+    ec_host: str = "ny4-35.bluefintrading.com",
+    ec_port: int = 8361,
+    reuse_vector_stores: bool = False,
+    disk_cache: bool = False,
+    cache_agents: bool = False,
+    max_filings: int = 4,
+    agent_runs: int = 8,
+    uploads: int = 4,
+    on_result=None,
+    **options,
+) -> list[BatchResult]:
+    """
+    Runs `filings` (iterable of (cik, index_url) pairs, or a {cik: url}
+    dict) concurrently with one EdgarCache connection, one OpenAI client
+    and one vector-store registry.  See batch.run_batch for the limits.
+    """
+    if isinstance(filings, dict):
+        filings = list(filings.items())
+    ec = ThreadLocalEdgarClient(partial(EC, ec_host, ec_port))
+    if disk_cache:
+        ec = CachedEdgarClient(ec)
+    registry = VectorStoreRegistry() if reuse_vector_stores else None
+    return await run_batch(
+        filings, ec,
+        openai_client=get_openai_client(),
+        registry=registry,
+        agent_cache=AgentCache() if cache_agents else None,
+        max_filings=max_filings,
+        agent_runs=agent_runs,
+        uploads=uploads,
+        on_result=on_result,
+        **options,
+    )
+
+
+def get_balance_sheets(filings, **kwargs) -> list[BatchResult]:
+    """
+    Synchronous helper around `build_balance_sheets_async`.
+
+    Example
+    -------
+    >>> results = get_balance_sheets({1849635: url_a, 1687542: url_b}, max_filings=8)
+    >>> print(format_report(results))
+    """
+    return asyncio.run(build_balance_sheets_async(filings, **kwargs))
+
+
+###############################################################################
+# 4. CLI wrapper (argparse) – unchanged behaviour
+###############################################################################
+def _stage_timeouts(items: list[str]) -> dict[str, float] | None:
+    """["updates=300", "deltas=120"] -> {"updates": 300.0, "deltas": 120.0}"""
+    out = {}
+    for item in items:
+        name, sep, seconds = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--stage-timeout expects STAGE=SECONDS, got {item!r}")
+        out[name.strip()] = float(seconds)
+    return out or None
+
+
 def _parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(prog="build_balance_sheet")
-    p.add_argument("cik", type=int, help="CIK of the company")
-    p.add_argument("index_url", help="10-Q / 10-K index.html URL on sec.gov")
-    return p.parse_args()
+    p.add_argument("cik", type=int, nargs="?", help="CIK of the company")
+    p.add_argument("index_url", nargs="?", help="10-Q / 10-K index.html URL on sec.gov")
+    p.add_argument("--assembler", choices=["python", "llm"], default="llm",
+                   help="python: deterministic assembly with diagnostics; llm: the o3 assembler agent")
+    p.add_argument("--preprocess", action="store_true",
+                   help="upload compact markdown instead of raw filing HTML")
+    p.add_argument("--incremental-updates", action="store_true",
+                   help="keep one subsequent-filings vector store per CIK and upload only new filings")
+    p.add_argument("--cover-shares", action="store_true",
+                   help="take share counts from the latest dei cover page instead of the update agent")
+    p.add_argument("--trace-dir", metavar="DIR",
+                   help="write per-run span traces (JSONL + Chrome trace format) here")
+    p.add_argument("--profile", metavar="STAGE", action="append", default=[],
+                   help="run this pipeline stage under cProfile (repeatable; needs --trace-dir)")
+    p.add_argument("--cascade", action="store_true",
+                   help="try a faster model tier first, escalate only when validation fails")
+    p.add_argument("--hedge", action="store_true",
+                   help="duplicate agent runs that outlast their stage's p95 latency")
+    p.add_argument("--deadline", type=float, metavar="SECONDS",
+                   help="time budget per filing; past it the pro forma comes back without updates")
+    p.add_argument("--stage-timeout", action="append", default=[], metavar="STAGE=SECONDS",
+                   help="time budget for one stage (repeatable), e.g. updates=300")
+    p.add_argument("--update-shard-size", type=int, default=1, metavar="N",
+                   help="subsequent filings per update agent (0: one agent for all)")
+    p.add_argument("--update-concurrency", type=int, default=8,
+                   help="update agents in flight at once per filing")
+    p.add_argument("--accountant-batch-size", type=int, default=1, metavar="N",
+                   help="changes priced per accountant run")
+    p.add_argument("--accountant-concurrency", type=int, default=8,
+                   help="accountant runs in flight at once per filing")
+    p.add_argument("--pipeline-pricing", action="store_true",
+                   help="price each change while the update scan is still running")
+    p.add_argument("--repair-attempts", type=int, default=2, metavar="N",
+                   help="rounds of re-pricing deltas that fail validation (0: skip them)")
+    p.add_argument("--section-repair-attempts", type=int, default=2, metavar="N",
+                   help="rounds of re-extracting section tables that fail validation")
+    p.add_argument("--agent-cache", action="store_true",
+                   help="reuse the output of identical earlier agent runs")
+    p.add_argument("--disk-cache", action="store_true",
+                   help="serve SEC archive documents from the local disk cache")
+    p.add_argument("--reuse-vector-stores", action="store_true",
+                   help="reuse vector stores uploaded by earlier runs over the same documents")
+    p.add_argument("--checkpoint", action="store_true",
+                   help="save every stage's output so a failed run can be resumed")
+    p.add_argument("--resume", action="store_true",
+                   help="reuse the stages a previous run of the same filing already finished "
+                        "(implies --checkpoint)")
+    p.add_argument("--batch", metavar="FILE",
+                   help='JSON file of filings: {"cik": "index_url", ...} or [{"cik":..., "index_url":...}]')
+    p.add_argument("--report", metavar="FILE", help="batch mode: write a JSON report here")
+    p.add_argument("--max-filings", type=int, default=4,
+                   help="batch mode: filings processed at the same time")
+    p.add_argument("--agent-runs", type=int, default=8,
+                   help="batch mode: agent runs in flight across all filings")
+    p.add_argument("--uploads", type=int, default=4,
+                   help="batch mode: vector-store uploads in flight across all filings")
+    p.add_argument("--retrieval", choices=["hosted", "local"], default="hosted",
+                   help="hosted OpenAI vector stores or the in-process BM25 index")
+    p.add_argument("--extraction", choices=["llm", "combined", "xbrl"], default="llm",
+                   help="llm: three section agents; combined: one agent for all sections; "
+                        "xbrl: read the statement from inline XBRL, agents only as fallback")
+    args = p.parse_args()
+    if not args.batch and (args.cik is None or args.index_url is None):
+        p.error("cik and index_url are required unless --batch is given")
+    return args
+
+
+def _build_options(args: argparse.Namespace) -> BuildOptions:
+    return BuildOptions(
+        retrieval=args.retrieval,
+        incremental_updates=args.incremental_updates,
+        preprocess=args.preprocess,
+        extraction=args.extraction,
+        section_repair_attempts=args.section_repair_attempts,
+        cover_shares=args.cover_shares,
+        assembler=args.assembler,
+        checkpoint=args.checkpoint,
+        resume=args.resume,
+        trace_dir=args.trace_dir,
+        profile_stages=args.profile,
+        cascade=args.cascade,
+        hedge=args.hedge,
+        deadline=args.deadline,
+        stage_timeouts=_stage_timeouts(args.stage_timeout),
+        update_shard_size=args.update_shard_size,
+        update_concurrency=args.update_concurrency,
+        accountant_batch_size=args.accountant_batch_size,
+        accountant_concurrency=args.accountant_concurrency,
+        pipeline_pricing=args.pipeline_pricing,
+        repair_attempts=args.repair_attempts,
+    )
+
+
+async def _main_batch(args: argparse.Namespace):
+    def progress(r: BatchResult):
+        print(f"{'✅' if r.ok else '❌'} {r.cik} {'OK' if r.ok else 'FAILED → ' + r.error} "
+              f"({r.elapsed:.1f}s)")
+
+    results = await build_balance_sheets_async(
+        load_filings(args.batch),
+        max_filings=args.max_filings,
+        agent_runs=args.agent_runs,
+        uploads=args.uploads,
+        on_result=progress,
+        reuse_vector_stores=args.reuse_vector_stores,
+        disk_cache=args.disk_cache,
+        cache_agents=args.agent_cache,
+        options=_build_options(args),
+    )
+    print(format_report(results))
+    if args.report:
+        write_report(results, args.report)
 
 
 async def _main_cli():
     args = _parse_args()
-    initial_bs, updated_bs = await build_balance_sheet_async(args.cik, args.index_url)
-    pretty_print(initial_bs, updated_bs)
+    if args.batch:
+        return await _main_batch(args)
+    # render tables and changes as the pipeline produces them
+    async for event in stream_balance_sheet_async(
+        args.cik, args.index_url,
+        reuse_vector_stores=args.reuse_vector_stores, disk_cache=args.disk_cache,
+        cache_agents=args.agent_cache, options=_build_options(args)
+    ):
+        render_event(event)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+# balancesheet/checkpoint.py
+"""
+Per-filing stage checkpoints so a failed run can resume where it died.
+
+Each completed pipeline stage (section tables, assembled balance sheet,
+UpdateSummary, deltas, vector store ids, ...) is pickled to
+
+    <root>/<cik>/<accession>/<variant>/<stage>.pkl
+
+where `variant` is a short hash of the options that change stage outputs
+(retrieval, extraction, preprocess, ...), so a run with different options
+never picks up another configuration's results.  A manifest.json next to
+the pickles records when each stage finished and how long it took.
+
+Writes go through a temp file + os.replace; a stage whose result cannot be
+pickled is simply not checkpointed.
+
+Eviction: opening a checkpoint first drops other runs' checkpoint
+directories not written for `ttl_days`, then the least recently written
+ones until all of them fit in `max_bytes` (evict_checkpoints).
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Tuple
+
+from settings import CACHE_DIR
+
+_DEFAULT_ROOT = os.path.join(CACHE_DIR, "checkpoints")
+_DAY = 24 * 60 * 60
+
+
+def _run_dirs(root: str):
+    """(path, last write, bytes) of every <cik>/<accession>/<variant> directory."""
+    for cik in os.scandir(root) if os.path.isdir(root) else ():
+        if not cik.is_dir():
+            continue
+        for acc in os.scandir(cik.path):
+            if not acc.is_dir():
+                continue
+            for run in os.scandir(acc.path):
+                if not run.is_dir():
+                    continue
+                files = [f.stat() for f in os.scandir(run.path) if f.is_file()]
+                written = max((st.st_mtime for st in files), default=run.stat().st_mtime)
+                yield run.path, written, sum(st.st_size for st in files)
+
+
+def evict_checkpoints(root: str | None = None, ttl_days: float = 30,
+                      max_bytes: int = 2 * 1024 ** 3, keep: str | None = None) -> list[str]:
+    """
+    Deletes run directories older than `ttl_days`, then the oldest ones
+    until the rest fit in `max_bytes`.  `keep` (the running checkpoint) is
+    never deleted.  Returns the deleted directories.
+    """
+    root   = root or _DEFAULT_ROOT
+    cutoff = time.time() - ttl_days * _DAY
+    runs   = sorted(_run_dirs(root), key=lambda r: r[1], reverse=True)
+    keep   = os.path.abspath(keep) if keep else None
+
+    total, evicted = 0, []
+    for path, written, size in runs:
+        if os.path.abspath(path) != keep and (written < cutoff or total + size > max_bytes):
+            shutil.rmtree(path, ignore_errors=True)
+            evicted.append(path)
+            for parent in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+                try:
+                    os.rmdir(parent)              # only succeeds once empty
+                except OSError:
+                    break
+        else:
+            total += size
+    return evicted
+
+
+def options_variant(options: dict) -> str:
+    blob = json.dumps(options, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()[:12]
+
+
+class StageCheckpoint:
+    """Load / save stage results for one (cik, accession, options) run."""
+
+    def __init__(self, cik: int | str, accession: str, options: dict | None = None,
+                 root: str | None = None, ttl_days: float = 30, max_bytes: int = 2 * 1024 ** 3):
+        self.dir   = os.path.join(root or _DEFAULT_ROOT, str(cik), accession,
+                                  options_variant(options or {}))
+        self._lock = threading.Lock()
+        evict_checkpoints(root, ttl_days, max_bytes, keep=self.dir)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def _path(self, stage: str) -> str:
+        return os.path.join(self.dir, f"{stage}.pkl")
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.dir, "manifest.json")
+
+    def manifest(self) -> dict:
+        try:
+            with open(self._manifest_path(), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def has(self, stage: str) -> bool:
+        return os.path.exists(self._path(stage))
+
+    def load(self, stage: str) -> Tuple[bool, Any]:
+        """(True, value) for a completed stage, (False, None) otherwise."""
+        try:
+            with open(self._path(stage), "rb") as f:
+                return True, pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except Exception:                     # truncated / incompatible pickle
+            self.discard(stage)
+            return False, None
+
+    def save(self, stage: str, value: Any, elapsed: float = 0.0) -> bool:
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return False
+        fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, self._path(stage))
+
+        with self._lock:
+            manifest = self.manifest()
+            manifest[stage] = {
+                "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "elapsed":  round(elapsed, 3),
+                "bytes":    len(blob),
+            }
+            fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp, self._manifest_path())
+        return True
+
+    def discard(self, stage: str) -> None:
+        try:
+            os.remove(self._path(stage))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.makedirs(self.dir, exist_ok=True)
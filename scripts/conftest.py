@@ -0,0 +1,28 @@
+# balancesheet/conftest.py
+"""
+pytest setup for the offline tests in this directory.
+
+settings.py reads the OpenAI key from the team share at import time; when
+that file is not reachable (CI, laptops) a minimal `settings` module with a
+throwaway CACHE_DIR is installed instead, so modules that only need
+CACHE_DIR can still be imported.  Nothing here talks to OpenAI or EDGAR.
+"""
+
+import os
+import sys
+import tempfile
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import settings  # noqa: F401
+except OSError:
+    settings = types.ModuleType("settings")
+    settings.CACHE_DIR = tempfile.mkdtemp(prefix="balancesheet-cache-")
+
+    def get_openai_client():
+        raise RuntimeError("no OpenAI client in offline tests")
+
+    settings.get_openai_client = get_openai_client
+    sys.modules["settings"] = settings
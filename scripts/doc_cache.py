@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+# balancesheet/doc_cache.py
+"""
+Local content-addressed disk cache in front of EdgarCacheClient.Get.
+
+Documents under /Archives/edgar/ never change once filed, so the URL is a
+safe cache key.  Bytes are stored once per sha256 digest under
+`<root>/blobs/`, with a small SQLite index (url -> digest, digest -> size /
+last access) that several worker processes on the same box can share.
+
+When the blobs exceed `max_bytes` the least recently used ones are deleted
+until the cache is back under 90% of the limit.  A hit reads the blob
+right away; if another process evicted it between the index lookup and
+the read, or its bytes no longer match their digest, the lookup counts as
+a miss and the document is downloaded again.
+
+Anything that is not an archive URL (submission JSON, search pages) is
+passed straight through to the wrapped client.
+"""
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from settings import CACHE_DIR
+
+_DEFAULT_ROOT      = os.path.join(CACHE_DIR, "edgar")
+_IMMUTABLE_MARKER  = "/Archives/edgar/"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls  (url    TEXT PRIMARY KEY, digest TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER NOT NULL,
+                                  last_access REAL NOT NULL);
+"""
+
+
+class _CachedResponse:
+    """
+    Stand-in for an EdgarCache response object: only `.content` is used
+    by the pipeline.
+    """
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.size    = len(content)
+
+
+class CachedEdgarClient:
+    """
+    Wraps an EdgarCacheClient; `Get(url)` serves archive documents from
+    disk and every other attribute is forwarded to the wrapped client, so
+    it can be passed anywhere an EdgarCacheClient is expected.
+    """
+
+    def __init__(
+            self,
+            client,
+            root: str | None = None,
+            max_bytes: int = 5 * 1024 ** 3,
+    ):
+        self._client        = client
+        self.root           = root or _DEFAULT_ROOT
+        self.max_bytes      = max_bytes
+        self._lock          = threading.Lock()
+        self.hits = self.misses = self.bypassed = self.evictions = 0
+        self.bytes_served = 0
+
+        os.makedirs(os.path.join(self.root, "blobs"), exist_ok=True)
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    # -- storage ------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(os.path.join(self.root, "index.sqlite"), timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest[:2], digest)
+
+    def _lookup(self, url: str) -> _CachedResponse | None:
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT b.digest, b.size FROM urls u JOIN blobs b ON u.digest = b.digest "
+                "WHERE u.url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            digest, size = row
+            path = self._blob_path(digest)
+            try:
+                with open(path, "rb") as f:
+                    content = f.read()
+            except FileNotFoundError:             # evicted by another process: a miss
+                content = None
+            if content is None or hashlib.sha256(content).hexdigest() != digest:
+                if content is not None:           # damaged on disk: drop it
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                db.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+                db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                return None
+            db.execute("UPDATE blobs SET last_access = ? WHERE digest = ?", (time.time(), digest))
+        return _CachedResponse(content)
+
+    def _store(self, url: str, content: bytes) -> None:
+        digest = hashlib.sha256(content).hexdigest()
+        path   = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)",
+                       (digest, len(content), time.time()))
+            db.execute("INSERT OR REPLACE INTO urls VALUES (?, ?)", (url, digest))
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._connect() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            for digest, size in db.execute(
+                    "SELECT digest, size FROM blobs ORDER BY last_access").fetchall():
+                if total <= target:
+                    break
+                try:
+                    os.remove(self._blob_path(digest))
+                except FileNotFoundError:
+                    pass
+                db.execute("DELETE FROM urls WHERE digest = ?", (digest,))
+                db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+
+    # -- EdgarCacheClient interface -----------------------------------------
+
+    def Get(self, url: str):
+        if _IMMUTABLE_MARKER not in url:
+            with self._lock:
+                self.bypassed += 1
+            return self._client.Get(url)
+
+        cached = self._lookup(url)
+        if cached is not None:
+            with self._lock:
+                self.hits += 1
+                self.bytes_served += cached.size
+            return cached
+
+        resp = self._client.Get(url)
+        with self._lock:
+            self.misses += 1
+        content = getattr(resp, "content", None)
+        if content:
+            self._store(url, content)
+        return resp
+
+    # -- stats --------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits":         self.hits,
+                "misses":       self.misses,
+                "bypassed":     self.bypassed,
+                "evictions":    self.evictions,
+                "bytes_served": self.bytes_served,
+            }
+
+    def summary(self) -> str:
+        s = self.stats()
+        looked_up = s["hits"] + s["misses"]
+        rate = s["hits"] / looked_up if looked_up else 0.0
+        return (f"Disk cache: {s['hits']} hits / {s['misses']} misses ({rate:.0%}), "
+                f"{s['bytes_served'] / 1e6:.2f} MB served, {s['evictions']} evicted")
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+# balancesheet/events.py
+"""
+Typed progress events of one balance-sheet build.
+
+orchestrator.stream_balance_sheet yields these as the pipeline produces
+them; build_balance_sheet(on_event=...) delivers the same events to a
+callback.  Order within one run:
+
+    StageFinished        after every stage (ok, resumed or degraded)
+    SectionExtracted     one per section table, as soon as it is known
+    SheetAssembled       the filing's FullBalanceSheet
+    ChangeFound          one per subsequent FilingChange
+    ChangePriced         one per change once its delta is known
+    ProFormaReady        always last: both final sheets
+
+A section may be extracted more than once when the model cascade or the
+section check re-runs it; the later event supersedes the earlier one.
+
+With pipelined pricing, ChangeFound / ChangePriced go out interleaved
+while the update agent is still scanning, for the changes as the agent
+first recorded them; the final list of changes is the pro forma's
+`applied_updates`.
+"""
+
+from dataclasses import dataclass
+from typing import Union
+
+from models import FilingChange, FullBalanceSheet, SectionTable
+from pipeline import StageTiming
+
+
+@dataclass
+class StageFinished:
+    timing: StageTiming
+
+
+@dataclass
+class SectionExtracted:
+    table: SectionTable
+
+
+@dataclass
+class SheetAssembled:
+    sheet: FullBalanceSheet
+
+
+@dataclass
+class ChangeFound:
+    change: FilingChange
+
+
+@dataclass
+class ChangePriced:
+    change: FilingChange            # with .delta set
+
+
+@dataclass
+class ProFormaReady:
+    initial:   FullBalanceSheet
+    pro_forma: FullBalanceSheet
+
+
+BuildEvent = Union[StageFinished, SectionExtracted, SheetAssembled, ChangeFound,
+                   ChangePriced, ProFormaReady]
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+# balancesheet/local_search.py
+"""
+In-process retrieval over filing text: a drop-in for the hosted
+FileSearchTool that needs no vector-store upload or polling.
+
+Documents (ideally the markdown produced by preprocess.py) are split into
+overlapping line-based chunks and ranked with Okapi BM25.  Chunks only
+break between lines, so a markdown table row is never cut in half.
+Everything here is pure Python and works offline; only
+make_local_search_tool touches the agents SDK.  Each tool call is recorded
+as a "tool" span (see telemetry.py).
+
+Chunks remember the accession number of the filing they came from, so one
+index over many subsequent filings can serve per-filing searches (the local
+counterpart of a hosted file_search `accession` attribute filter).
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Collection, Iterable, List, Tuple
+
+from telemetry import span
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+@dataclass
+class Chunk:
+    doc:   str        # file name the chunk came from
+    index: int        # position within that document
+    text:  str
+    accession: str = ""   # filing the document belongs to, if known
+
+
+def chunk_text(doc: str, text: str, max_chars: int = 4000, overlap_lines: int = 3,
+               accession: str = "") -> List[Chunk]:
+    """
+    Greedy line packing up to `max_chars`; the last `overlap_lines` lines
+    of each chunk are repeated at the start of the next one.
+    """
+    lines  = [l for l in text.splitlines() if l.strip()]
+    chunks: List[Chunk] = []
+    buf: List[str] = []
+    size = 0
+    for line in lines:
+        if buf and size + len(line) > max_chars:
+            chunks.append(Chunk(doc, len(chunks), "\n".join(buf), accession))
+            buf  = buf[-overlap_lines:] if overlap_lines else []
+            size = sum(len(l) + 1 for l in buf)
+        buf.append(line)
+        size += len(line) + 1
+    if buf:
+        chunks.append(Chunk(doc, len(chunks), "\n".join(buf), accession))
+    return chunks
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks."""
+
+    def __init__(self, chunks: Iterable[Chunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = list(chunks)
+        self.k1, self.b = k1, b
+        self._lengths: List[int] = []
+        self._postings: dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for i, chunk in enumerate(self.chunks):
+            counts = Counter(tokenize(chunk.text))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings[term].append((i, tf))
+        n = len(self.chunks)
+        self._avg_len = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def search(self, query: str, k: int = 12,
+               accessions: Collection[str] | None = None) -> List[Tuple[float, Chunk]]:
+        """Best `k` chunks, only from the filings in `accessions` when given."""
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                if accessions is not None and self.chunks[i].accession not in accessions:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / (self._avg_len or 1))
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+        return [(score, self.chunks[i]) for i, score in best]
+
+
+def build_local_index(docs: Iterable[Tuple[str, ...]], max_chars: int = 4000) -> BM25Index:
+    """`docs` are (file name, text) or (file name, text, accession) tuples."""
+    chunks: List[Chunk] = []
+    for name, text, *accession in docs:
+        chunks.extend(chunk_text(name, text, max_chars=max_chars, accession=next(iter(accession), "")))
+    return BM25Index(chunks)
+
+
+def format_hits(hits: List[Tuple[float, Chunk]]) -> str:
+    if not hits:
+        return "No matching passages found."
+    return "\n\n".join(
+        f"[{n}] {chunk.doc} (chunk {chunk.index}, score {score:.2f})\n{chunk.text}"
+        for n, (score, chunk) in enumerate(hits, 1)
+    )
+
+
+def make_local_search_tool(index: BM25Index, max_k: int = 12,
+                           accessions: Collection[str] | None = None):
+    """
+    FunctionTool with the same role as tools.make_file_search_tool: the
+    agent passes a query and gets the `max_k` best passages back, from the
+    filings in `accessions` only when given.
+    """
+    accessions = set(accessions) if accessions is not None else None
+    from agents import function_tool
+
+    def file_search(query: str) -> str:
+        """
+        Search the SEC filing documents and return the most relevant passages,
+        each labelled with its source file.  Use specific terms (line-item
+        names, dates, dollar amounts) for best results.
+
+        Args:
+            query: keywords or a question to search the filing text for.
+        """
+        with span("file_search", "tool", query=query) as s:
+            hits = index.search(query, max_k, accessions)
+            s.set(hits=len(hits), bytes=sum(len(c.text) for _, c in hits))
+        return format_hits(hits)
+
+    return function_tool(file_search, name_override="file_search")
@@ -53,6 +53,23 @@ class SectionTable(BaseModel):
         return sum(l.total_value for l in self.lines)
 
 
+class BalanceSheetSections(BaseModel):
+    """All three sections from a single extraction call."""
+    assets:      SectionTable
+    liabilities: SectionTable
+    equity:      SectionTable
+
+
+class AssemblyDiagnostic(BaseModel):
+    """One failed arithmetic check found while assembling the sheet."""
+    check:      Literal['section_subtotal', 'balance', 'section_label']
+    section:    Optional[str] = None
+    expected:   Optional[float] = None   # reported figure (subtotal, assets total)
+    actual:     Optional[float] = None   # computed figure (sum of lines, liab + equity)
+    difference: Optional[float] = None   # expected - actual
+    message:    str
+
+
 class FullBalanceSheet(BaseModel):
     company_name: str
     cik:          str
@@ -63,6 +80,12 @@ class FullBalanceSheet(BaseModel):
     shares_outstanding_preferred: Optional[int] = None
     update_errors: list["FailedChange"] | None = None
     applied_updates: list["FilingChange"] | None = None
+    diagnostics: list[AssemblyDiagnostic] | None = None
+    # pro forma only: "ok", or why the subsequent updates are missing
+    update_status: Optional[Literal["ok", "skipped", "timeout", "failed"]] = None
+    update_error:  Optional[str] = None
+    # pro forma only: accession numbers of the subsequent filings already scanned
+    scanned_filings: Optional[List[str]] = None
 
     # helper getters
     @property
@@ -122,6 +145,8 @@ class FilingChange(BaseModel):
     update_log: str
     citation: str
     delta: BalanceSheetDelta | None = None
+    shares_common: Optional[int] = None      # net change in common shares outstanding
+    shares_preferred: Optional[int] = None   # net change in preferred shares outstanding
 
 class FailedChange(BaseModel):
     """Represents an update that could not be applied without causing an imbalance."""
@@ -2,17 +2,26 @@
 from .assets       import make_assets_agent
 from .liabilities  import make_liabilities_agent
 from .equity       import make_equity_agent
+from .combined     import make_combined_section_agent
 from .assembler    import make_assembler_agent
 from .expander     import make_expander_agent
 from .update       import make_update_agent
 from .accountant   import make_accountant_agent
+from .tiers        import ModelTier, FAST, MEDIUM, STRONG, ASSEMBLER, DEFAULT_TIERS
 
 __all__ = [
     "make_assets_agent",
     "make_liabilities_agent",
     "make_equity_agent",
+    "make_combined_section_agent",
     "make_assembler_agent",
     "make_expander_agent",
     "make_update_agent",
-    "make_accountant_agent"
+    "make_accountant_agent",
+    "ModelTier",
+    "FAST",
+    "MEDIUM",
+    "STRONG",
+    "ASSEMBLER",
+    "DEFAULT_TIERS"
 ]
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from agents import Agent, ModelSettings
 from models import BalanceSheetDeltaList
+from .tiers import ModelTier, STRONG
 
 
 _PROMPT = """
@@ -56,11 +57,11 @@ Return ONLY valid JSON conforming to BalanceSheetDeltaList.
 """
 
 
-def make_accountant_agent(tool) -> Agent:
+def make_accountant_agent(tool, tier: ModelTier = STRONG) -> Agent:
     return Agent(
         name="AccountantAgent",
-        model="o3",
-        model_settings=ModelSettings(reasoning={'effort': 'high'}),
+        model=tier.model,
+        model_settings=tier.settings(),
         output_type=BalanceSheetDeltaList,
         instructions=_PROMPT,
         tools=[tool],
@@ -1,6 +1,7 @@
 # balancesheet/agents/assembler_agent.py
 from agents import Agent, ModelSettings
 from models import FullBalanceSheet
+from .tiers import ModelTier, ASSEMBLER
 
 _ASSEMBLER_PROMPT = """
 You will receive:
@@ -25,11 +26,11 @@ After building:
 Return ONLY valid JSON.
 """
 
-def make_assembler_agent() -> Agent:
+def make_assembler_agent(tier: ModelTier = ASSEMBLER) -> Agent:
     return Agent(
         name          = "BalanceSheetAssembler",
-        model         = 'o3',
-        #model_settings= ModelSettings(temperature=0),
+        model         = tier.model,
+        model_settings= tier.settings(),
         output_type   = FullBalanceSheet,
         instructions  = _ASSEMBLER_PROMPT
     )
\ No newline at end of file
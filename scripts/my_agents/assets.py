@@ -1,5 +1,6 @@
 # balancesheet/agents/assets_agent.py
 from .section import make_section_agent
+from .tiers import STRONG
 
-def make_assets_agent(tool):
-    return make_section_agent('assets', tool)
\ No newline at end of file
+def make_assets_agent(tool, tier=STRONG):
+    return make_section_agent('assets', tool, tier)
\ No newline at end of file
@@ -0,0 +1,47 @@
+# balancesheet/agents/combined_agent.py
+"""
+One agent that extracts all three balance-sheet sections in a single
+structured output, instead of the three make_section_agent() runs that
+each retrieve the same statement chunks.
+"""
+from __future__ import annotations
+
+from agents import Agent, ModelSettings
+from models import BalanceSheetSections
+from .tiers import ModelTier, STRONG
+
+
+_COMBINED_PROMPT = """
+You are a CPA-level financial statement analyst.
+
+Task: Extract the ASSETS, LIABILITIES and EQUITY sections of the MOST
+RECENT balance sheet presented in the provided SEC filing documents.
+Locate the balance sheet once and read all three sections from it.
+
+Return JSON that matches the BalanceSheetSections schema: one SectionTable
+each for `assets`, `liabilities` and `equity`.  Requirements per section:
+1. Preserve the filing's line-item order; do NOT rename items.
+2. Multiply values whenever the statement says
+      “$ in thousands”  (×1,000)  or  “$ in millions” (×1,000,000)
+   so that *value is in whole USD*.
+3. If the statement shows a subtotal line for the section
+      (“Total assets”, “Total liabilities”, “Total stockholders' equity” etc.)
+   add it to that section's `subtotal` field.
+4. Copy any foot-note symbol or reference into `note_ref`.
+5. Do not invent numbers or line items. If a number is missing, try again until you find it.
+6. If a line item is a total or a subtotal of other line items in its section, DO NOT INCLUDE IT
+7. Do not include the Total of an entire section as a line item.
+8. The "section" field of each table MUST be exactly "assets",
+   "liabilities" or "equity" respectively.
+"""
+
+
+def make_combined_section_agent(tool, tier: ModelTier = STRONG) -> Agent:
+    return Agent(
+        name          = "BalanceSheetSectionsAgent",
+        model         = tier.model,
+        model_settings= tier.settings(),
+        output_type   = BalanceSheetSections,
+        instructions  = _COMBINED_PROMPT,
+        tools         = [tool]
+    )
@@ -1,5 +1,6 @@
 # balancesheet/agents/equity_agent.py
 from .section import make_section_agent
+from .tiers import STRONG
 
-def make_equity_agent(tool):
-    return make_section_agent('equity', tool)
\ No newline at end of file
+def make_equity_agent(tool, tier=STRONG):
+    return make_section_agent('equity', tool, tier)
\ No newline at end of file
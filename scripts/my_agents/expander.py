@@ -1,11 +1,12 @@
 from agents import Agent, ModelSettings
 from models import SectionTable, FullBalanceSheet
+from .tiers import ModelTier, STRONG
 
-def make_expander_agent(tool):
+def make_expander_agent(tool, tier: ModelTier = STRONG):
     return Agent(
         name="NoteExpander",
-        model="o3",
-        model_settings=ModelSettings(reasoning={'effort':'high'}),
+        model=tier.model,
+        model_settings=tier.settings(),
         output_type=FullBalanceSheet,
         instructions=_PROMPT,
         tools=[tool],
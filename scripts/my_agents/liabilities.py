@@ -1,5 +1,6 @@
 # balancesheet/agents/liabilities_agent.py
 from .section import make_section_agent
+from .tiers import STRONG
 
-def make_liabilities_agent(tool):
-    return make_section_agent('liabilities', tool)
\ No newline at end of file
+def make_liabilities_agent(tool, tier=STRONG):
+    return make_section_agent('liabilities', tool, tier)
\ No newline at end of file
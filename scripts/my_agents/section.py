@@ -11,6 +11,7 @@ from typing import Literal
 
 from agents import Agent, ModelSettings
 from models import SectionTable
+from .tiers import ModelTier, STRONG
 
 
 _SECTION_PROMPT_TEMPLATE = """
@@ -35,7 +36,8 @@ Return JSON that matches the SectionTable schema.  Requirements:
 
 def make_section_agent(
         section: Literal['assets','liabilities','equity'],
-        tool
+        tool,
+        tier: ModelTier = STRONG
 ) -> Agent:
     assert section in ('assets','liabilities','equity')
     prompt = _SECTION_PROMPT_TEMPLATE.format(
@@ -48,8 +50,8 @@ def make_section_agent(
 
     agent = Agent(
         name          = f"{section.capitalize()}Agent",
-        model         = 'o3',   # or whatever default you want
-        model_settings= ModelSettings(reasoning={'effort':'high'}),
+        model         = tier.model,
+        model_settings= tier.settings(),
         output_type   = SectionTable,
         instructions  = prompt,
         tools         = [tool]
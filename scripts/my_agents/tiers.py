@@ -0,0 +1,37 @@
+# balancesheet/agents/tiers.py
+"""
+Model configurations an agent factory can be built with.
+
+Every factory takes `tier=`; the default is the original setup: STRONG
+(o3 / high effort), or ASSEMBLER for the assembler.  The orchestrator's
+cascade (runner.run_cascade) tries the tiers of a stage in order and only
+moves on when the stage's validators (validation.py) reject the output.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from agents import ModelSettings
+
+
+@dataclass(frozen=True)
+class ModelTier:
+    name:   str
+    model:  str
+    effort: str | None = None          # reasoning effort, None for non-reasoning models
+
+    def settings(self) -> ModelSettings:
+        if self.effort is None:
+            return ModelSettings()
+        return ModelSettings(reasoning={'effort': self.effort})
+
+
+FAST   = ModelTier("fast",   "o4-mini", "low")
+MEDIUM = ModelTier("medium", "o3",      "medium")
+STRONG = ModelTier("strong", "o3",      "high")
+
+# the assembler only merges three tables; o3 at its default effort, as
+# before tiers existed
+ASSEMBLER = ModelTier("strong", "o3")
+
+DEFAULT_TIERS = (FAST, STRONG)
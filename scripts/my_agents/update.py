@@ -2,22 +2,30 @@ from __future__ import annotations
 
 from agents import Agent, ModelSettings
 from models import UpdateSummary
-from datetime import datetime as dt
+from .tiers import ModelTier, STRONG
+import datetime as dt
 
 
-def make_update_agent(tool) -> Agent:
+def make_update_agent(tool, tier: ModelTier = STRONG, record_change=None) -> Agent:
+    """
+    `record_change` (see updates.make_record_change_tool) lets the agent
+    hand over each event as soon as it is found, so pricing can start
+    before the final UpdateSummary is returned.
+    """
     return Agent(
         name="BalanceSheetUpdater",
-        model="o3",
-        model_settings=ModelSettings(reasoning={'effort':'high'}),
+        model=tier.model,
+        model_settings=tier.settings(),
         output_type=UpdateSummary,
-        instructions=_PROMPT,
-        tools=[tool],
+        # the date only, so runs on the same day share agent-cache entries
+        instructions=_PROMPT.format(today=dt.date.today().isoformat())
+                     + (_RECORD_PROMPT if record_change is not None else ""),
+        tools=[tool] if record_change is None else [tool, record_change],
     )
 
 
-_PROMPT = f"""
-You are a CPA-level financial-statement analyst. Today is {dt.today()}. You will receive:
+_PROMPT = """
+You are a CPA-level financial-statement analyst. Today is {today}. You will receive:
 1. The most recent FullBalanceSheet JSON extracted from a filing.
 2. The filing text via FileSearchTool.
 3. The full text of all subsequent filings via FileSearchTool.
@@ -26,7 +34,9 @@ Scan the original filing and the subsequent filings for settled events that chan
 For each settled event record:
   - the effective date,
   - a short update_log describing what happened and the numeric amounts involved,
-  - a citation describing which filing and location the data came from.
+  - a citation describing which filing and location the data came from,
+  - shares_common / shares_preferred: the net number of common / preferred shares issued (positive)
+    or retired (negative) by the event, or null when the event does not change the share count.
 
 Also determine the exact numbers of common and preferred shares currently outstanding based solely on these filings.
 
@@ -39,4 +49,10 @@ Return ONLY valid JSON conforming to UpdateSummary. Each FilingChange must inclu
 Do not attempt to update the balance sheet yourself.
 """
 
+_RECORD_PROMPT = """
+As soon as you have confirmed a settled event, call the `record_change` tool with its date, update_log,
+citation and share counts, then continue searching.  Call it once per event.  Still include every event
+in the final UpdateSummary.
+"""
+
 
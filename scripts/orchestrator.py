@@ -11,14 +11,29 @@ from __future__ import annotations
 High-level workflow:
     1. Download & parse SEC index page
     2. Create vector store
-    3. Spin up three section agents + assembler
+    3. Spin up three section agents, then assemble (assemble.py)
     4. Return FullBalanceSheet
+
+stream_balance_sheet runs the same build and yields typed events
+(events.py) as each table, change and sheet becomes available.
+
+The steps are declared as a dependency graph (see pipeline.py) so that the
+subsequent-filings branch (sub filings -> updates vector store -> cover
+page) runs while the section agents are still working:
+
+    filing ─┬─ xbrl ── base_store ── sections ── checked_sections ── assembled ─┐
+            │                                                                   ├─ updates ── deltas ─┐
+            └─ sub_filings ─┬─ updates_store ───────────────────────────────────┘                     ├─ pro_forma
+                            └─ cover ─────────────────────────────────────────────────────────────────┘
 """
 
 
 
 import asyncio
-from typing import Dict
+import contextlib
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Literal, Sequence
 
 import sys
 import os
@@ -46,33 +61,71 @@ from datetime import datetime as dt
 
 from tqdm.auto import tqdm
 
-from models import FullBalanceSheet, UpdateSummary, BalanceSheetDeltaList
-from tools  import extract_doc_urls, create_vector_store, make_file_search_tool, get_all_sub_filings, create_vector_store_for_updates
+from models import (FullBalanceSheet, UpdateSummary, BalanceSheetDelta, BalanceSheetDeltaList,
+                    BalanceSheetSections, FilingChange)
+from tools  import (extract_doc_urls, create_vector_store, make_file_search_tool, get_all_sub_filings,
+                    create_vector_store_for_updates, summarize_fetches, sync_updates_vector_store,
+                    get_filing_doc_urls, create_local_index, accession_from_url, filing_digests)
+from settings import get_openai_client, CACHE_DIR
+from local_search import make_local_search_tool
+from xbrl import XbrlExtractionError, extract_from_filing
+from shares import find_latest_cover_shares, merge_share_counts
+from updates import shard_filings, merge_update_summaries, make_record_change_tool, change_key
 from apply_updates import  apply_updates
+from assemble import assemble_balance_sheet
+from vs_registry import VectorStoreRegistry
+from preprocess import PREPROCESS_VERSION, summarize_preprocessing
+from pipeline import Stage, StageTiming, run_stages
+from runner import (run_agent, run_cascade, append_cascade_log, CascadeRecord,
+                    run_hedged, HedgePolicy, hedge_stats, format_hedge_stats)
+from validation import (check_section, check_sections, check_combined, check_sheet,
+                        check_update_summary, check_deltas, section_suspects, summarize_problems)
+from checkpoint import StageCheckpoint
+from agent_cache import AgentCache, docs_key
+from telemetry import Trace, tracing
+from events import (BuildEvent, StageFinished, SectionExtracted, SheetAssembled, ChangeFound,
+                    ChangePriced, ProFormaReady)
 from my_agents import (                     # imported from package
     make_assets_agent,
     make_liabilities_agent,
     make_equity_agent,
+    make_combined_section_agent,
     make_assembler_agent,
     make_expander_agent,
     make_update_agent,
-    make_accountant_agent
+    make_accountant_agent,
+    ModelTier,
+    FAST,
+    STRONG,
+    ASSEMBLER,
+    DEFAULT_TIERS
 )
 
+# stages whose agent runs are memoized when an AgentCache is passed
+CACHED_STAGES = ("sections", "assembled", "updates", "deltas")
 
-async def build_balance_sheet(
-        cik: int | str,
-        index_url: str,
-        ec: EdgarCacheClient,
-        openai_client=None
-) -> tuple[FullBalanceSheet, FullBalanceSheet]:
-    """
-    Main entry-point called by CLI / notebooks.
+# model tiers per agent stage with cascade=True.  The update agent has no
+# validator that can tell a missed event, so it stays on the strong tier.
+DEFAULT_CASCADE = {
+    "sections":  DEFAULT_TIERS,
+    "assembled": (FAST, ASSEMBLER),
+    "updates":   (STRONG,),
+    "deltas":    DEFAULT_TIERS,
+}
 
-    Returns both the fully expanded balance sheet from the filing and the
-    pro forma balance sheet with subsequent updates applied.
-    """
-    start_program = time.perf_counter()
+# the subsequent-updates branch; with degrade these may fail or time out and
+# the pro forma falls back to the filing's own balance sheet
+UPDATE_STAGES = ("sub_filings", "updates_store", "cover", "updates", "deltas", "pro_forma")
+
+# agent stages hedged with hedge=True
+DEFAULT_HEDGE = {stage: HedgePolicy() for stage in CACHED_STAGES}
+
+# agent runs (the hedge stats key prefix) that reuse a pipeline stage's hedge policy
+HEDGED_RUNS = {"sections": ("sections", "section_repair"), "deltas": ("deltas", "repair")}
+
+
+def load_filing(ec: EdgarCacheClient, cik: int | str, index_url: str) -> dict:
+    """Filing metadata + document URLs from the EDGAR index page."""
     page = SubmissionPage(edgarCache=ec,url=index_url)
     filingDate = f"{page.metadata.get('Filing Date'):%Y-%m-%d}"
     if page.filers:
@@ -87,56 +140,116 @@ async def build_balance_sheet(
         name = str(cik)
     period = f"{page.metadata.get('Period of Report'):%Y-%m-%d}"
 
+    format_string = "%Y,%m,%d"
+    base_date = dt.strptime(f'{page.metadata.get("Filing Date"):%Y,%m,%d}',format_string).date()
+
     doc_urls = [url for url in Util.GetRelatedUrls(str(ec.Get(index_url).content).replace("/ix?doc=",""))]
+    return {
+        "company_name": name,
+        "filing_date":  filingDate,
+        "period_end":   period,
+        "base_date":    base_date,
+        "doc_urls":     doc_urls,
+    }
 
-    pbar = tqdm(total=9, desc="Build balance sheet")
 
-    # 2. Vector store (group all docs under one store)
-    start_vs = time.perf_counter()
-    vs = create_vector_store(ec, name=f"{cik}_10Q_vector", urls=doc_urls,
-                             client=openai_client)
-    vs_elapsed = time.perf_counter() - start_vs
-    pbar.write(f"Vector store creation took {vs_elapsed:.2f}s")
-    
-    pbar.update(1)
+def _report_build(pbar, label: str, fetches, prepped) -> None:
+    pbar.write(f"{label}: {summarize_fetches(fetches)}")
+    if prepped:
+        pbar.write(f"{label}: {summarize_preprocessing(prepped)}")
 
-    agents_start = time.perf_counter()
-    tool = make_file_search_tool(vs.id, max_k=12)
 
-    # 3. Instantiate agents (each factory just builds an Agent object + prompt)
-    assets_agent      = make_assets_agent(tool)
-    liabilities_agent = make_liabilities_agent(tool)
-    equity_agent      = make_equity_agent(tool)
-    assembler_agent   = make_assembler_agent()      # no tool needed
+@dataclass
+class SearchIndex:
+    """
+    A store stage's output: the `retriever` (vector store id or local
+    index) and the content digest of each filing it holds, which the
+    agent-cache doc keys are built from.
+    """
+    retriever: Any
+    digests:   Dict[str, str]
+
+    def doc_key(self, variant: str, index_urls: Iterable[str] | None = None) -> str:
+        """docs_key over every filing held, or only those of `index_urls`."""
+        if index_urls is None:
+            return docs_key(self.digests.values(), variant)
+        accessions = [accession_from_url(u) for u in index_urls]
+        return docs_key([self.digests[a] for a in accessions if a in self.digests], variant)
+
+
+def make_tool(retriever, accessions=None):
+    """
+    Vector store id -> hosted FileSearchTool, local index -> function tool;
+    with `accessions`, searching only those filings' documents.
+    """
+    if isinstance(retriever, str):
+        return make_file_search_tool(retriever, max_k=12, accessions=accessions)
+    return make_local_search_tool(retriever, max_k=12, accessions=accessions)
+
+
+async def _run_tiered(stage: str, make_agent, input, tiers=None, validate=None,
+                      cache=None, doc_key: str = "", log=None, hedge=None):
+    """run_cascade over `tiers`; without tiers, one run of the factory default."""
+    if tiers:
+        return await run_cascade(stage, make_agent, input, tiers, validate, cache, doc_key, log,
+                                 hedge=hedge)
+    if hedge is not None:
+        return await run_hedged(stage, make_agent(), input, hedge, validate, cache, doc_key)
+    return await run_agent(make_agent(), input, cache, doc_key, validate=validate)
+
+
+async def _extract_sections_llm(tool, pbar, cache=None, doc_key: str = "", tiers=None, log=None,
+                                hedge=None, on_table=None):
+    """The three section agents in parallel; `on_table(table)` as each one returns."""
+    # 3. Each factory just builds an Agent object + prompt, per model tier
+    factories = {
+        "assets":      partial(make_assets_agent, tool),
+        "liabilities": partial(make_liabilities_agent, tool),
+        "equity":      partial(make_equity_agent, tool),
+    }
 
     prompt = "Return the most recent balance sheet."
-    agents_elapsed = time.perf_counter() - agents_start
-    pbar.write(f"Section agent creation took {agents_elapsed:.2f}s")
-    pbar.update(1)
+
+    async def extract(section: str, section_tiers):
+        resp = await _run_tiered(f"sections.{section}", factories[section], prompt, section_tiers,
+                                 partial(check_section, section=section), cache, doc_key, log, hedge)
+        if on_table is not None:
+            on_table(resp.final_output)
+        return resp.final_output
 
     # 4. Run the three section agents in parallel
-    start_sections = time.perf_counter()
     async with asyncio.TaskGroup() as tg:
-        t_assets      = tg.create_task(Runner.run(assets_agent,      prompt))
-        t_liabilities = tg.create_task(Runner.run(liabilities_agent, prompt))
-        t_equity      = tg.create_task(Runner.run(equity_agent,      prompt))
-
-    assets_tbl      = t_assets.result().final_output
-    liabilities_tbl = t_liabilities.result().final_output
-    equity_tbl      = t_equity.result().final_output
+        t_assets      = tg.create_task(extract("assets",      tiers))
+        t_liabilities = tg.create_task(extract("liabilities", tiers))
+        t_equity      = tg.create_task(extract("equity",      tiers))
 
-    sections_elapsed = time.perf_counter() - start_sections
-    pbar.write(f"Section agents took {sections_elapsed:.2f}s")
+    assets_tbl      = t_assets.result()
+    liabilities_tbl = t_liabilities.result()
+    equity_tbl      = t_equity.result()
 
-    pbar.update(1)
+    # each section can pass its own checks and the three still not balance:
+    # redo the sections a cheaper tier resolved on the top tier
+    problems = check_sections((assets_tbl, liabilities_tbl, equity_tbl)) if tiers else []
+    if problems and len(tiers) > 1:
+        top = tiers[-1]
+        resolved = {r.stage: r.tier for r in log or []}
+        redo = [sec for sec in factories if resolved.get(f"sections.{sec}") != top.name]
+        if redo:
+            pbar.write(f"Sections do not balance ({summarize_problems(problems)}); "
+                       f"re-running {', '.join(redo)} on {top.name}")
+            async with asyncio.TaskGroup() as tg:
+                redone = {sec: tg.create_task(extract(sec, (top,))) for sec in redo}
+            assets_tbl      = redone["assets"].result()      if "assets"      in redone else assets_tbl
+            liabilities_tbl = redone["liabilities"].result() if "liabilities" in redone else liabilities_tbl
+            equity_tbl      = redone["equity"].result()      if "equity"      in redone else equity_tbl
     """
     expander = make_expander_agent(tool)
 
     start_expand = time.perf_counter()
     async with asyncio.TaskGroup() as tg:
-        ta = tg.create_task(Runner.run(expander, assets_tbl.model_dump_json()))
-        tl = tg.create_task(Runner.run(expander, liabilities_tbl.model_dump_json()))
-        te = tg.create_task(Runner.run(expander, equity_tbl.model_dump_json()))
+        ta = tg.create_task(run_agent(expander, assets_tbl.model_dump_json()))
+        tl = tg.create_task(run_agent(expander, liabilities_tbl.model_dump_json()))
+        te = tg.create_task(run_agent(expander, equity_tbl.model_dump_json()))
 
     assets_tbl      = (await ta).final_output
     liabilities_tbl = (await tl).final_output
@@ -145,79 +258,808 @@ async def build_balance_sheet(
     expand_elapsed = time.perf_counter() - start_expand
     pbar.write(f"Expander agents took {expand_elapsed:.2f}s")
     """
-    pbar.update(1)
-    
-    # 5. Assemble
-    
-    assembler_payload ={
-            "company_name": name,     # can be parsed from index_html if needed
-            "cik":          str(cik),
-            "filing_date":  filingDate,
-            "period_end":   period,
-            "assets_table":      assets_tbl.model_dump(),
-            "liabilities_table": liabilities_tbl.model_dump(),
-            "equity_table":      equity_tbl.model_dump()
-        }
+    return assets_tbl, liabilities_tbl, equity_tbl
 
-    assembled = await Runner.run(
-        assembler_agent,
-        [
-            {"role":"user", "content": json.dumps(assembler_payload)}
-        ]
-    )
 
+async def _extract_sections_combined(tool, pbar, cache=None, doc_key: str = "", tiers=None, log=None,
+                                     hedge=None, on_table=None):
+    """One agent returns all three section tables in a single structured output."""
+    resp = await _run_tiered("sections", partial(make_combined_section_agent, tool),
+                             "Return the most recent balance sheet.", tiers, check_combined,
+                             cache, doc_key, log, hedge)
+    sections: BalanceSheetSections = resp.final_output
+    tables = sections.assets, sections.liabilities, sections.equity
+    if on_table is not None:
+        for table in tables:
+            on_table(table)
+    return tables
 
 
-    full_bs = assembled.final_output
-    pbar.update(1)
+async def _repair_sections(tables, tool, pbar, tiers=None, log=None, hedge=None,
+                           max_attempts: int = 2, on_table=None):
+    """
+    Re-extracts only the section tables validation.section_suspects blames,
+    telling each agent what was wrong, for at most `max_attempts` rounds:
+    every table that fails its own checks at once, else (only the balance
+    fails) one suspect per round, least-tried first.  A new table replaces
+    the old one unless it makes the sheet's problems worse.  Runs on the
+    top tier of `tiers` and uncached; one CascadeRecord per re-extracted
+    section goes to `log`.
+    """
+    factories = {
+        "assets":      partial(make_assets_agent, tool),
+        "liabilities": partial(make_liabilities_agent, tool),
+        "equity":      partial(make_equity_agent, tool),
+    }
+    current = dict(zip(factories, tables))
+    tries: Dict[str, list] = {}             # section -> problems sent on each attempt
+    top = tuple(tiers[-1:]) if tiers else None
+
+    async def reextract(section: str, problems: list):
+        input = ("Return the most recent balance sheet.\n\n"
+                 "A previous extraction of this section was rejected:\n"
+                 + "\n".join(f"- {p}" for p in problems) + "\n"
+                 f"Previous extraction: {current[section].model_dump_json()}\n"
+                 "Check the units multiplier, missing or duplicated line items, subtotal lines "
+                 "listed as items and that every value is from the most recent balance sheet date.")
+        resp = await _run_tiered(f"section_repair.{section}", factories[section], input, top,
+                                 partial(check_section, section=section), None, "", None, hedge)
+        return resp.final_output
 
-    format_string = "%Y,%m,%d"
-    
-    sub_urls_index = get_all_sub_filings(ec, cik,dt.strptime(f'{page.metadata.get("Filing Date"):%Y,%m,%d}',format_string).date())
-    sub_urls = []
-    for url in sub_urls_index:
-        sub_urls.append([u for u in Util.GetRelatedUrls(str(ec.Get(url).content).replace("/ix?doc=",""))])
+    for attempt in range(1, max_attempts + 1):
+        suspects = section_suspects(list(current.values()))
+        if not suspects:
+            break
+        if not any(check_section(current[sec], sec) for sec, _ in suspects):
+            suspects = [min(suspects, key=lambda sp: len(tries.get(sp[0], [])))]
+        for sec, problems in suspects:
+            tries.setdefault(sec, []).append(problems)
+            pbar.write(f"Section check: {sec} rejected ({summarize_problems(problems)}); "
+                       f"re-extracting, attempt {attempt}/{max_attempts}")
+        async with asyncio.TaskGroup() as tg:
+            redone = {sec: tg.create_task(reextract(sec, problems)) for sec, problems in suspects}
+        for sec, task in redone.items():
+            candidate = {**current, sec: task.result()}
+            if len(check_sections(list(candidate.values()))) <= len(check_sections(list(current.values()))):
+                current = candidate
+                if on_table is not None:
+                    on_table(task.result())
 
-    start_updates_vs = time.perf_counter()
-    
-    vs_updates = create_vector_store_for_updates(ec, name=f"{cik}_updates_vector", urls=sub_urls,
-                                                  client=openai_client)
-    
-    updates_vs_elapsed = time.perf_counter() - start_updates_vs
-    pbar.write(f"Updates vector store creation took {updates_vs_elapsed:.2f}s")
+    if tries:
+        remaining = check_sections(list(current.values()))
+        pbar.write(f"Section check: {'converged' if not remaining else 'still failing'} after "
+                   f"{sum(map(len, tries.values()))} re-extraction(s)"
+                   + (f" ({summarize_problems(remaining)})" if remaining else ""))
+        if log is not None:
+            log.extend(CascadeRecord(stage=f"section_repair.{sec}", tier=top[0].name if top else STRONG.name,
+                                     attempts=len(attempts), accepted=not remaining,
+                                     rejected=[summarize_problems(p) for p in attempts])
+                       for sec, attempts in tries.items())
+    return tuple(current.values())
 
-    pbar.update(1)
 
-    tool_updates = make_file_search_tool(vs_updates.id, max_k=12)
-    update_agent = make_update_agent(tool_updates)
-    accountant_agent = make_accountant_agent(tool_updates)
+async def scan_updates(sheet: FullBalanceSheet, tool, tiers=None, cache=None, doc_key: str = "",
+                       log=None, hedge=None, record=None) -> UpdateSummary:
+    """
+    The update agent: changes since `sheet` found in the filings behind
+    `tool`.  `record` is an optional record_change tool (see
+    _scan_and_price) the agent calls as it confirms each change.
+    """
+    resp = await _run_tiered("updates", partial(make_update_agent, tool, record_change=record),
+                             sheet.model_dump_json(), tiers, check_update_summary, cache, doc_key,
+                             log, hedge)
+    return resp.final_output
 
-    pbar.update(1)
 
-    start_update_agents = time.perf_counter()
+async def _scan_updates_sharded(sheet: FullBalanceSheet, index: SearchIndex, shards, tiers=None, cache=None,
+                                variant: str = "", log=None, hedge=None,
+                                concurrency: int = 8, record=None) -> UpdateSummary:
+    """
+    One update agent per shard of subsequent filings, each searching only its
+    own filings, at most `concurrency` at a time; the results are merged with
+    duplicates of the same event folded together (see updates.py).
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def scan(shard):
+        tool = make_tool(index.retriever, [accession_from_url(u) for u in shard])
+        async with slots:
+            return await scan_updates(sheet, tool, tiers, cache, index.doc_key(variant, shard), log,
+                                      hedge, record)
+
+    async with asyncio.TaskGroup() as tg:
+        tasks = [tg.create_task(scan(shard)) for shard in shards]
+    return merge_update_summaries([t.result() for t in tasks])
+
+
+async def price_changes(updates: UpdateSummary, tool, tiers=None, cache=None, doc_key: str = "",
+                        log=None, hedge=None, batch_size: int = 1, concurrency: int = 8,
+                        on_priced=None, write=None) -> UpdateSummary:
+    """
+    A copy of `updates` with every unpriced change's delta priced by the accountant
+    agent: one run per `batch_size` changes, `concurrency` at a time.  Each
+    delta is set on the change it was asked for, so a short or long answer
+    can never shift deltas onto the wrong change: a batch answered with the
+    wrong number of deltas is re-priced one change at a time, and a single
+    change that still gets no delta keeps delta=None (reported to
+    `write(message)`, e.g. pbar.write).  `on_priced(change)` is called as
+    each change is priced.
+
+    Every run sees only its own changes, so with an AgentCache a change
+    priced by an earlier run over the same documents (`doc_key`) is served
+    from the cache.
+    """
+    priced = updates.model_copy(deep=True)
+    slots  = asyncio.Semaphore(concurrency)
+    todo   = [ch for ch in priced.changes if ch.delta is None]     # e.g. priced by _scan_and_price
+
+    async def price(changes: list) -> None:
+        request = UpdateSummary(changes=[ch.model_copy(update={"delta": None}) for ch in changes])
+        async with slots:
+            resp = await _run_tiered("deltas", partial(make_accountant_agent, tool),
+                                     request.model_dump_json(), tiers,
+                                     partial(check_deltas, changes=len(changes)),
+                                     cache, doc_key, log, hedge)
+        deltas: BalanceSheetDeltaList = resp.final_output
+        if len(deltas.deltas) != len(changes):
+            if len(changes) > 1:
+                async with asyncio.TaskGroup() as tg:
+                    for ch in changes:
+                        tg.create_task(price([ch]))
+                return
+            if write is not None:
+                write(f"Accountant returned {len(deltas.deltas)} deltas for {changes[0].update_log!r}")
+            return
+        for ch, delta in zip(changes, deltas.deltas):
+            ch.delta = delta
+            if on_priced is not None:
+                on_priced(ch)
+
+    batches = [todo[i:i + max(batch_size, 1)] for i in range(0, len(todo), max(batch_size, 1))]
     async with asyncio.TaskGroup() as tg:
-        t_updates = tg.create_task(
-            Runner.run(update_agent, full_bs.model_dump_json())
+        for batch in batches:
+            tg.create_task(price(batch))
+    return priced
+
+
+def repricer(tool, sheet: FullBalanceSheet, tiers=None, log=None, hedge=None,
+             concurrency: int = 8):
+    """
+    apply_updates' `reprice`: one accountant run for a change whose delta
+    failed validation, told the rejected delta, what was wrong with it and
+    which line items the sheet has.  Not cached, so a retry is a new answer.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    names = {t.section: [l.line_item for l in t.lines] for t in sheet.tables}
+
+    async def reprice(change: FilingChange, problems: list[str]) -> FilingChange:
+        request  = UpdateSummary(changes=[change.model_copy(update={"delta": None})])
+        rejected = change.delta.model_dump_json() if change.delta is not None else "none"
+        input = (f"{request.model_dump_json()}\n\n"
+                 f"A previous delta for this change was rejected: {rejected}\n"
+                 "Problems:\n" + "\n".join(f"- {p}" for p in problems) + "\n\n"
+                 "Return one corrected, balanced delta.  Use these existing line items "
+                 f"where they apply: {json.dumps(names)}")
+        async with slots:
+            resp = await _run_tiered("repair", partial(make_accountant_agent, tool), input, tiers,
+                                     partial(check_deltas, changes=1), None, "", log, hedge)
+        deltas = resp.final_output.deltas
+        return change.model_copy(update={"delta": deltas[0] if len(deltas) == 1 else None})
+
+    return reprice
+
+
+async def _scan_and_price(scan, price, concurrency: int = 8, on_found=None,
+                          on_priced=None, write=None) -> UpdateSummary:
+    """
+    Overlaps the update scan with the accountant.  `scan(record)` runs the
+    update agent(s) with the record_change tool `record`; every change the
+    agent records is priced right away by `price(change)` (returning the
+    priced copy), `concurrency` at a time, while the scan goes on.
+    Repeated recordings of one change (same updates.change_key: hedged or
+    cascaded re-runs, shards that overlap) are priced once.
+
+    When the scan returns, each of its changes takes the delta priced for
+    the recorded change with the same change_key; nothing is matched by
+    similarity, so a delta never lands on a different event.  Changes
+    that were never recorded, or whose pricing failed (reported to
+    `write(message)`), keep delta=None for price_changes to price.
+    `on_found(change)` / `on_priced(change)` are called as changes are
+    recorded / priced and once more with on_found for final changes that
+    were never recorded.
+    """
+    recorded: Dict[tuple, FilingChange] = {}
+    tasks: list[asyncio.Task] = []
+    slots = asyncio.Semaphore(concurrency)
+
+    async def price_one(change: FilingChange) -> FilingChange:
+        async with slots:
+            done = await price(change)
+        if done.delta is not None and on_priced is not None:
+            on_priced(done)
+        return done
+
+    def on_change(change: FilingChange) -> None:
+        if change_key(change) in recorded:
+            return
+        recorded[change_key(change)] = change
+        if on_found is not None:
+            on_found(change)
+        tasks.append(asyncio.create_task(price_one(change)))
+
+    try:
+        updates: UpdateSummary = await scan(make_record_change_tool(on_change))
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        for t in tasks:
+            t.cancel()
+
+    priced: Dict[tuple, BalanceSheetDelta] = {}
+    for key, r in zip(recorded, results):
+        if isinstance(r, BaseException):
+            if write is not None:
+                write(f"Pipelined pricing failed ({type(r).__name__}: {r}); left to the accountant stage")
+        elif r.delta is not None:
+            priced[key] = r.delta
+
+    updates = updates.model_copy(deep=True)
+    for change in updates.changes:
+        key = change_key(change)
+        if key in priced and change.delta is None:
+            change.delta = priced[key].model_copy(deep=True)
+        elif on_found is not None and key not in recorded:
+            on_found(change)
+    return updates
+
+
+def resolve_cascade(cascade) -> Dict[str, tuple]:
+    """cascade=True -> DEFAULT_CASCADE; a dict overrides it per stage; False -> {}."""
+    if not cascade:
+        return {}
+    if cascade is True:
+        return dict(DEFAULT_CASCADE)
+    return {**DEFAULT_CASCADE, **{k: tuple(v) for k, v in cascade.items()}}
+
+
+def _degraded_pro_forma(assembled: FullBalanceSheet, result, cover) -> FullBalanceSheet:
+    """The filing's sheet standing in for the pro forma, marked with why."""
+    sheet    = assembled.model_copy(deep=True)
+    degraded = [t for t in result.degraded() if t.name in UPDATE_STAGES]
+    cause = next((t for t in degraded if t.status in ("failed", "timeout")), None) \
+        or next(iter(degraded), None)
+    if cause is None:                   # no stage to blame, e.g. a pro forma stage that returned None
+        sheet.update_status = "failed"
+        sheet.update_error  = "pro_forma: no result"
+    else:
+        sheet.update_status = cause.status
+        sheet.update_error  = f"{cause.name}: {cause.error}"
+    if cover is not None:
+        sheet.shares_outstanding_common    = cover.common
+        sheet.shares_outstanding_preferred = cover.preferred
+    return sheet
+
+
+def resolve_hedge(hedge) -> Dict[str, HedgePolicy]:
+    """hedge=True -> DEFAULT_HEDGE; a dict {stage: HedgePolicy} hedges only those stages."""
+    if not hedge:
+        return {}
+    if hedge is True:
+        return dict(DEFAULT_HEDGE)
+    return dict(hedge)
+
+
+@dataclass
+class BuildOptions:
+    """
+    How build_balance_sheet runs.  The defaults are the original pipeline;
+    every newer feature is opt-in.
+
+    `retrieval="local"` skips the hosted vector stores altogether and gives
+    the agents an in-process BM25 search tool over the preprocessed filings
+    (see local_search.py).  With `incremental_updates` the hosted
+    subsequent-filings store is kept per CIK and only filings not yet
+    indexed are uploaded (see sync_updates_vector_store).  `preprocess`
+    uploads compact markdown instead of raw filing HTML.
+
+    `extraction="xbrl"` reads the section tables straight from the filing's
+    inline XBRL (see xbrl.py) and only falls back to the section agents when
+    the XBRL is missing or fails validation.  `extraction="combined"` asks
+    one agent for all three sections instead of running the three section
+    agents in parallel (compare the two with benchmark_extraction.py).
+
+    After extraction the checked_sections stage finds the section table(s)
+    that fail their subtotal or keep the sheet from balancing and re-runs
+    only those section agents with the discrepancy in the prompt, for up
+    to `section_repair_attempts` rounds (see _repair_sections).
+
+    `cover_shares` takes the share counts from the latest dei cover page
+    plus share changes filed after it (see shares.py) instead of the update
+    agent's estimate whenever a cover page is available.
+
+    `assembler="python"` merges the section tables with assemble.py and
+    records failed subtotal / balance checks in `diagnostics`;
+    `assembler="llm"` runs the o3 assembler agent.
+
+    With `checkpoint` every stage's output is saved under
+    `checkpoint_root` keyed by CIK + accession + the options above (see
+    checkpoint.py), replacing what an earlier run of the same filing
+    saved.  `resume=True` (which implies `checkpoint`) loads the stages a
+    previous run already finished instead of re-running them, so a failure
+    in the update or accountant stage does not repeat the uploads and
+    section agents.
+
+    `cache_stages` names the stages whose agent runs build_balance_sheet's
+    `agent_cache` memoizes.
+
+    With `trace_dir`, every stage, agent run, search call, EdgarCache fetch
+    and vector-store upload is recorded as a span (see telemetry.py) and
+    written to `<trace_dir>/<cik>_<accession>.jsonl` (appended, for
+    aggregation across runs) and `.trace.json` (Chrome trace format).
+    Stages named in `profile_stages` also run under cProfile, with the
+    stats dumped next to the trace.
+
+    `cascade=True` runs the agent stages on a cheap model tier first and
+    escalates only when the stage's validators (validation.py) reject the
+    output; pass a dict {stage: (tier, ...)} to override DEFAULT_CASCADE.
+    Which tier resolved each stage is printed and appended to
+    cache/cascade_log.jsonl for tuning.
+
+    `hedge=True` launches a duplicate of any agent run that is still going
+    past its stage's observed latency percentile and keeps the first valid
+    output (see runner.run_hedged); pass {stage: HedgePolicy} to hedge only
+    some stages.  Hedge and duplicate-win rates are printed at the end.
+
+    `deadline` bounds the whole run in seconds and `stage_timeouts` single
+    stages (see pipeline.py); transient API errors inside a stage are
+    retried with backoff by runner.run_agent.  With `degrade` (the default
+    whenever a deadline is set) a failure or timeout in the updates branch
+    (UPDATE_STAGES) no longer fails the call: the pro forma is then a copy
+    of the filing's sheet with `update_status` "timeout" / "failed" /
+    "skipped" and `update_error` naming the stage.  A timeout in the base
+    branch still raises TimeoutError.
+
+    The update stage runs one update agent per `update_shard_size`
+    subsequent filings, `update_concurrency` at a time, and merges their
+    findings (see updates.py); 0 scans all filings with a single agent.
+    Sharding needs per-filing search, i.e. local retrieval or the
+    incremental hosted store; otherwise one agent is used.
+
+    The accountant prices `accountant_batch_size` changes per agent run,
+    `accountant_concurrency` runs at a time, and each delta is attached to
+    the change it was asked for.  Each run is cached on its own, so a
+    re-run over the same documents reuses every delta already priced.
+
+    With `pipeline_pricing` the update agent hands over each change through
+    a record_change tool as soon as it has confirmed it, and the accountant
+    starts pricing it while the scan is still running (_scan_and_price);
+    the deltas stage then only prices what the scan never recorded.
+
+    Every delta is validated as it is applied (validation.check_delta);
+    changes that fail are re-priced with their problems in the prompt, all
+    at once, for up to `repair_attempts` rounds, and whatever still fails
+    is left out of the pro forma and listed in `update_errors`.
+    """
+    # retrieval / extraction
+    retrieval:               Literal["hosted", "local"] = "hosted"
+    incremental_updates:     bool = False
+    preprocess:              bool = False
+    extraction:              Literal["llm", "combined", "xbrl"] = "llm"
+    section_repair_attempts: int  = 2
+    cover_shares:            bool = False
+    assembler:               Literal["python", "llm"] = "llm"
+    # checkpoints, caching, tracing
+    checkpoint:              bool = False
+    resume:                  bool = False
+    checkpoint_root:         str | None = None
+    cache_stages:            Iterable[str] = CACHED_STAGES
+    trace_dir:               str | None = None
+    profile_stages:          Iterable[str] = ()
+    # model tiers, hedging, time budgets
+    cascade:                 bool | Dict[str, Sequence[ModelTier]] = False
+    hedge:                   bool | Dict[str, HedgePolicy] = False
+    deadline:                float | None = None
+    stage_timeouts:          Dict[str, float] | None = None
+    degrade:                 bool | None = None
+    # updates and accountant
+    update_shard_size:       int  = 1
+    update_concurrency:      int  = 8
+    accountant_batch_size:   int  = 1
+    accountant_concurrency:  int  = 8
+    pipeline_pricing:        bool = False
+    repair_attempts:         int  = 2
+
+
+async def build_balance_sheet(
+        cik: int | str,
+        index_url: str,
+        ec: EdgarCacheClient,
+        openai_client=None,
+        registry: VectorStoreRegistry | None = None,
+        agent_cache: AgentCache | None = None,
+        on_event: Callable[[BuildEvent], None] | None = None,
+        options: BuildOptions | None = None,
+        **overrides,
+) -> tuple[FullBalanceSheet, FullBalanceSheet]:
+    """
+    Main entry-point called by CLI / notebooks.
+
+    Returns both the fully expanded balance sheet from the filing and the
+    pro forma balance sheet with subsequent updates applied.
+
+    `options` (a BuildOptions) selects the pipeline variant; keyword
+    arguments override single fields of it, e.g.
+    build_balance_sheet(cik, url, ec, extraction="xbrl").  With the
+    defaults the build runs as it always has.
+
+    With a `registry`, vector stores whose document set was already uploaded
+    by an earlier run are reused instead of re-created.
+
+    With an `agent_cache`, agent runs in the stages named in
+    `options.cache_stages` are memoized on disk (see agent_cache.py): the
+    same agent over the same input and the same filing documents returns
+    the stored output.
+
+    `on_event` is called on the event loop with each progress event
+    (events.py); stream_balance_sheet wraps this as an async generator.
+    """
+    opts = replace(options or BuildOptions(), **overrides)
+    start_program = time.perf_counter()
+
+    ckpt = None
+    if opts.checkpoint or opts.resume:
+        ckpt = StageCheckpoint(cik, accession_from_url(index_url), root=opts.checkpoint_root, options={
+            "retrieval":           opts.retrieval,
+            "extraction":          opts.extraction,
+            "preprocess":          opts.preprocess,
+            "incremental_updates": opts.incremental_updates,
+            "cover_shares":        opts.cover_shares,
+            "assembler":           opts.assembler,
+            "update_shard_size":   opts.update_shard_size,
+            "accountant_batch":    opts.accountant_batch_size,
+            "repair_attempts":     opts.repair_attempts,
+            "section_repair":      opts.section_repair_attempts,
+        })
+        if not opts.resume:
+            ckpt.clear()
+
+    stage_tiers = resolve_cascade(opts.cascade)
+    cascade_log: list[CascadeRecord] = []
+    stage_hedge = resolve_hedge(opts.hedge)
+    degrade = opts.degrade if opts.degrade is not None else opts.deadline is not None
+
+    streamed: set = set()           # stages whose events went out while they ran
+
+    def emit(event: BuildEvent) -> None:
+        if on_event is not None:
+            on_event(event)
+
+    def emit_stage(name: str, result) -> None:
+        if name in streamed or result is None:
+            return
+        if name in ("sections", "checked_sections"):
+            for table in result:
+                emit(SectionExtracted(table))
+        elif name == "assembled":
+            emit(SheetAssembled(result))
+        elif name == "updates":
+            for change in result.changes:
+                emit(ChangeFound(change))
+        elif name == "deltas":
+            for change in result.changes:
+                if change.delta is not None:
+                    emit(ChangePriced(change))
+
+    def section_extracted(table) -> None:
+        streamed.add("sections")
+        emit(SectionExtracted(table))
+
+    def change_priced(change) -> None:
+        streamed.add("deltas")
+        emit(ChangePriced(change))
+
+    def change_found(change) -> None:
+        streamed.add("updates")
+        emit(ChangeFound(change))
+
+    def stage_cache(stage: str):
+        return agent_cache if agent_cache is not None and stage in opts.cache_stages else None
+
+    # search results depend on how the documents were indexed, not just which
+    docs_variant = f"{opts.retrieval}:{PREPROCESS_VERSION if opts.preprocess else 'raw'}"
+
+    def store_alive(index) -> bool:
+        """A checkpointed hosted store may have expired since it was saved."""
+        if index is None or not isinstance(index.retriever, str):
+            return True
+        try:
+            vs = (openai_client or get_openai_client()).vector_stores.retrieve(index.retriever)
+        except Exception:
+            return False
+        return getattr(vs, "status", None) != "expired"
+
+    # -- 1. filing metadata ---------------------------------------------------
+    def filing_stage():
+        return load_filing(ec, cik, index_url)
+
+    # -- 2-4. section tables: inline-XBRL fast path, else the section agents ----
+    def xbrl_stage(filing):
+        if opts.extraction != "xbrl":
+            return None
+        try:
+            sheet = extract_from_filing(ec, filing["doc_urls"])
+        except XbrlExtractionError as exc:
+            pbar.write(f"XBRL fast path unavailable, using section agents: {exc}")
+            return None
+        pbar.write(f"XBRL extraction used context {sheet.context}, as of {sheet.period_end}")
+        return sheet
+
+    def base_store_stage(filing, xbrl):
+        if xbrl is not None:
+            return None
+        fetches, prepped = [], []
+        if opts.retrieval == "local":
+            retriever = create_local_index(ec, filing["doc_urls"], fetch_log=fetches, prep_log=prepped)
+        else:
+            retriever = create_vector_store(ec, name=f"{cik}_10Q_vector", urls=filing["doc_urls"],
+                                            client=openai_client, fetch_log=fetches, registry=registry,
+                                            preprocess=opts.preprocess, prep_log=prepped).id
+        _report_build(pbar, "Base filing", fetches, prepped)
+        return SearchIndex(retriever, filing_digests(fetches))
+
+    async def sections_stage(xbrl, base_store):
+        if xbrl is not None:
+            return xbrl.tables
+        extract = _extract_sections_combined if opts.extraction == "combined" else _extract_sections_llm
+        return await extract(make_tool(base_store.retriever), pbar, stage_cache("sections"),
+                             base_store.doc_key(docs_variant),
+                             stage_tiers.get("sections"), cascade_log, stage_hedge.get("sections"),
+                             section_extracted)
+
+    async def checked_sections_stage(sections, base_store):
+        streamed.add("checked_sections")    # repaired tables go out as they arrive
+        if base_store is None:              # XBRL tables, validated in xbrl_stage
+            return sections
+        return await _repair_sections(sections, make_tool(base_store.retriever), pbar,
+                                      stage_tiers.get("sections"), cascade_log,
+                                      stage_hedge.get("sections"), opts.section_repair_attempts,
+                                      section_extracted)
+
+    # -- 5. assemble -----------------------------------------------------------
+    async def assembled_stage(filing, xbrl, checked_sections):
+        assets_tbl, liabilities_tbl, equity_tbl = checked_sections
+        if opts.assembler == "python":
+            # XBRL figures are compared with the rounding allowance they were validated with
+            sheet = assemble_balance_sheet(filing["company_name"], str(cik), filing["filing_date"],
+                                           filing["period_end"], assets_tbl, liabilities_tbl, equity_tbl,
+                                           rounding=xbrl.rounding if xbrl is not None else 0.0)
+            for d in sheet.diagnostics or []:
+                pbar.write(f"Assembly check failed: {d.message}")
+            return sheet
+
+        assembler_payload ={
+                "company_name": filing["company_name"],     # can be parsed from index_html if needed
+                "cik":          str(cik),
+                "filing_date":  filing["filing_date"],
+                "period_end":   filing["period_end"],
+                "assets_table":      assets_tbl.model_dump(),
+                "liabilities_table": liabilities_tbl.model_dump(),
+                "equity_table":      equity_tbl.model_dump()
+            }
+
+        assembled = await _run_tiered(
+            "assembled",
+            make_assembler_agent,      # no tool needed
+            [
+                {"role":"user", "content": json.dumps(assembler_payload)}
+            ],
+            stage_tiers.get("assembled"), check_sheet,
+            cache=stage_cache("assembled"), log=cascade_log, hedge=stage_hedge.get("assembled")
         )
+        return assembled.final_output
+
+    # -- 6. subsequent filings (independent of the section branch) --------------
+    def sub_filings_stage(filing):
+        return get_all_sub_filings(ec, cik, filing["base_date"])
+
+    def updates_store_stage(filing, sub_filings):
+        fetches, prepped = [], []
+        if opts.retrieval == "local":
+            sub_urls = [u for url in sub_filings for u in get_filing_doc_urls(ec, url)]
+            retriever = create_local_index(ec, sub_urls, fetch_log=fetches, prep_log=prepped)
+        elif opts.incremental_updates:
+            digests = {}                    # only new filings are fetched
+            retriever = sync_updates_vector_store(ec, cik, sub_filings, since=filing["base_date"],
+                                                  client=openai_client, fetch_log=fetches,
+                                                  preprocess=opts.preprocess, prep_log=prepped,
+                                                  registry=registry, digests=digests).id
+            _report_build(pbar, "Subsequent filings", fetches, prepped)
+            return SearchIndex(retriever, digests)
+        else:
+            sub_urls = [get_filing_doc_urls(ec, url) for url in sub_filings]
+            retriever = create_vector_store_for_updates(ec, name=f"{cik}_updates_vector", urls=sub_urls,
+                                                        client=openai_client, fetch_log=fetches,
+                                                        registry=registry, preprocess=opts.preprocess,
+                                                        prep_log=prepped).id
+        _report_build(pbar, "Subsequent filings", fetches, prepped)
+        return SearchIndex(retriever, filing_digests(fetches))
+
+    def cover_stage(sub_filings):
+        if not opts.cover_shares:
+            return None
+        return find_latest_cover_shares(ec, [index_url, *sub_filings])
+
+    # -- 7. updates + accountant -----------------------------------------------
+    async def updates_stage(assembled, updates_store, sub_filings):
+        # per-filing search needs accession-tagged documents
+        shardable = opts.retrieval == "local" or opts.incremental_updates
+        shards = shard_filings(sub_filings, opts.update_shard_size) if shardable else []
+
+        async def scan(record=None):
+            if len(shards) > 1:
+                pbar.write(f"Scanning {len(sub_filings)} subsequent filings in {len(shards)} shards")
+                return await _scan_updates_sharded(assembled, updates_store, shards,
+                                                   stage_tiers.get("updates"), stage_cache("updates"),
+                                                   docs_variant, cascade_log, stage_hedge.get("updates"),
+                                                   opts.update_concurrency, record)
+            return await scan_updates(assembled, make_tool(updates_store.retriever),
+                                      stage_tiers.get("updates"), stage_cache("updates"),
+                                      updates_store.doc_key(docs_variant),
+                                      cascade_log, stage_hedge.get("updates"), record)
+
+        if not opts.pipeline_pricing:
+            return await scan()
 
-    updates: UpdateSummary = (await t_updates).final_output
-    update_agents_elapsed = time.perf_counter() - start_update_agents
-    pbar.write(f"Update Agent run took {update_agents_elapsed:.2f}s")
-    accountant_resp = await Runner.run(accountant_agent, updates.model_dump_json())
-    delta_list: BalanceSheetDeltaList = accountant_resp.final_output
+        async def price(change):
+            priced = await price_changes(UpdateSummary(changes=[change]),
+                                         make_tool(updates_store.retriever),
+                                         stage_tiers.get("deltas"), stage_cache("deltas"),
+                                         updates_store.doc_key(docs_variant), cascade_log,
+                                         stage_hedge.get("deltas"), write=pbar.write)
+            return priced.changes[0]
 
-    for ch, delta in zip(updates.changes, delta_list.deltas):
-        ch.delta = delta
+        return await _scan_and_price(scan, price, opts.accountant_concurrency, change_found,
+                                     change_priced, pbar.write)
 
-    
-    start_apply = time.perf_counter()
-    updated_bs = await apply_updates(full_bs, updates)
-    apply_elapsed = time.perf_counter() - start_apply
-    pbar.write(f"Applying updates took {apply_elapsed:.2f}s")
+    async def deltas_stage(updates, updates_store):
+        if "deltas" not in streamed:            # priced by a resumed pipelined scan
+            for change in updates.changes:
+                if change.delta is not None:
+                    change_priced(change)
+        return await price_changes(updates, make_tool(updates_store.retriever),
+                                   stage_tiers.get("deltas"), stage_cache("deltas"),
+                                   updates_store.doc_key(docs_variant),
+                                   cascade_log, stage_hedge.get("deltas"),
+                                   opts.accountant_batch_size, opts.accountant_concurrency,
+                                   change_priced, pbar.write)
 
-    pbar.update(1)
+    # -- 8. pro forma ------------------------------------------------------------
+    async def pro_forma_stage(assembled, deltas, cover, updates_store):
+        updates: UpdateSummary = deltas
+        # Share counts: latest dei cover page + share deltas filed after it
+        if cover is not None:
+            common, preferred = merge_share_counts(cover, updates.changes)
+            pbar.write(f"Cover page shares as of {cover.as_of}: {cover.common} common -> "
+                       f"{common} after subsequent changes (agent said {updates.total_common_shares})")
+            updates.total_common_shares = common
+            if preferred is not None:
+                updates.total_preferred_shares = preferred
+        reprice = repricer(make_tool(updates_store.retriever), assembled, stage_tiers.get("deltas"),
+                           cascade_log, stage_hedge.get("deltas"), opts.accountant_concurrency)
+        return await apply_updates(assembled, updates, reprice, opts.repair_attempts, pbar.write)
+
+    stages = [
+        Stage("filing",        filing_stage,        blocking=True),
+        Stage("xbrl",          xbrl_stage,          ("filing",), blocking=True),
+        Stage("base_store",    base_store_stage,    ("filing", "xbrl"), blocking=True,
+              reuse=store_alive),
+        Stage("sections",      sections_stage,      ("xbrl", "base_store")),
+        Stage("checked_sections", checked_sections_stage, ("sections", "base_store")),
+        Stage("assembled",     assembled_stage,     ("filing", "xbrl", "checked_sections")),
+        Stage("sub_filings",   sub_filings_stage,   ("filing",), blocking=True),
+        Stage("updates_store", updates_store_stage, ("filing", "sub_filings"), blocking=True,
+              reuse=store_alive),
+        Stage("cover",         cover_stage,         ("sub_filings",), blocking=True),
+        Stage("updates",       updates_stage,       ("assembled", "updates_store", "sub_filings")),
+        Stage("deltas",        deltas_stage,        ("updates", "updates_store")),
+        Stage("pro_forma",     pro_forma_stage,     ("assembled", "deltas", "cover", "updates_store"),
+              tolerates=("cover",)),
+    ]
+    for st in stages:
+        st.timeout  = (opts.stage_timeouts or {}).get(st.name)
+        st.optional = degrade and st.name in UPDATE_STAGES
+
+    pbar = tqdm(total=len(stages), desc="Build balance sheet")
+
+    def on_stage_done(timing: StageTiming, result):
+        emit(StageFinished(timing))
+        emit_stage(timing.name, result)
+        if timing.status in ("failed", "timeout", "skipped"):
+            pbar.write(f"{timing.name} {timing.status}: {timing.error}")
+        elif timing.resumed:
+            pbar.write(f"{timing.name} resumed from checkpoint")
+        else:
+            pbar.write(f"{timing.name} took {timing.elapsed:.2f}s "
+                       f"(done at +{timing.end - start_program:.2f}s)")
+        pbar.update(1)
+
+    run_name = f"{cik}_{accession_from_url(index_url)}"
+    trace    = Trace(run=run_name) if opts.trace_dir else None
+    with (tracing(trace) if trace is not None else contextlib.nullcontext()):
+        result = await run_stages(stages, on_stage_done, checkpoint=ckpt,
+                                  profile=opts.profile_stages,
+                                  profile_dir=os.path.join(opts.trace_dir or ".",
+                                                           f"{run_name}_profile"),
+                                  deadline=opts.deadline)
+
+    if trace is not None:
+        os.makedirs(opts.trace_dir, exist_ok=True)
+        trace.to_jsonl(os.path.join(opts.trace_dir, f"{run_name}.jsonl"))
+        trace.to_chrome(os.path.join(opts.trace_dir, f"{run_name}.trace.json"))
+        pbar.write(trace.summary())
+
+    if hasattr(ec, "summary"):
+        pbar.write(ec.summary())
+    if agent_cache is not None:
+        pbar.write(agent_cache.summary())
+    if cascade_log:
+        for r in cascade_log:
+            pbar.write(f"Cascade: {r.stage} resolved by {r.tier} after {r.attempts} attempt(s)"
+                       + ("" if r.accepted else " (still failing validation)"))
+        append_cascade_log(os.path.join(CACHE_DIR, "cascade_log.jsonl"), cascade_log,
+                           cik=str(cik), accession=accession_from_url(index_url))
+    if stage_hedge:
+        runs = {run for stage in stage_hedge for run in HEDGED_RUNS.get(stage, (stage,))}
+        hedged = {k: v for k, v in hedge_stats().items() if k.split("/")[0].split(".")[0] in runs}
+        if hedged:
+            pbar.write(format_hedge_stats(hedged))
 
     total_elapsed = time.perf_counter() - start_program
     pbar.write(f"The entire program took {math.floor(total_elapsed/60)} min and {total_elapsed%60:.2f}s")
 
-    return full_bs, updated_bs
\ No newline at end of file
+    pro_forma = result["pro_forma"]
+    if pro_forma is None:
+        pro_forma = _degraded_pro_forma(result["assembled"], result, result["cover"])
+        pbar.write(f"Returning the filing's balance sheet without updates "
+                   f"({pro_forma.update_status}: {pro_forma.update_error})")
+    else:
+        pro_forma.update_status = "ok"
+        pro_forma.scanned_filings = [accession_from_url(u) for u in result["sub_filings"]]
+    emit(ProFormaReady(result["assembled"], pro_forma))
+    return result["assembled"], pro_forma
+
+
+async def stream_balance_sheet(
+        cik: int | str,
+        index_url: str,
+        ec: EdgarCacheClient,
+        **options,
+) -> AsyncIterator[BuildEvent]:
+    """
+    `build_balance_sheet` as an async generator of progress events:
+
+        async for event in stream_balance_sheet(cik, url, ec):
+            if isinstance(event, SectionExtracted): ...
+
+    The last event is a ProFormaReady with both sheets.  An error in the
+    build is raised from the generator; closing the generator early
+    cancels the build.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+
+    async def build():
+        try:
+            await build_balance_sheet(cik, index_url, ec, on_event=queue.put_nowait, **options)
+        finally:
+            queue.put_nowait(finished)
+
+    task = asyncio.create_task(build())
+    try:
+        while (event := await queue.get()) is not finished:
+            yield event
+        await task                              # surface the build's exception, if any
+    finally:
+        if not task.done():
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
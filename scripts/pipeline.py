@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+# balancesheet/pipeline.py
+"""
+Tiny async DAG scheduler for the orchestrator.
+
+A pipeline is a list of Stage objects.  Each stage names the stages it
+depends on; their results are passed to it as keyword arguments of the same
+name.  Every stage starts as soon as all of its inputs are ready, so
+independent branches (e.g. building the updates vector store while the
+section agents run) overlap automatically.
+
+Blocking stages (EdgarCache / OpenAI upload calls) run in a worker thread so
+they never stall the event loop.  With a `checkpoint` (see checkpoint.py)
+every finished stage is persisted, and a stage already in the checkpoint is
+loaded instead of run - without waiting for its own dependencies.  The
+first failing stage cancels the rest and its exception propagates to the
+caller unwrapped.
+
+Time budgets: a stage's `timeout` and the pipeline-wide `deadline` of
+run_stages both bound a stage's run.  A stage marked `optional` that fails
+or runs out of time does not fail the pipeline: its result is None, its
+status "failed" / "timeout", and optional stages depending on it are
+"skipped" (a required stage depending on it receives None).  Blocking
+stages run on a detached thread pool, so a timed-out upload keeps running
+in the background without holding up the caller.
+"""
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+from telemetry import profiled, span
+
+
+@dataclass
+class Stage:
+    name:     str
+    fn:       Callable[..., Any | Awaitable[Any]]
+    deps:     Tuple[str, ...] = ()
+    blocking: bool = False          # run fn(**deps) via asyncio.to_thread
+    persist:  bool = True           # save / resume through the checkpoint
+    reuse:    Callable[[Any], bool] | None = None   # False: checkpointed value is stale
+    timeout:  float | None = None   # seconds, on top of the run_stages deadline
+    optional: bool = False          # on failure / timeout: result None, pipeline continues
+    tolerates: Tuple[str, ...] = () # deps that may come in as None without skipping this stage
+
+
+@dataclass
+class StageTiming:
+    name:  str
+    start:   float                  # time.perf_counter() values
+    end:     float = 0.0
+    resumed: bool = False           # loaded from the checkpoint
+    status:  str = "ok"             # ok | resumed | failed | timeout | skipped
+    error:   str | None = None
+
+    @property
+    def elapsed(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class PipelineResult:
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, StageTiming] = field(default_factory=dict)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.results[name]
+
+    def status(self, name: str) -> str:
+        return self.timings[name].status
+
+    def degraded(self) -> List[StageTiming]:
+        """Optional stages that failed, timed out or were skipped, in completion order."""
+        return [t for t in self.timings.values() if t.status in ("failed", "timeout", "skipped")]
+
+    def critical_path(self) -> float:
+        """Wall time from the first stage start to the last stage end."""
+        if not self.timings:
+            return 0.0
+        return (max(t.end for t in self.timings.values()) -
+                min(t.start for t in self.timings.values()))
+
+
+# blocking stages; not asyncio's default executor, which asyncio.run waits on
+_BLOCKING_POOL = ThreadPoolExecutor(max_workers=32, thread_name_prefix="stage")
+
+
+async def _in_thread(fn, **kwargs):
+    loop = asyncio.get_running_loop()
+    ctx  = contextvars.copy_context()       # keep the trace / parent span
+    return await loop.run_in_executor(_BLOCKING_POOL, functools.partial(ctx.run, fn, **kwargs))
+
+
+def _topological(stages: Iterable[Stage]) -> List[Stage]:
+    by_name = {}
+    for s in stages:
+        if s.name in by_name:
+            raise ValueError(f"duplicate stage name: {s.name}")
+        by_name[s.name] = s
+    for s in by_name.values():
+        missing = [d for d in s.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"stage {s.name!r} depends on unknown stage(s) {missing}")
+
+    ordered, state = [], {}              # state: 1 = visiting, 2 = done
+
+    def visit(s: Stage):
+        if state.get(s.name) == 2:
+            return
+        if state.get(s.name) == 1:
+            raise ValueError(f"dependency cycle through stage {s.name!r}")
+        state[s.name] = 1
+        for d in s.deps:
+            visit(by_name[d])
+        state[s.name] = 2
+        ordered.append(s)
+
+    for s in by_name.values():
+        visit(s)
+    return ordered
+
+
+async def run_stages(
+        stages: Iterable[Stage],
+        on_stage_done: Callable[[StageTiming, Any], None] | None = None,
+        checkpoint=None,
+        profile: Iterable[str] = (),
+        profile_dir: str = ".",
+        deadline: float | None = None,
+) -> PipelineResult:
+    """
+    Runs every stage as soon as its dependencies have finished and returns
+    all results plus per-stage timings.  `on_stage_done(timing, result)` is
+    called on the event loop after each stage completes.
+
+    `checkpoint` is anything with `load(name) -> (found, value)` and
+    `save(name, value, elapsed)`, normally a checkpoint.StageCheckpoint.
+
+    Each stage runs inside a "stage" span (telemetry.py); stages named in
+    `profile` also run under cProfile, dumped to `<profile_dir>/<stage>.prof`;
+    profiled stages that overlap in time are not both profiled (see `profiled`).
+
+    `deadline` is a budget in seconds for the whole pipeline; a required
+    stage still running when it (or its own `timeout`) expires raises
+    TimeoutError, an optional one is recorded as "timeout".  A TimeoutError
+    the stage raises itself (e.g. an HTTP timeout) before its budget runs
+    out is an ordinary failure.
+    """
+    profile = set(profile)
+    started = time.perf_counter()
+    degraded: set = set()           # optional stages whose result is a stand-in None
+    out   = PipelineResult()
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def resume(stage: Stage) -> Tuple[bool, Any]:
+        if checkpoint is None or not stage.persist:
+            return False, None
+        found, value = await asyncio.to_thread(checkpoint.load, stage.name)
+        if found and stage.reuse is not None:
+            found = await asyncio.to_thread(stage.reuse, value)
+        return found, value
+
+    def budget(stage: Stage) -> float | None:
+        limits = [stage.timeout] if stage.timeout is not None else []
+        if deadline is not None:
+            limits.append(deadline - (time.perf_counter() - started))
+        return max(min(limits), 0.0) if limits else None
+
+    async def call(stage: Stage, kwargs: dict):
+        fn = stage.fn
+        if stage.name in profile:
+            fn = profiled(fn, os.path.join(profile_dir, f"{stage.name}.prof"))
+        with span(stage.name, "stage"):
+            if stage.blocking:
+                return await _in_thread(fn, **kwargs)
+            result = fn(**kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+    async def run(stage: Stage):
+        found, result = await resume(stage)
+        if found:
+            now    = time.perf_counter()
+            timing = StageTiming(stage.name, now, now, resumed=True, status="resumed")
+        else:
+            kwargs = {d: await tasks[d] for d in stage.deps}
+            timing = StageTiming(stage.name, time.perf_counter())
+            upstream = [d for d in stage.deps if d in degraded and d not in stage.tolerates]
+            if upstream and stage.optional:
+                timing.status, timing.error = "skipped", f"{', '.join(upstream)} unavailable"
+            else:
+                limit = budget(stage)
+                try:
+                    async with asyncio.timeout(limit) as scope:
+                        result = await call(stage, kwargs)
+                except Exception as exc:
+                    # a TimeoutError raised inside the stage is a failure, not the budget
+                    expired = isinstance(exc, TimeoutError) and scope.expired()
+                    if not stage.optional:
+                        if expired:
+                            raise TimeoutError(f"stage {stage.name!r} exceeded its {limit:.1f}s budget") from None
+                        raise
+                    if expired:
+                        timing.status, timing.error = "timeout", f"exceeded its {limit:.1f}s budget"
+                    else:
+                        timing.status, timing.error = "failed", f"{type(exc).__name__}: {exc}"
+            timing.end = time.perf_counter()
+            if timing.status != "ok":
+                degraded.add(stage.name)
+                result = None
+            elif checkpoint is not None and stage.persist:
+                await asyncio.to_thread(checkpoint.save, stage.name, result, timing.elapsed)
+        out.results[stage.name] = result
+        out.timings[stage.name] = timing
+        if on_stage_done is not None:
+            on_stage_done(timing, result)
+        return result
+
+    ordered = _topological(stages)                  # validate before starting anything
+    try:
+        async with asyncio.TaskGroup() as tg:
+            for stage in ordered:                   # deps' tasks exist first
+                tasks[stage.name] = tg.create_task(run(stage), name=stage.name)
+    except BaseExceptionGroup as eg:
+        # dependents awaiting a failed stage re-raise its exception object
+        errors = list({id(exc): exc for exc in eg.exceptions}.values())
+        if len(errors) == 1:                        # surface the failing stage's own error
+            raise errors[0]
+        raise
+    return out
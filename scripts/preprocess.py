@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+# balancesheet/preprocess.py
+"""
+Slims filing documents before they are uploaded or indexed.
+
+Raw EDGAR .htm files are mostly markup: inline-XBRL wrappers, the hidden
+`ix:header` block, CSS, scripts and base64-embedded images.  This module
+turns each HTML document into compact text in which every <table> becomes
+a markdown grid, and caches the result on disk by content hash so a filing
+is only converted once.
+
+Non-HTML documents (pdf, txt, ...) pass through unchanged.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from typing import Iterable, List
+
+import bs4
+from tabulate import tabulate
+
+from settings import CACHE_DIR
+
+# bump when the conversion changes so stale cache entries are ignored
+PREPROCESS_VERSION = "md-v2"
+
+_DEFAULT_ROOT = os.path.join(CACHE_DIR, "preprocessed")
+_HTML_EXTENSIONS = ('.htm', '.html')
+_DROP_TAGS = ('script', 'style', 'head', 'link', 'meta', 'noscript')
+_HIDDEN_RE = re.compile(r'display\s*:\s*none', re.I)
+_WS_RE = re.compile(r'[ \t\r\f\v\xa0]+')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n+')
+_SIGN_GAP_RE = re.compile(r'([($])\s+(?=[\d.,])')
+
+
+@dataclass
+class PreprocessResult:
+    url:        str
+    content:    bytes
+    name:       str        # file name to upload under
+    raw_bytes:  int
+    text_bytes: int
+    cached:     bool = False
+
+    @property
+    def ratio(self) -> float:
+        return self.text_bytes / self.raw_bytes if self.raw_bytes else 1.0
+
+
+# ---------------------------------------------------------------------------
+# 1.  HTML -> markdown
+# ---------------------------------------------------------------------------
+
+def _clean(text: str) -> str:
+    return _WS_RE.sub(' ', text).strip()
+
+
+def _table_rows(table: bs4.Tag) -> List[List[str]]:
+    """
+    Cell texts per row with the SEC layout noise folded away: empty spacer
+    cells are dropped (except the label column), a lone '$' is joined to
+    the number after it and a lone ')' or '%' to the number before it.
+    """
+    rows = []
+    for tr in table.find_all('tr'):
+        cells = []
+        pending = ''
+        for i, td in enumerate(tr.find_all(['td', 'th'])):
+            text = _SIGN_GAP_RE.sub(r'\1', _clean(td.get_text(' ', strip=True)))
+            if not text:
+                if i == 0:
+                    cells.append('')
+                continue
+            if text in ('$', '(', '($'):
+                pending += text
+                continue
+            if text in (')', '%', ')%', '%)') and cells:
+                cells[-1] += text
+                continue
+            cells.append(pending + text)
+            pending = ''
+        if any(cells):
+            rows.append([c.replace('|', '/') for c in cells])
+    return rows
+
+
+def table_to_markdown(table: bs4.Tag) -> str:
+    rows = _table_rows(table)
+    if not rows:
+        return ''
+    width = max(len(r) for r in rows)
+    rows  = [r + [''] * (width - len(r)) for r in rows]
+    return tabulate(rows[1:], headers=rows[0], tablefmt='github', disable_numparse=True)
+
+
+def html_to_markdown(html: bytes | str) -> str:
+    soup = bs4.BeautifulSoup(html, 'lxml')
+
+    for tag in soup.find_all(_DROP_TAGS):
+        tag.decompose()
+    # lxml lower-cases namespaced tags: <ix:header> -> 'ix:header'
+    for tag in soup.find_all(['ix:header', 'ix:hidden']):
+        tag.decompose()
+    for tag in soup.find_all(style=_HIDDEN_RE):
+        tag.decompose()
+    for img in soup.find_all('img'):
+        alt = _clean(img.get('alt') or '')
+        img.replace_with(f'[image: {alt}]' if alt else '')
+
+    # innermost tables first; a layout table around other tables is unwrapped
+    # rather than turned into a grid of grids
+    tables  = soup.find_all('table')
+    layouts = {id(t) for t in tables if t.find('table') is not None}
+    for table in reversed(tables):
+        if id(table) in layouts:
+            table.unwrap()
+            continue
+        md = table_to_markdown(table)
+        table.replace_with(f'\n\n{md}\n\n' if md else '')
+
+    for br in soup.find_all('br'):
+        br.replace_with('\n')
+    for block in soup.find_all(['p', 'div', 'tr', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+        block.append('\n')
+
+    text = soup.get_text()
+    lines = [_clean(l) if not l.lstrip().startswith('|') else l.rstrip() for l in text.split('\n')]
+    return _BLANK_LINES_RE.sub('\n\n', '\n'.join(lines)).strip() + '\n'
+
+
+# ---------------------------------------------------------------------------
+# 2.  Cached per-document entry point
+# ---------------------------------------------------------------------------
+
+def _markdown_name(url: str) -> str:
+    base = url.rsplit('/', 1)[-1]
+    return re.sub(r'\.html?$', '', base, flags=re.I) + '.md'
+
+
+def preprocess_document(url: str, content: bytes, root: str | None = None) -> PreprocessResult:
+    """
+    Returns the slimmed document for one URL.  Converted text is cached under
+    `root` keyed by sha256(PREPROCESS_VERSION + raw bytes).
+    """
+    if not url.lower().endswith(_HTML_EXTENSIONS):
+        name = url.rsplit('/', 1)[-1]
+        return PreprocessResult(url, content, name, len(content), len(content))
+
+    root   = root or _DEFAULT_ROOT
+    digest = hashlib.sha256(PREPROCESS_VERSION.encode() + content).hexdigest()
+    path   = os.path.join(root, digest[:2], digest + '.md')
+
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            text = f.read()
+        return PreprocessResult(url, text, _markdown_name(url), len(content), len(text), cached=True)
+
+    text = html_to_markdown(content).encode('utf-8')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return PreprocessResult(url, text, _markdown_name(url), len(content), len(text))
+
+
+def summarize_preprocessing(results: Iterable[PreprocessResult]) -> str:
+    results = list(results)
+    raw  = sum(r.raw_bytes for r in results)
+    text = sum(r.text_bytes for r in results)
+    hits = sum(r.cached for r in results)
+    pct  = 100 * (1 - text / raw) if raw else 0.0
+    return (f"Preprocessed {len(results)} documents ({hits} cached): "
+            f"{raw / 1e6:.2f} MB -> {text / 1e6:.2f} MB ({pct:.0f}% smaller)")
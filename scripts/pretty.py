@@ -1,6 +1,8 @@
 from __future__ import annotations
 from typing import Iterable
-from models import FullBalanceSheet, BalanceSheetLine, BalanceSheetDelta
+from models import FullBalanceSheet, BalanceSheetLine, BalanceSheetDelta, SectionTable
+from events import (BuildEvent, SectionExtracted, SheetAssembled, ChangeFound, ChangePriced,
+                    ProFormaReady)
 from tabulate import tabulate         # pip install tabulate
 
 
@@ -29,6 +31,48 @@ def _flatten(lines: Iterable[BalanceSheetLine], indent: int = 0):
             yield from _flatten(ln.components, indent + 2)
 
 
+def _print_diagnostics(bs: FullBalanceSheet):
+    if not getattr(bs, "diagnostics", None):
+        return
+    print("Assembly Checks: \n")
+    rows = [[d.check, d.section or "", d.message] for d in bs.diagnostics]
+    print(tabulate(rows, headers=["Check", "Section", "Detail"], tablefmt="github"))
+    print()
+
+
+def _print_section(section: SectionTable):
+    print(section.section.upper())
+    rows = list(_flatten(section.lines))
+    if section.subtotal:
+        rows.append(["TOTAL " + section.section.upper(), f"{section.subtotal:,.0f}"])
+    print(tabulate(rows, headers=["Line Item", "USD"], tablefmt="github"))
+    print()
+
+
+def render_event(event: BuildEvent):
+    """
+    Incremental console output for orchestrator.stream_balance_sheet:
+    section tables as they are extracted, each subsequent change as it is
+    found and priced, and the full comparison once the pro forma is ready.
+    """
+    if isinstance(event, SectionExtracted):
+        _print_section(event.table)
+    elif isinstance(event, SheetAssembled):
+        sheet = event.sheet
+        print(f"\n{sheet.company_name}   CIK {sheet.cik}   "
+              f"Filing date: {sheet.filing_date}   Period end: {sheet.period_end}")
+        print("✓ Balanced (Assets = Liab + Equity)\n" if sheet.balanced
+              else "⚠ NOT balanced! Check totals.\n")
+        _print_diagnostics(sheet)
+    elif isinstance(event, ChangeFound):
+        print(f"Found   {event.change.date}  {event.change.update_log}")
+    elif isinstance(event, ChangePriced):
+        print(f"Priced  {event.change.date}  {event.change.update_log}  "
+              f"[{_delta_summary(event.change.delta)}]")
+    elif isinstance(event, ProFormaReady):
+        pretty_print(event.initial, event.pro_forma)
+
+
 def pretty_print(original: FullBalanceSheet, updated: FullBalanceSheet | None = None):
     """Print one or two balance sheets in a readable table."""
 
@@ -40,17 +84,13 @@ def pretty_print(original: FullBalanceSheet, updated: FullBalanceSheet | None =
             print("Multiple filers.")
 
         for section in original.tables:
-            print(section.section.upper())
-            rows = list(_flatten(section.lines))
-            if section.subtotal:
-                rows.append(["TOTAL " + section.section.upper(), f"{section.subtotal:,.0f}"])
-            print(tabulate(rows, headers=["Line Item", "USD"], tablefmt="github"))
-            print()
+            _print_section(section)
 
         if original.balanced:
             print("✓ Balanced (Assets = Liab + Equity)\n")
         else:
             print("⚠ NOT balanced! Check totals.\n")
+        _print_diagnostics(original)
         return
 
     print(f"\n{original.company_name}   CIK {original.cik}")
@@ -95,6 +135,9 @@ def pretty_print(original: FullBalanceSheet, updated: FullBalanceSheet | None =
         print("✓ Balanced (Assets = Liab + Equity)\n")
     else:
         print("⚠ NOT balanced! Check totals.\n")
+    if getattr(updated, "update_status", None) not in (None, "ok"):
+        print(f"⚠ Subsequent updates not applied ({updated.update_status}): {updated.update_error}\n")
+    _print_diagnostics(original)
     
     if getattr(updated, "applied_updates", None):
         print("Applied Updates: \n")
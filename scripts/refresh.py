@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+# balancesheet/refresh.py
+"""
+Incremental pro forma refresh.
+
+A new 8-K should not mean re-extracting the 10-Q and re-pricing every
+change.  Given a pro forma FullBalanceSheet produced earlier (its
+`applied_updates` and `scanned_filings`), refresh_pro_forma
+
+    1. lists the company's filings dated on or after the last applied
+       change and drops those already in `scanned_filings`,
+    2. appends only those new filings to the company's updates vector
+       store (tools.sync_updates_vector_store, the store build_balance_sheet
+       keeps with incremental_updates) and searches just them,
+    3. runs the update and accountant agents on them, with the current
+       pro forma as the starting sheet, dropping changes already applied
+       (updates.same_report: same date and text, or same accession),
+    4. applies the new deltas on top via apply_updates (re-pricing the
+       ones that fail validation).
+
+Cost is proportional to the number of new filings; with none it makes no
+agent call at all.
+
+Usage
+-----
+python refresh.py pro_forma.json --out pro_forma.json
+"""
+
+import argparse
+import asyncio
+import datetime as dt
+import json
+from functools import partial
+from typing import Callable, Iterable, List, Literal
+
+from EdgarCache.Client.Client import Client as EC
+from models import FullBalanceSheet, UpdateSummary
+from agent_cache import AgentCache
+from apply_updates import apply_updates
+from doc_cache import CachedEdgarClient
+from orchestrator import (SearchIndex, make_tool, price_changes, repricer, resolve_cascade,
+                          resolve_hedge, scan_updates)
+from preprocess import PREPROCESS_VERSION
+from shares import find_latest_cover_shares, merge_share_counts
+from updates import drop_known
+from tools import (ThreadLocalEdgarClient, accession_from_url, create_local_index, filing_digests,
+                   get_all_sub_filings, get_filing_doc_urls, sync_updates_vector_store)
+from vs_registry import VectorStoreRegistry
+
+
+def _parse_date(value: str | None) -> dt.date | None:
+    try:
+        return dt.date.fromisoformat((value or "").strip()[:10])
+    except ValueError:
+        return None
+
+
+def scan_start(pro_forma: FullBalanceSheet) -> dt.date:
+    """Date of the last applied change, else the filing date of the sheet."""
+    dates = [d for d in (_parse_date(ch.date) for ch in pro_forma.applied_updates or []) if d]
+    if dates:
+        return max(dates)
+    return _parse_date(pro_forma.filing_date)
+
+
+def new_filings(ec, pro_forma: FullBalanceSheet) -> List[str]:
+    """Index URLs of subsequent filings the pro forma has not seen yet."""
+    scanned = set(pro_forma.scanned_filings or [])
+    urls = get_all_sub_filings(ec, int(pro_forma.cik), scan_start(pro_forma))
+    return [u for u in urls if accession_from_url(u) not in scanned]
+
+
+def _plus(base: int | None, deltas: Iterable[int | None]) -> int | None:
+    deltas = [d for d in deltas if d]
+    if not deltas:
+        return base
+    return (base or 0) + sum(deltas)
+
+
+def _merge(previous: FullBalanceSheet, refreshed: FullBalanceSheet, filings: Iterable[str]) -> None:
+    """apply_updates only knows the new changes; carry the earlier ones along."""
+    refreshed.applied_updates = [*(previous.applied_updates or []),
+                                 *(refreshed.applied_updates or [])] or None
+    refreshed.update_errors = [*(previous.update_errors or []),
+                               *(refreshed.update_errors or [])] or None
+    refreshed.scanned_filings = [*(previous.scanned_filings or []),
+                                 *(accession_from_url(u) for u in filings)]
+    refreshed.update_status = "ok"
+    refreshed.update_error = None
+
+
+async def refresh_pro_forma(
+        pro_forma: FullBalanceSheet,
+        ec,
+        openai_client=None,
+        registry: VectorStoreRegistry | None = None,
+        retrieval: Literal["hosted", "local"] = "hosted",
+        preprocess: bool = False,
+        cover_shares: bool = False,
+        agent_cache: AgentCache | None = None,
+        cascade=False,
+        hedge=False,
+        index_urls: Iterable[str] | None = None,
+        write: Callable[[str], None] | None = None,
+) -> FullBalanceSheet:
+    """
+    Returns `pro_forma` brought up to date with the filings it has not
+    scanned yet (or exactly `index_urls`, if given).  The input is not
+    modified.  Options mean the same as in orchestrator.build_balance_sheet;
+    `write(message)` gets progress notes.
+    """
+    write = write or (lambda message: None)
+    filings = list(index_urls) if index_urls is not None else \
+        await asyncio.to_thread(new_filings, ec, pro_forma)
+    if not filings:
+        write(f"{pro_forma.cik}: no new filings since {scan_start(pro_forma)}")
+        return pro_forma.model_copy(deep=True)
+    write(f"{pro_forma.cik}: {len(filings)} new filing(s) since {scan_start(pro_forma)}")
+
+    if retrieval == "local":
+        doc_urls  = await asyncio.to_thread(
+            lambda: [u for f in filings for u in get_filing_doc_urls(ec, f)])
+        fetches   = []
+        retriever = await asyncio.to_thread(create_local_index, ec, doc_urls, fetch_log=fetches)
+        index     = SearchIndex(retriever, filing_digests(fetches))
+        tool      = make_tool(retriever)
+    else:
+        since   = _parse_date(pro_forma.filing_date) or scan_start(pro_forma)
+        digests = {}
+        store   = await asyncio.to_thread(
+            sync_updates_vector_store, ec, pro_forma.cik, filings, since, client=openai_client,
+            preprocess=preprocess, registry=registry, digests=digests)
+        index   = SearchIndex(store.id, digests)
+        tool    = make_tool(store.id, [accession_from_url(u) for u in filings])
+    variant = f"{retrieval}:{PREPROCESS_VERSION if preprocess else 'raw'}"
+    doc_key = index.doc_key(variant, filings)
+    tiers   = resolve_cascade(cascade)
+    hedges  = resolve_hedge(hedge)
+
+    updates: UpdateSummary = await scan_updates(pro_forma, tool, tiers.get("updates"), agent_cache,
+                                                doc_key, hedge=hedges.get("updates"))
+    updates.changes = drop_known(updates.changes, pro_forma.applied_updates or [])
+    if updates.changes:
+        updates = await price_changes(updates, tool, tiers.get("deltas"), agent_cache,
+                                      doc_key, hedge=hedges.get("deltas"),
+                                      write=write)
+
+    # share counts: a newer cover page wins, else the previous counts plus the new deltas
+    cover = await asyncio.to_thread(find_latest_cover_shares, ec, filings) if cover_shares else None
+    if cover is not None:
+        updates.total_common_shares, preferred = merge_share_counts(
+            cover, [*(pro_forma.applied_updates or []), *updates.changes])
+        updates.total_preferred_shares = preferred if preferred is not None else pro_forma.shares_outstanding_preferred
+    else:
+        updates.total_common_shares = _plus(pro_forma.shares_outstanding_common,
+                                            (ch.shares_common for ch in updates.changes))
+        updates.total_preferred_shares = _plus(pro_forma.shares_outstanding_preferred,
+                                               (ch.shares_preferred for ch in updates.changes))
+
+    reprice   = repricer(tool, pro_forma, tiers.get("deltas"), hedge=hedges.get("deltas"))
+    refreshed = await apply_updates(pro_forma, updates, reprice, write=write)
+    _merge(pro_forma, refreshed, filings)
+    added = len(refreshed.applied_updates or []) - len(pro_forma.applied_updates or [])
+    write(f"{pro_forma.cik}: {added} new change(s) applied")
+    return refreshed
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+async def main(args: argparse.Namespace) -> None:
+    with open(args.pro_forma, "r") as f:
+        pro_forma = FullBalanceSheet.model_validate(json.load(f))
+    ec = CachedEdgarClient(ThreadLocalEdgarClient(partial(EC, args.ec_host, args.ec_port)))
+    refreshed = await refresh_pro_forma(
+        pro_forma, ec, registry=VectorStoreRegistry(), retrieval=args.retrieval,
+        preprocess=args.preprocess, cover_shares=args.cover_shares,
+        agent_cache=None if args.no_agent_cache else AgentCache(), write=print,
+    )
+    with open(args.out or args.pro_forma, "w") as f:
+        f.write(refreshed.model_dump_json(indent=2))
+
+
+def _parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(prog="refresh")
+    p.add_argument("pro_forma", help="pro forma FullBalanceSheet as JSON (e.g. from a batch report)")
+    p.add_argument("--out", help="where to write the refreshed sheet (default: overwrite the input)")
+    p.add_argument("--retrieval", choices=["hosted", "local"], default="hosted")
+    p.add_argument("--preprocess", action="store_true")
+    p.add_argument("--cover-shares", action="store_true")
+    p.add_argument("--no-agent-cache", action="store_true")
+    p.add_argument("--ec-host", default="ny4-35.bluefintrading.com")
+    p.add_argument("--ec-port", type=int, default=8361)
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
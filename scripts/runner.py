@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+# balancesheet/runner.py
+"""
+Single choke point for agent runs and vector-store uploads.
+
+Every agent call in the pipeline goes through `run_agent` instead of
+`Runner.run` directly, and every vector-store upload holds an
+`upload_slot()`.  Both are capped process-wide so that a batch of filings
+sharing one event loop (see batch.py) cannot flood the OpenAI rate limits:
+
+    set_concurrency(agent_runs=8, uploads=4)
+
+The caps default to "unlimited enough" for a single filing.
+
+Passing an AgentCache (agent_cache.py) to run_agent serves repeated
+identical runs from disk without touching the cap or the API.
+
+Transient API errors (connection drops, timeouts, 429s, 5xx) are retried
+by run_agent with exponential backoff and jitter (RetryPolicy); the agent
+slot is released while backing off.
+
+run_cascade runs a stage on a list of model tiers (my_agents/tiers.py),
+cheapest first, and escalates only while the stage's validator
+(validation.py) rejects the output.
+
+run_hedged cuts tail latency: when a run has not returned by the stage's
+observed latency percentile (HedgePolicy), a duplicate is launched and the
+first valid output wins; the other run is cancelled.  hedge_stats() counts
+how often that happened and how often the duplicate won, per stage.
+"""
+
+import asyncio
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Sequence
+
+import openai
+from agents import Runner
+
+from agent_cache import CachedRunResult, run_key
+from telemetry import span
+
+AGENT_RUNS = 16        # concurrent Runner.run calls
+UPLOADS    = 4         # concurrent vector-store create/upload batches
+
+_agent_limit  = AGENT_RUNS
+_upload_slots = threading.BoundedSemaphore(UPLOADS)
+
+# asyncio semaphores are bound to the loop that first waits on them, and the
+# sync wrappers call asyncio.run once per filing, so keep one per loop.
+_agent_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+    weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def set_concurrency(agent_runs: int | None = None, uploads: int | None = None) -> None:
+    """Changes the global caps; takes effect for runs/uploads started afterwards."""
+    global _agent_limit, _upload_slots
+    with _lock:
+        if agent_runs is not None:
+            if agent_runs < 1:
+                raise ValueError("agent_runs must be >= 1")
+            _agent_limit = agent_runs
+            _agent_slots.clear()
+        if uploads is not None:
+            if uploads < 1:
+                raise ValueError("uploads must be >= 1")
+            _upload_slots = threading.BoundedSemaphore(uploads)
+
+
+@dataclass
+class RetryPolicy:
+    """Bounded retries of transient agent-run errors."""
+    attempts:   int   = 3           # total tries, including the first
+    base_delay: float = 2.0         # seconds before the 2nd try, doubling after
+    max_delay:  float = 30.0
+
+    def backoff(self, retry: int) -> float:
+        delay = min(self.base_delay * 2 ** retry, self.max_delay)
+        return delay * random.uniform(0.5, 1.0)
+
+
+RETRY = RetryPolicy()
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Errors worth retrying: network trouble, rate limits and server-side failures."""
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return False
+
+
+def _agent_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        sem = _agent_slots.get(loop)
+        if sem is None:
+            sem = _agent_slots[loop] = asyncio.Semaphore(_agent_limit)
+        return sem
+
+
+async def run_agent(agent, input, cache=None, doc_key: str = "", retry: RetryPolicy = RETRY,
+                    validate: Callable[[Any], List[str]] | None = None, **kwargs):
+    """
+    `Runner.run(agent, input, **kwargs)` under the global agent cap.
+
+    With a `cache`, a previous run of the same agent over the same input and
+    document set (`doc_key`, see agent_cache.docs_key) is returned as a
+    CachedRunResult, and fresh results are stored - only those that pass
+    `validate`, so a rejected output is never replayed (a cached one that
+    fails it is ignored too).  Transient errors are retried per `retry`;
+    anything else, or the last failure, is raised.
+    """
+    with span(agent.name, "agent", model=str(getattr(agent, "model", None))) as s:
+        if cache is not None:
+            key = run_key(agent, input, doc_key)
+            hit = await asyncio.to_thread(cache.get, key, getattr(agent, "output_type", None))
+            if hit is not None and not (validate is not None and validate(hit.final_output)):
+                s.set(cached=True)
+                return hit
+
+        queued = 0.0
+        for attempt in range(retry.attempts):
+            waiting = time.perf_counter()
+            try:
+                async with _agent_semaphore():
+                    queued += time.perf_counter() - waiting             # waiting for a slot
+                    result = await Runner.run(agent, input, **kwargs)
+                break
+            except Exception as exc:
+                if attempt + 1 >= retry.attempts or not is_transient(exc):
+                    raise
+                s.set(retries=attempt + 1, last_error=f"{type(exc).__name__}: {exc}")
+                await asyncio.sleep(retry.backoff(attempt))
+        s.set(cached=False, queued=round(queued, 3), **usage_of(result))
+
+        if cache is not None and not (validate is not None and validate(result.final_output)):
+            await asyncio.to_thread(cache.put, key, agent.name, result.final_output)
+        return result
+
+
+def usage_of(result) -> dict:
+    """Token usage and hosted file-search call count of a RunResult."""
+    out = {}
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    if usage is not None:
+        for field in ("requests", "input_tokens", "output_tokens", "total_tokens"):
+            out[field] = getattr(usage, field, None)
+    calls = 0
+    for item in getattr(result, "new_items", None) or []:
+        raw = getattr(item, "raw_item", None)
+        if getattr(raw, "type", None) == "file_search_call":
+            calls += 1
+    out["file_search_calls"] = calls
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Hedged runs
+# ---------------------------------------------------------------------------
+
+@dataclass
+class HedgePolicy:
+    """When to launch a duplicate of a still-running agent call."""
+    percentile:    float = 0.95     # hedge after this quantile of the stage's observed latency
+    min_samples:   int   = 10       # until then wait `initial_delay`
+    initial_delay: float = 120.0
+    min_delay:     float = 5.0
+
+
+@dataclass
+class HedgeStats:
+    """Per-stage counters; latencies are of completed (not cancelled) runs."""
+    runs:       int = 0
+    hedged:     int = 0
+    hedge_wins: int = 0
+    latencies:  deque = field(default_factory=lambda: deque(maxlen=200))
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.runs if self.runs else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        return self.hedge_wins / self.hedged if self.hedged else 0.0
+
+    def delay(self, policy: HedgePolicy) -> float:
+        if len(self.latencies) < max(policy.min_samples, 2):
+            return policy.initial_delay
+        cuts = statistics.quantiles(self.latencies, n=100, method="inclusive")
+        index = min(max(round(policy.percentile * 100) - 1, 0), len(cuts) - 1)
+        return max(cuts[index], policy.min_delay)
+
+
+# process-wide so that a batch learns each stage's latency across filings
+_hedge_stats: Dict[str, HedgeStats] = {}
+
+
+def hedge_stats() -> Dict[str, HedgeStats]:
+    with _lock:
+        return dict(_hedge_stats)
+
+
+def reset_hedge_stats() -> None:
+    with _lock:
+        _hedge_stats.clear()
+
+
+def format_hedge_stats(stats: Dict[str, HedgeStats] | None = None) -> str:
+    stats = hedge_stats() if stats is None else stats
+    lines = []
+    for key, st in sorted(stats.items()):
+        lines.append(f"Hedging {key}: {st.hedged}/{st.runs} runs hedged ({st.hedge_rate:.0%}), "
+                     f"duplicate won {st.hedge_wins} ({st.win_rate:.0%})")
+    return "\n".join(lines)
+
+
+def _stats_for(key: str) -> HedgeStats:
+    with _lock:
+        return _hedge_stats.setdefault(key, HedgeStats())
+
+
+def _valid(task: asyncio.Task, validate) -> bool:
+    if task.cancelled() or task.exception() is not None:
+        return False
+    return not (validate(task.result().final_output) if validate is not None else [])
+
+
+async def run_hedged(
+        stage: str,
+        agent,
+        input,
+        policy: HedgePolicy,
+        validate: Callable[[Any], List[str]] | None = None,
+        cache=None,
+        doc_key: str = "",
+        **kwargs,
+):
+    """
+    `run_agent(agent, input, ...)`, plus one duplicate launched once the
+    primary has run longer than the stage's hedge delay.  The first result
+    that passes `validate` wins and the other run is cancelled; if neither
+    is valid the primary's outcome is returned (or raised).
+    """
+    stats   = _stats_for(f"{stage}/{getattr(agent, 'model', None)}")
+    started: Dict[asyncio.Task, float] = {}
+
+    def launch() -> asyncio.Task:
+        task = asyncio.create_task(run_agent(agent, input, cache, doc_key, validate=validate,
+                                             **kwargs))
+        started[task] = time.perf_counter()
+        return task
+
+    def observe(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is None \
+                and not isinstance(task.result(), CachedRunResult):
+            stats.latencies.append(time.perf_counter() - started[task])
+
+    with span(stage, "hedge") as s:
+        delay   = stats.delay(policy)
+        primary = launch()
+        stats.runs += 1
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                observe(primary)
+                s.set(hedged=False)
+                return primary.result()
+
+            stats.hedged += 1
+            backup  = launch()
+            pending = {primary, backup}
+            winner  = None
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    observe(task)
+                for task in (primary, backup):          # primary first on a tie
+                    if task in done and _valid(task, validate):
+                        winner = task
+                        break
+            if winner is None:      # neither valid: prefer one that at least returned
+                winner = next((t for t in (primary, backup)
+                               if not t.cancelled() and t.exception() is None), primary)
+            if winner is backup:
+                stats.hedge_wins += 1
+            s.set(hedged=True, delay=round(delay, 2),
+                  winner="duplicate" if winner is backup else "primary")
+            return winner.result()
+        finally:
+            for task in started:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*started, return_exceptions=True)
+
+
+# ---------------------------------------------------------------------------
+# Model cascade
+# ---------------------------------------------------------------------------
+
+@dataclass
+class CascadeRecord:
+    """Which tier resolved a stage, and why the cheaper tiers were rejected."""
+    stage:    str
+    tier:     str
+    attempts: int
+    rejected: List[str] = field(default_factory=list)   # "<tier>: <problems>"
+    accepted: bool = True                                # False: last tier also failed validation
+
+
+async def run_cascade(
+        stage: str,
+        make_agent: Callable[[Any], Any],
+        input,
+        tiers: Sequence[Any],
+        validate: Callable[[Any], List[str]] | None = None,
+        cache=None,
+        doc_key: str = "",
+        log: List[CascadeRecord] | None = None,
+        hedge: HedgePolicy | None = None,
+        **kwargs,
+):
+    """
+    Runs `make_agent(tier)` for each tier in order until `validate(final_output)`
+    returns no problems.  A tier that raises also counts as a failure.  The
+    last tier's result is returned even if it fails validation (it raises
+    if it errors); the outcome is appended to `log`.  With a `hedge` policy
+    each tier's run is a run_hedged.
+    """
+    if not tiers:
+        raise ValueError(f"{stage}: no model tiers configured")
+    rejected: List[str] = []
+    with span(stage, "cascade") as s:
+        for attempt, tier in enumerate(tiers, 1):
+            last = attempt == len(tiers)
+            try:
+                agent = make_agent(tier)
+                if hedge is not None:
+                    result = await run_hedged(stage, agent, input, hedge, validate, cache, doc_key, **kwargs)
+                else:
+                    result = await run_agent(agent, input, cache, doc_key, validate=validate,
+                                             **kwargs)
+            except Exception as exc:
+                if last:
+                    raise
+                rejected.append(f"{tier.name}: {type(exc).__name__}: {exc}")
+                continue
+            problems = validate(result.final_output) if validate is not None else []
+            if problems and not last:
+                rejected.append(f"{tier.name}: " + "; ".join(problems[:3]))
+                continue
+            record = CascadeRecord(stage, tier.name, attempt, rejected, accepted=not problems)
+            s.set(tier=tier.name, attempts=attempt, accepted=record.accepted)
+            if log is not None:
+                log.append(record)
+            return result
+
+
+def append_cascade_log(path: str, records: Sequence[CascadeRecord], **meta) -> None:
+    """One JSON line per record (plus `meta`, e.g. cik) for tuning the tiers."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        for r in records:
+            f.write(json.dumps({**meta, **asdict(r)}) + "\n")
+
+
+@contextmanager
+def upload_slot():
+    """Held around each vector-store create + upload (called from worker threads)."""
+    slots = _upload_slots
+    with slots:
+        yield
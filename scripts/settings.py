@@ -23,6 +23,13 @@ set_tracing_export_api_key(key)
 
 OpenAI_CLIENT = openai.OpenAI(api_key=key)
 
+# Local on-disk state (vector-store registry, caches).  Override with
+# BALANCESHEET_CACHE_DIR when several checkouts should share one cache.
+CACHE_DIR = os.environ.get(
+    "BALANCESHEET_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cache"),
+)
+
 
 def get_openai_client() -> openai.OpenAI:
     """Single shared client for the whole program."""
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+# balancesheet/shares.py
+"""
+Deterministic shares-outstanding refresh.
+
+The latest cover page (dei:EntityCommonStockSharesOutstanding) gives an
+exact share count as of its cover date; share issuances or retirements
+recorded as FilingChanges after that date are added on top.  This replaces
+the counts the update agent infers from the filing text whenever a cover
+page is available, and can be run on its own without any agent.
+"""
+
+import datetime as dt
+from typing import Iterable, List, Optional, Tuple
+
+from models import FilingChange, FullBalanceSheet
+from tools import fetch_documents, get_all_sub_filings, get_filing_doc_urls
+from xbrl import CoverShares, XbrlExtractionError, extract_cover_shares
+
+
+def _primary_doc(doc_urls: List[str]) -> Optional[str]:
+    return next((u for u in doc_urls if u.lower().endswith(('.htm', '.html'))), None)
+
+
+def find_latest_cover_shares(ec, index_urls: Iterable[str]) -> Optional[CoverShares]:
+    """
+    Reads the cover page of each filing's primary document and returns the
+    one with the latest as-of date (None if no filing tags a share count).
+    8-K covers carry no share count and are skipped automatically.
+    """
+    primaries = [_primary_doc(get_filing_doc_urls(ec, u)) for u in index_urls]
+    primaries = [u for u in primaries if u]
+
+    found: List[CoverShares] = []
+    for r in fetch_documents(ec, primaries):
+        if not r.ok:
+            continue
+        try:
+            cover = extract_cover_shares(r.content)
+        except XbrlExtractionError:
+            continue
+        cover.source = r.url
+        found.append(cover)
+    return max(found, key=lambda c: c.as_of) if found else None
+
+
+def _change_date(change: FilingChange) -> Optional[dt.date]:
+    try:
+        return dt.date.fromisoformat(change.date.strip()[:10])
+    except ValueError:
+        return None
+
+
+def merge_share_counts(
+        cover: CoverShares,
+        changes: Iterable[FilingChange],
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Cover-page counts plus the share deltas of every change dated after the
+    cover date.  Changes with an unparseable date are ignored.
+    """
+    common, preferred = cover.common, cover.preferred
+    for ch in changes:
+        when = _change_date(ch)
+        if when is None or when <= cover.as_of:
+            continue
+        if ch.shares_common:
+            common = (common or 0) + ch.shares_common
+        if ch.shares_preferred:
+            preferred = (preferred or 0) + ch.shares_preferred
+    return common, preferred
+
+
+def refresh_shares_outstanding(
+        bs: FullBalanceSheet,
+        ec,
+        cik: int | str | None = None,
+        index_urls: Iterable[str] | None = None,
+) -> FullBalanceSheet:
+    """
+    Returns a copy of `bs` with shares_outstanding_* recomputed from the
+    latest cover page filed on or after bs.filing_date, merged with the
+    share deltas in bs.applied_updates.  Unchanged if no cover page is found.
+    """
+    if index_urls is None:
+        since = dt.date.fromisoformat(bs.filing_date)
+        index_urls = get_all_sub_filings(ec, int(cik or bs.cik), since)
+    cover = find_latest_cover_shares(ec, index_urls)
+    out = bs.model_copy(deep=True)
+    if cover is None:
+        return out
+    common, preferred = merge_share_counts(cover, bs.applied_updates or [])
+    out.shares_outstanding_common    = common
+    out.shares_outstanding_preferred = preferred if preferred is not None else out.shares_outstanding_preferred
+    return out
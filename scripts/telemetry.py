@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+# balancesheet/telemetry.py
+"""
+Lightweight nested-span tracing for the pipeline.
+
+    with tracing(Trace(run="1849635")) as trace:
+        with span("sections", "stage"):
+            with span("AssetsAgent", "agent") as s:
+                ...
+                s.set(input_tokens=1234)
+    trace.to_jsonl("run.jsonl")
+    trace.to_chrome("run.trace.json")       # chrome://tracing or ui.perfetto.dev
+
+The current trace and parent span live in contextvars, so spans nest
+correctly across asyncio tasks and asyncio.to_thread; thread pools must
+submit through contextvars.copy_context().run (fetch_documents does).
+Outside a `tracing` block `span` is a no-op.
+
+Categories used by the pipeline: stage, agent, tool, fetch, upload.
+Aggregate several runs' JSONL files with
+
+    python telemetry.py traces/*.jsonl
+"""
+
+import cProfile
+import contextvars
+import functools
+import inspect
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import warnings
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterable, List
+
+from tabulate import tabulate
+
+# numeric attributes summed by aggregate()
+_COUNTERS = ("bytes", "input_tokens", "output_tokens", "total_tokens", "requests", "file_search_calls")
+
+
+@dataclass
+class Span:
+    id:     int
+    parent: int | None
+    name:   str
+    cat:    str
+    start:  float                   # seconds since the trace started
+    end:    float = 0.0
+    tid:    int = 0
+    attrs:  Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+
+class _NullSpan:
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Trace:
+    """All spans of one run, in completion order."""
+
+    def __init__(self, run: str = ""):
+        self.run     = run
+        self.spans:  List[Span] = []
+        self.wall    = time.time()          # epoch at start, for the exports
+        self._origin = time.perf_counter()
+        self._ids    = itertools.count(1)
+        self._lock   = threading.Lock()
+
+    def _now(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def _add(self, s: Span) -> None:
+        with self._lock:
+            self.spans.append(s)
+
+    # -- export -------------------------------------------------------------
+
+    def records(self) -> List[dict]:
+        with self._lock:
+            spans = list(self.spans)
+        return [{"run": self.run, "wall": self.wall, **asdict(s), "duration": s.duration}
+                for s in spans]
+
+    def to_jsonl(self, path: str) -> None:
+        with open(path, "a") as f:
+            for rec in self.records():
+                f.write(json.dumps(rec, default=str) + "\n")
+
+    def to_chrome(self, path: str) -> None:
+        """Chrome trace-event format: one complete ('X') event per span."""
+        events = [{
+            "name": rec["name"],
+            "cat":  rec["cat"],
+            "ph":   "X",
+            "ts":   rec["start"] * 1e6,
+            "dur":  rec["duration"] * 1e6,
+            "pid":  os.getpid(),
+            "tid":  rec["tid"],
+            "args": rec["attrs"],
+        } for rec in self.records()]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"run": self.run}}, f, default=str)
+
+    def summary(self, top: int = 15) -> str:
+        return format_aggregate(aggregate(self.records()), top=top)
+
+
+_trace:  contextvars.ContextVar[Trace | None] = contextvars.ContextVar("bs_trace", default=None)
+_parent: contextvars.ContextVar[int | None]   = contextvars.ContextVar("bs_span", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _trace.get()
+
+
+@contextmanager
+def tracing(trace: Trace):
+    """Makes `trace` the target of every span opened inside the block."""
+    t_token = _trace.set(trace)
+    p_token = _parent.set(None)
+    try:
+        yield trace
+    finally:
+        _parent.reset(p_token)
+        _trace.reset(t_token)
+
+
+@contextmanager
+def span(name: str, cat: str = "stage", **attrs):
+    trace = _trace.get()
+    if trace is None:
+        yield _NULL_SPAN
+        return
+    s = Span(next(trace._ids), _parent.get(), name, cat, trace._now(),
+             tid=threading.get_ident(), attrs=dict(attrs))
+    token = _parent.set(s.id)
+    try:
+        yield s
+    except BaseException as exc:
+        s.attrs["error"] = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        s.end = trace._now()
+        _parent.reset(token)
+        trace._add(s)
+
+
+# cProfile hooks the whole interpreter: a second enable() displaces the first
+# on 3.11 and raises on 3.12+, so only one profiled call runs at a time
+_profiler = threading.Lock()
+
+
+def profiled(fn, path: str):
+    """
+    Wraps `fn` so each call runs under cProfile and dumps stats to `path`.
+    For a coroutine function the profile covers the whole event loop while
+    it runs, i.e. also whatever other stages are interleaved with it.
+
+    Only one call is profiled at a time; a call that starts while another
+    one holds the profiler runs unprofiled, with a RuntimeWarning.
+    """
+    def _dump(prof: cProfile.Profile) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        prof.dump_stats(path)
+
+    def _acquire() -> bool:
+        if _profiler.acquire(blocking=False):
+            return True
+        warnings.warn(f"not profiling {getattr(fn, '__name__', fn)}: another profiled stage "
+                      f"is running (profile stages that do not overlap)", RuntimeWarning)
+        return False
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not _acquire():
+                return await fn(*args, **kwargs)
+            try:
+                prof = cProfile.Profile()
+                prof.enable()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    prof.disable()
+                    _dump(prof)
+            finally:
+                _profiler.release()
+        return wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _acquire():
+            return fn(*args, **kwargs)
+        try:
+            prof = cProfile.Profile()
+            prof.enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                prof.disable()
+                _dump(prof)
+        finally:
+            _profiler.release()
+    return wrapper
+
+
+# ---------------------------------------------------------------------------
+# Aggregation across runs
+# ---------------------------------------------------------------------------
+
+def load_jsonl(paths: Iterable[str]) -> List[dict]:
+    records = []
+    for path in paths:
+        with open(path, "r") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def aggregate(records: Iterable[dict]) -> Dict[tuple, dict]:
+    """(cat, name) -> count, total/max seconds and summed counters."""
+    out: Dict[tuple, dict] = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+    for rec in records:
+        agg = out[(rec["cat"], rec["name"])]
+        agg["count"] += 1
+        agg["total"] += rec["duration"]
+        agg["max"]    = max(agg["max"], rec["duration"])
+        for key in _COUNTERS:
+            value = rec["attrs"].get(key)
+            if isinstance(value, (int, float)):
+                agg[key] = agg.get(key, 0) + value
+    return dict(out)
+
+
+def format_aggregate(agg: Dict[tuple, dict], top: int = 15) -> str:
+    rows = []
+    for (cat, name), a in sorted(agg.items(), key=lambda kv: kv[1]["total"], reverse=True)[:top]:
+        rows.append([cat, name, a["count"], f"{a['total']:.2f}", f"{a['max']:.2f}",
+                     f"{a.get('bytes', 0) / 1e6:.2f}", a.get("total_tokens", 0)])
+    return tabulate(rows, headers=["Category", "Name", "Count", "Total s", "Max s", "MB", "Tokens"],
+                    tablefmt="github")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python telemetry.py TRACE.jsonl [...]")
+    print(format_aggregate(aggregate(load_jsonl(sys.argv[1:])), top=50))
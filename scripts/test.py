@@ -1,4 +1,5 @@
-from build_balance_sheet import get_balance_sheet
+from build_balance_sheet import get_balance_sheet, get_balance_sheets
+from batch import format_report
 from pprint import pprint as pretty_print
 from multiprocessing import freeze_support   # <-- Windows only (safe elsewhere)
 
@@ -35,6 +36,21 @@ q_filings = {
 }
 
 def main() -> None:
+    print("Running batch test …\n")
+
+    def progress(r):
+        if r.ok:
+            print(f"✅ {r.cik} OK ({r.elapsed:.0f}s)")
+            #pretty_print(r.updated)   # uncomment for full object dump
+        else:
+            print(f"❌ {r.cik} FAILED → {r.error}")
+
+    results = get_balance_sheets(q_filings, max_filings=6, agent_runs=12, on_result=progress)
+    print()
+    print(format_report(results))
+
+
+def main_sequential() -> None:
     print("Running sequential test …\n")
     for cik, url in q_filings.items():
         try:
@@ -0,0 +1,113 @@
+# balancesheet/test_agent_cache.py
+"""Offline tests of the agent-run memo (agent_cache.py) as runner.run_agent uses it."""
+
+import asyncio
+import datetime as dt
+import types
+
+import pytest
+
+import runner
+from agent_cache import AgentCache, docs_key, run_key
+from models import UpdateSummary
+from vs_registry import document_set_key
+
+
+def _agent(instructions: str = "Find the changes.", model: str = "o3", name: str = "Updater"):
+    return types.SimpleNamespace(name=name, model=model, model_settings=None, tools=[],
+                                 instructions=instructions, output_type=UpdateSummary)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AgentCache(path=str(tmp_path / "runs.sqlite"))
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Agents run by a stubbed Runner.run; each call returns a summary with one more share."""
+    made = []
+
+    async def run(agent, input, **kwargs):
+        made.append((agent.name, input))
+        return types.SimpleNamespace(final_output=UpdateSummary(changes=[], total_common_shares=len(made)))
+
+    monkeypatch.setattr(runner, "Runner", types.SimpleNamespace(run=run))
+    return made
+
+
+def _run(agent, cache, input="{}", doc_key="docs", validate=None):
+    return asyncio.run(runner.run_agent(agent, input, cache, doc_key, validate=validate))
+
+
+# ---------------------------------------------------------------------------
+# hits and misses
+# ---------------------------------------------------------------------------
+
+def test_identical_run_is_served_from_the_cache(cache, calls):
+    first = _run(_agent(), cache)
+    again = _run(_agent(), cache)
+
+    assert len(calls) == 1
+    assert again.cached and again.final_output == first.final_output
+    assert cache.stats()["hits"] == 1 and cache.stats()["stores"] == 1
+
+
+@pytest.mark.parametrize("changed", [
+    dict(agent=_agent(model="o4-mini")),
+    dict(agent=_agent(instructions="Find the changes since the 10-K.")),
+    dict(input='{"cik": "2"}'),
+    dict(doc_key="other documents"),
+])
+def test_model_instructions_input_or_documents_change_the_key(cache, calls, changed):
+    _run(_agent(), cache)
+    _run(**{"agent": _agent(), "cache": cache, **changed})
+
+    assert len(calls) == 2
+    assert cache.stats()["misses"] == 2
+
+
+def test_run_date_in_the_instructions_is_masked(cache, calls):
+    today = dt.date.today()
+    prompt = "You are an analyst. Today is {}."
+
+    assert run_key(_agent(prompt.format(today.isoformat())), "{}") == \
+        run_key(_agent(prompt.format("{today}")), "{}")
+    assert run_key(_agent(prompt.format("2020-01-01")), "{}") != \
+        run_key(_agent(prompt.format("2020-01-02")), "{}")
+
+
+# ---------------------------------------------------------------------------
+# rejected outputs
+# ---------------------------------------------------------------------------
+
+def test_rejected_output_is_not_stored(cache, calls):
+    reject = lambda output: ["no changes found"]
+
+    _run(_agent(), cache, validate=reject)
+    _run(_agent(), cache, validate=reject)
+
+    assert len(calls) == 2
+    assert cache.stats()["stores"] == 0
+
+
+def test_cached_output_that_now_fails_validation_is_not_replayed(cache, calls):
+    _run(_agent(), cache)
+    result = _run(_agent(), cache, validate=lambda output: ["stricter validator"])
+
+    assert len(calls) == 2
+    assert not getattr(result, "cached", False)
+
+
+# ---------------------------------------------------------------------------
+# doc keys
+# ---------------------------------------------------------------------------
+
+def test_docs_key_follows_document_content_not_urls():
+    url = "https://www.sec.gov/Archives/edgar/data/1/000000000125000001/q.htm"
+    original = document_set_key([(url, b"<html>Cash 100</html>")])
+    restated = document_set_key([(url, b"<html>Cash 120</html>")])
+
+    assert docs_key([original], "hosted:raw") != docs_key([restated], "hosted:raw")
+    assert docs_key([original, restated]) == docs_key([restated, original])
+    assert docs_key([original], "hosted:raw") != docs_key([original], "local:raw")
@@ -0,0 +1,179 @@
+# balancesheet/test_apply_updates.py
+"""Offline tests of delta validation, targeted repair and application (apply_updates.py)."""
+
+import asyncio
+
+from apply_updates import _repair, _validate, apply_updates
+from models import (BalanceSheetDelta, BalanceSheetLine, DeltaEntry, FilingChange, FullBalanceSheet,
+                    SectionTable, UpdateSummary)
+from validation import check_delta, resolve_line_item
+
+
+def _sheet() -> FullBalanceSheet:
+    return FullBalanceSheet(
+        company_name="Acme", cik="1", filing_date="2025-02-10", period_end="2024-12-31",
+        tables=[
+            SectionTable(section="assets", lines=[
+                BalanceSheetLine(line_item="Cash and cash equivalents", value=1_000),
+                BalanceSheetLine(line_item="Property and equipment", value=0, components=[
+                    BalanceSheetLine(line_item="Equipment", value=500)]),
+                BalanceSheetLine(line_item="Accumulated depreciation", value=-100),
+            ]),
+            SectionTable(section="liabilities", lines=[
+                BalanceSheetLine(line_item="Notes payable", value=300),
+                BalanceSheetLine(line_item="Notes payable - related party", value=100),
+            ]),
+            SectionTable(section="equity", lines=[
+                BalanceSheetLine(line_item="Common stock", value=10),
+                BalanceSheetLine(line_item="Accumulated deficit", value=990),
+            ]),
+        ],
+    )
+
+
+def _delta(assets=(), liabilities=(), equity=()) -> BalanceSheetDelta:
+    entries = lambda pairs: [DeltaEntry(line_item=n, value=v) for n, v in pairs]
+    return BalanceSheetDelta(assets=entries(assets), liabilities=entries(liabilities),
+                             equity=entries(equity))
+
+
+def _change(log: str, delta: BalanceSheetDelta | None, date: str = "2025-03-01") -> FilingChange:
+    return FilingChange(date=date, update_log=log, citation="8-K", delta=delta)
+
+
+# ---------------------------------------------------------------------------
+# check_delta / resolve_line_item
+# ---------------------------------------------------------------------------
+
+def test_resolve_line_item_exact_normalized_and_unique_prefix():
+    assets = _sheet().assets
+    assert resolve_line_item(assets, "Cash and cash equivalents").value == 1_000
+    assert resolve_line_item(assets, "CASH AND CASH-EQUIVALENTS").value == 1_000
+    assert resolve_line_item(assets, "Cash").line_item == "Cash and cash equivalents"
+    assert resolve_line_item(_sheet().liabilities, "Notes") is None      # ambiguous
+    assert resolve_line_item(assets, "Goodwill") is None
+
+
+def test_check_delta_accepts_a_balanced_resolvable_delta():
+    delta = _delta(assets=[("Cash", 200)], equity=[("Common stock", 200)])
+    assert check_delta(delta, _sheet()) == []
+
+
+def test_check_delta_reports_each_failure():
+    sheet = _sheet()
+    [unbalanced] = check_delta(_delta(assets=[("Cash", 200)], equity=[("Common stock", 100)]), sheet)
+    assert unbalanced.startswith("unbalanced")
+
+    [ambiguous] = check_delta(_delta(assets=[("Cash", -50)], liabilities=[("Notes", -50)]), sheet)
+    assert "matches several line items" in ambiguous
+
+    [unnamed] = check_delta(_delta(assets=[(" ", 10)], equity=[("Common stock", 10)]), sheet)
+    assert "no line item" in unnamed
+
+    [negative] = check_delta(_delta(assets=[("Cash", -1_500)], liabilities=[("Notes payable", -300)],
+                                    equity=[("Accumulated deficit", -1_200)]), sheet)
+    assert "'Cash and cash equivalents' would be negative" in negative
+
+
+def test_check_delta_allows_contra_accounts_and_negative_equity():
+    delta = _delta(assets=[("Accumulated depreciation", -50)],
+                   equity=[("Accumulated deficit", -1_040), ("Common stock", 990)])
+    assert check_delta(delta, _sheet()) == []
+
+
+def test_check_delta_judges_the_value_that_is_updated():
+    # the line's own value is 0; its components do not make a -200 entry safe
+    delta = _delta(assets=[("Property and equipment", -200)], equity=[("Accumulated deficit", -200)])
+    [negative] = check_delta(delta, _sheet())
+    assert "'Property and equipment' would be negative (-200)" in negative
+
+
+# ---------------------------------------------------------------------------
+# _validate / _repair
+# ---------------------------------------------------------------------------
+
+def test_validate_checks_each_delta_against_the_sheet_it_lands_on():
+    paid    = _delta(assets=[("Cash", -800)], equity=[("Accumulated deficit", -800)])
+    spend   = _change("Paid $800", paid)
+    again   = _change("Paid $800 again", paid)
+    missing = _change("No delta", None)
+
+    problems = _validate(_sheet(), [spend, again, missing])
+
+    assert sorted(problems) == [1, 2]            # the second spend overdraws cash after the first
+    assert problems[2] == ["accountant returned no delta"]
+
+
+def test_repair_reprices_only_the_failing_changes():
+    good = _change("Issued stock", _delta(assets=[("Cash", 100)], equity=[("Common stock", 100)]))
+    bad  = _change("Repaid note", _delta(assets=[("Cash", -100)], liabilities=[("Notes payable", -50)]))
+    asked, messages = [], []
+
+    async def reprice(change, problems):
+        asked.append((change.update_log, problems))
+        return change.model_copy(update={"delta": _delta(assets=[("Cash", -100)],
+                                                         liabilities=[("Notes payable", -100)])})
+
+    current, problems, attempts = asyncio.run(_repair(_sheet(), [good, bad], reprice, 2,
+                                                      messages.append))
+
+    assert [log for log, _ in asked] == ["Repaid note"]
+    assert asked[0][1][0].startswith("unbalanced")
+    assert problems == {} and attempts == {1: 1}
+    assert current[0] is good and current[1].delta.sum_liabilities() == -100
+    assert messages[-1] == "Repair: 1/1 change(s) fixed in 1 accountant run(s)"
+
+
+def test_repair_gives_up_after_max_attempts_and_survives_errors():
+    bad = _change("Repaid note", _delta(assets=[("Cash", -100)]))
+    calls = []
+
+    async def reprice(change, problems):
+        calls.append(change.update_log)
+        if len(calls) == 1:
+            raise RuntimeError("rate limited")
+        return change                                  # still unbalanced
+
+    current, problems, attempts = asyncio.run(_repair(_sheet(), [bad], reprice, 2))
+
+    assert calls == ["Repaid note", "Repaid note"]
+    assert list(problems) == [0] and attempts == {0: 2}
+
+
+# ---------------------------------------------------------------------------
+# apply_updates
+# ---------------------------------------------------------------------------
+
+def test_apply_updates_applies_in_date_order_to_resolved_lines():
+    summary = UpdateSummary(changes=[
+        _change("Repaid note", _delta(assets=[("Cash", -300)], liabilities=[("Notes payable", -300)]),
+                date="2025-03-05"),
+        _change("Raised equity", _delta(assets=[("cash", 500)], equity=[("Common Stock", 500)]),
+                date="2025-03-01"),
+        _change("New loan", _delta(assets=[("Cash", 50)], liabilities=[("Convertible notes", 50)]),
+                date="2025-03-07"),
+    ], total_common_shares=1_000)
+
+    bs = asyncio.run(apply_updates(_sheet(), summary))
+
+    assert [ch.update_log for ch in bs.applied_updates] == ["Raised equity", "Repaid note", "New loan"]
+    assert resolve_line_item(bs.assets, "Cash").value == 1_250
+    assert [l.line_item for l in bs.liabilities.lines][-1] == "Convertible notes"
+    assert bs.balanced and bs.update_errors is None
+    assert bs.shares_outstanding_common == 1_000
+
+
+def test_apply_updates_records_changes_that_still_fail():
+    bad = _change("Repaid note", _delta(assets=[("Cash", -100)]))
+
+    async def reprice(change, problems):
+        return change.model_copy(update={"delta": _delta(assets=[("Cash", -90)])})
+
+    bs = asyncio.run(apply_updates(_sheet(), UpdateSummary(changes=[bad]), reprice, 1))
+
+    [failed] = bs.update_errors
+    assert failed.change == bad
+    assert failed.attempted_fix.delta.sum_assets() == -90
+    assert failed.reason.startswith("unbalanced")
+    assert bs.applied_updates is None
+    assert resolve_line_item(bs.assets, "Cash").value == 1_000
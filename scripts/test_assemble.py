@@ -0,0 +1,125 @@
+# balancesheet/test_assemble.py
+"""Offline tests of the deterministic balance-sheet assembly (assemble.py)."""
+
+import pytest
+
+from assemble import IMBALANCE_LINE, assemble_balance_sheet, check_tables, rounding_tolerance
+from models import BalanceSheetLine, SectionTable
+
+
+def _table(section: str, *values: float, subtotal: float | None = None, label: str | None = None):
+    return SectionTable(section=label or section, subtotal=subtotal,
+                        lines=[BalanceSheetLine(line_item=f"{section} {i}", value=v)
+                               for i, v in enumerate(values, 1)])
+
+
+def _assemble(assets, liabilities, equity, **kw):
+    return assemble_balance_sheet("Acme", 1, "2025-05-10", "2025-03-31",
+                                  assets, liabilities, equity, **kw)
+
+
+def _checks(sheet):
+    return [(d.check, d.section) for d in sheet.diagnostics or []]
+
+
+# ---------------------------------------------------------------------------
+# clean sheets
+# ---------------------------------------------------------------------------
+
+def test_balanced_sheet_has_no_diagnostics():
+    assets = _table("assets", 1_000, 500, subtotal=1_500)
+    sheet = _assemble(assets, _table("liabilities", 400), _table("equity", 1_100, subtotal=1_100))
+
+    assert sheet.diagnostics is None and sheet.cik == "1"
+    assert [t.section for t in sheet.tables] == ["assets", "liabilities", "equity"]
+    assert IMBALANCE_LINE not in [l.line_item for l in sheet.equity.lines]
+
+
+def test_input_tables_are_copied_not_mutated():
+    equity = _table("equity", 100)
+    sheet = _assemble(_table("assets", 500), _table("liabilities", 300), equity)
+
+    assert sheet.equity.lines[-1].line_item == IMBALANCE_LINE
+    assert len(equity.lines) == 1 and sheet.equity is not equity
+
+
+def test_components_count_towards_the_section_total():
+    ppe = BalanceSheetLine(line_item="Property, net", value=0, components=[
+        BalanceSheetLine(line_item="Equipment", value=800),
+        BalanceSheetLine(line_item="Accumulated depreciation", value=-300)])
+    assets = SectionTable(section="assets", lines=[ppe], subtotal=500)
+
+    assert _assemble(assets, _table("liabilities", 200), _table("equity", 300)).diagnostics is None
+
+
+# ---------------------------------------------------------------------------
+# diagnostics
+# ---------------------------------------------------------------------------
+
+def test_imbalance_is_diagnosed_and_carried_as_an_equity_line():
+    sheet = _assemble(_table("assets", 1_500), _table("liabilities", 400), _table("equity", 1_000))
+
+    [balance] = sheet.diagnostics
+    assert (balance.check, balance.expected, balance.actual, balance.difference) == \
+        ("balance", 1_500, 1_400, 100)
+    assert balance.message == "assets 1,500 != liabilities + equity 1,400 (off by 100)"
+    assert (sheet.equity.lines[-1].line_item, sheet.equity.lines[-1].value) == (IMBALANCE_LINE, 100)
+    assert sheet.assets.total == sheet.liabilities.total + sheet.equity.total
+
+
+def test_subtotal_that_disagrees_with_its_lines_is_diagnosed():
+    sheet = _assemble(_table("assets", 1_000, 500, subtotal=1_600),
+                      _table("liabilities", 400), _table("equity", 1_100))
+
+    [subtotal] = sheet.diagnostics
+    assert (subtotal.check, subtotal.section, subtotal.difference) == ("section_subtotal", "assets", 100)
+    assert subtotal.message == "reported total assets 1,600 != sum of lines 1,500 (off by 100)"
+    assert IMBALANCE_LINE not in [l.line_item for l in sheet.equity.lines]
+
+
+def test_mislabelled_table_is_relabelled_by_position():
+    liabilities = _table("liabilities", 400, label="equity")
+    sheet = _assemble(_table("assets", 1_500), liabilities, _table("equity", 1_100))
+
+    assert _checks(sheet) == [("section_label", "liabilities")]
+    assert "was labelled 'equity'" in sheet.diagnostics[0].message
+    assert sheet.liabilities.total == 400 and liabilities.section == "equity"
+
+
+def test_every_failed_check_is_reported():
+    sheet = _assemble(_table("assets", 1_000, subtotal=900),
+                      _table("liabilities", 300, subtotal=250, label="assets"),
+                      _table("equity", 600))
+
+    assert _checks(sheet) == [("section_label", "liabilities"), ("section_subtotal", "assets"),
+                              ("section_subtotal", "liabilities"), ("balance", None)]
+
+
+# ---------------------------------------------------------------------------
+# tolerances
+# ---------------------------------------------------------------------------
+
+def test_differences_within_a_cent_are_ignored():
+    assert check_tables([_table("assets", 100.004, subtotal=100), _table("liabilities", 50),
+                         _table("equity", 50.005)]) == []
+
+
+def test_rounded_figures_get_half_a_unit_per_figure():
+    assert rounding_tolerance(3) == 0.01
+    assert rounding_tolerance(3, rounding=1_000) == 1_500
+
+    # three lines rounded to the thousand and a total off by one unit
+    tables = [_table("assets", 1_001_000, 1_001_000, 1_001_000, subtotal=3_004_000),
+              _table("liabilities", 1_000_000), _table("equity", 2_004_000)]
+    assert [d.check for d in check_tables(tables)] == ["section_subtotal", "balance"]
+    assert check_tables(tables, rounding=1_000) == []
+
+    tables[0] = _table("assets", 1_001_000, 1_001_000, 1_001_000, subtotal=3_010_000)
+    assert [d.check for d in check_tables(tables, rounding=1_000)] == ["section_subtotal"]
+
+
+@pytest.mark.parametrize("tolerance, diagnosed", [(0.01, True), (150, False)])
+def test_tolerance_is_configurable(tolerance, diagnosed):
+    sheet = _assemble(_table("assets", 1_100), _table("liabilities", 400), _table("equity", 600),
+                      tolerance=tolerance)
+    assert (sheet.diagnostics is not None) is diagnosed
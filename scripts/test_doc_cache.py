@@ -0,0 +1,147 @@
+# balancesheet/test_doc_cache.py
+"""Offline tests of the on-disk EDGAR document cache (doc_cache.py)."""
+
+import hashlib
+import itertools
+import os
+import types
+
+import pytest
+
+import doc_cache
+from doc_cache import CachedEdgarClient
+
+ARCHIVE = "https://www.sec.gov/Archives/edgar/data/1/000000000125000001"
+
+
+class CountingClient:
+    """EdgarCacheClient stand-in that serves `pages` and counts the downloads."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = []
+
+    def Get(self, url):
+        self.fetched.append(url)
+        return types.SimpleNamespace(content=self.pages[url])
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing time.time() so access order is unambiguous."""
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(doc_cache, "time", types.SimpleNamespace(time=lambda: next(ticks)))
+
+
+def _doc(name: str) -> str:
+    return f"{ARCHIVE}/{name}.htm"
+
+
+def test_archive_documents_are_served_from_disk(tmp_path):
+    pages = {_doc("q"): b"<html>Cash 100</html>", "https://data.sec.gov/submissions/CIK1.json": b"{}"}
+    client = CountingClient(pages)
+    cache = CachedEdgarClient(client, root=str(tmp_path))
+
+    assert cache.Get(_doc("q")).content == pages[_doc("q")]
+    assert cache.Get(_doc("q")).content == pages[_doc("q")]
+    cache.Get("https://data.sec.gov/submissions/CIK1.json")
+    cache.Get("https://data.sec.gov/submissions/CIK1.json")
+
+    assert client.fetched.count(_doc("q")) == 1
+    assert client.fetched.count("https://data.sec.gov/submissions/CIK1.json") == 2
+    assert cache.stats() == {"hits": 1, "misses": 1, "bypassed": 2, "evictions": 0,
+                             "bytes_served": len(pages[_doc("q")])}
+
+    again = CachedEdgarClient(CountingClient(pages), root=str(tmp_path))    # another process
+    assert again.Get(_doc("q")).content == pages[_doc("q")] and again.stats()["hits"] == 1
+
+
+# ---------------------------------------------------------------------------
+# LRU eviction
+# ---------------------------------------------------------------------------
+
+def test_least_recently_used_documents_are_evicted(tmp_path, clock):
+    pages = {_doc(name): name.encode() * 100 for name in "abcd"}      # 100 bytes each
+    client = CountingClient(pages)
+    cache = CachedEdgarClient(client, root=str(tmp_path), max_bytes=350)
+
+    for name in "abc":
+        cache.Get(_doc(name))
+    cache.Get(_doc("a"))                     # a is now more recent than b and c
+    cache.Get(_doc("d"))                     # 400 > 350: evict down to 315
+
+    assert cache.stats()["evictions"] == 1
+    client.fetched.clear()
+    for name in "acd":
+        cache.Get(_doc(name))
+    assert client.fetched == []
+    cache.Get(_doc("b"))
+    assert client.fetched == [_doc("b")]
+
+
+def test_eviction_removes_the_blob_files(tmp_path, clock):
+    pages = {_doc(name): name.encode() * 100 for name in "ab"}
+    cache = CachedEdgarClient(CountingClient(pages), root=str(tmp_path), max_bytes=150)
+
+    cache.Get(_doc("a"))
+    cache.Get(_doc("b"))
+
+    blobs = [f for _, _, files in os.walk(tmp_path / "blobs") for f in files]
+    assert blobs == [hashlib.sha256(pages[_doc("b")]).hexdigest()]
+
+
+# ---------------------------------------------------------------------------
+# blob integrity
+# ---------------------------------------------------------------------------
+
+def _blob(cache, content: bytes) -> str:
+    return cache._blob_path(hashlib.sha256(content).hexdigest())
+
+
+def test_identical_documents_share_one_blob(tmp_path):
+    pages = {_doc("q"): b"<html>same</html>", _doc("copy"): b"<html>same</html>"}
+    cache = CachedEdgarClient(CountingClient(pages), root=str(tmp_path))
+
+    cache.Get(_doc("q"))
+    cache.Get(_doc("copy"))
+
+    blobs = [f for _, _, files in os.walk(tmp_path / "blobs") for f in files]
+    assert blobs == [os.path.basename(_blob(cache, b"<html>same</html>"))]
+
+
+def test_damaged_blob_is_a_miss_and_downloaded_again(tmp_path):
+    pages = {_doc("q"): b"<html>Cash 100</html>"}
+    client = CountingClient(pages)
+    cache = CachedEdgarClient(client, root=str(tmp_path))
+    cache.Get(_doc("q"))
+
+    with open(_blob(cache, pages[_doc("q")]), "wb") as f:
+        f.write(b"<html>Cash 1")                                   # truncated on disk
+
+    assert cache.Get(_doc("q")).content == pages[_doc("q")]
+    assert len(client.fetched) == 2 and cache.stats()["hits"] == 0
+    with open(_blob(cache, pages[_doc("q")]), "rb") as f:
+        assert f.read() == pages[_doc("q")]                        # rewritten intact
+    assert cache.Get(_doc("q")).content == pages[_doc("q")] and cache.stats()["hits"] == 1
+
+
+def test_blob_evicted_by_another_process_is_a_miss(tmp_path):
+    pages = {_doc("q"): b"<html>Cash 100</html>"}
+    client = CountingClient(pages)
+    cache = CachedEdgarClient(client, root=str(tmp_path))
+    cache.Get(_doc("q"))
+
+    os.remove(_blob(cache, pages[_doc("q")]))
+
+    assert cache.Get(_doc("q")).content == pages[_doc("q")]
+    assert len(client.fetched) == 2 and os.path.exists(_blob(cache, pages[_doc("q")]))
+
+
+def test_empty_responses_are_not_cached(tmp_path):
+    client = CountingClient({_doc("q"): b""})
+    cache = CachedEdgarClient(client, root=str(tmp_path))
+
+    cache.Get(_doc("q"))
+    cache.Get(_doc("q"))
+
+    assert len(client.fetched) == 2
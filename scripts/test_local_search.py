@@ -0,0 +1,91 @@
+# balancesheet/test_local_search.py
+"""Offline tests of the in-process BM25 retrieval (local_search.py)."""
+
+import asyncio
+import json
+
+from local_search import (BM25Index, build_local_index, chunk_text, make_local_search_tool,
+                          tokenize)
+
+
+def _lines(n: int, width: int = 30) -> str:
+    return "\n".join(f"line {i:03d} ".ljust(width, "x") for i in range(n))
+
+
+def test_tokenize_keeps_numbers_with_separators():
+    assert tokenize("Cash: $1,234.50 (Note 4)") == ["cash", "1,234.50", "note", "4"]
+
+
+def test_chunk_text_packs_whole_lines_with_overlap():
+    chunks = chunk_text("a.md", _lines(20), max_chars=200, overlap_lines=2, accession="0001")
+
+    assert len(chunks) > 1
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+    assert all(c.doc == "a.md" and c.accession == "0001" for c in chunks)
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt.text.splitlines()[:2] == prev.text.splitlines()[-2:]
+    for chunk in chunks:                  # never cuts a line in half
+        assert all(line.startswith("line ") for line in chunk.text.splitlines())
+
+
+def test_chunk_text_drops_blank_lines_and_empty_docs():
+    assert chunk_text("a.md", "\n  \n") == []
+    [chunk] = chunk_text("a.md", "one\n\n\ntwo")
+    assert chunk.text == "one\ntwo"
+
+
+def test_search_ranks_matching_chunk_first():
+    index = build_local_index([
+        ("bs.md",    "| Cash and cash equivalents | 1,000 |\n| Total assets | 5,000 |"),
+        ("notes.md", "Note 7 - Convertible notes payable issued in March"),
+        ("cover.md", "Shares of common stock outstanding as of May 1"),
+    ])
+
+    hits = index.search("convertible notes", k=2)
+
+    assert hits[0][1].doc == "notes.md"
+    assert all(score > 0 for score, _ in hits)
+    assert index.search("bitcoin") == []
+
+
+def test_search_filters_by_accession():
+    index = build_local_index([
+        ("8k_a.md", "Company issued convertible notes", "0001-24-000001"),
+        ("8k_b.md", "Company repaid the convertible notes", "0001-24-000002"),
+        ("plain.md", "convertible notes without a filing"),
+    ])
+
+    only_b = index.search("convertible notes", accessions={"0001-24-000002"})
+    both   = index.search("convertible notes", accessions=["0001-24-000001", "0001-24-000002"])
+
+    assert [c.doc for _, c in only_b] == ["8k_b.md"]
+    assert {c.doc for _, c in both} == {"8k_a.md", "8k_b.md"}
+    assert len(index.search("convertible notes")) == 3
+
+
+def test_empty_index():
+    index = BM25Index([])
+    assert len(index) == 0
+    assert index.search("cash") == []
+
+
+def _invoke(tool, query: str) -> str:
+    from agents.tool_context import ToolContext
+    args = json.dumps({"query": query})
+    ctx  = ToolContext(context=None, tool_name=tool.name, tool_call_id="call_1", tool_arguments=args)
+    return asyncio.run(tool.on_invoke_tool(ctx, args))
+
+
+def test_local_search_tool_returns_formatted_hits():
+    index = build_local_index([
+        ("bs.md", "Total stockholders equity 4,000", "0001-24-000001"),
+        ("8k.md", "Stockholders approved a reverse split", "0001-24-000002"),
+    ])
+    tool = make_local_search_tool(index, max_k=5, accessions=["0001-24-000001"])
+
+    out = _invoke(tool, "stockholders equity")
+
+    assert tool.name == "file_search"
+    assert out.startswith("[1] bs.md (chunk 0, score ")
+    assert "8k.md" not in out
+    assert _invoke(tool, "bitcoin") == "No matching passages found."
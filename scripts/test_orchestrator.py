@@ -0,0 +1,112 @@
+# balancesheet/test_orchestrator.py
+"""Offline tests of the orchestrator's update/accountant hand-over helpers."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("EdgarCache")
+pytest.importorskip("SEC_utils")
+
+import orchestrator
+from pipeline import PipelineResult, StageTiming
+from models import BalanceSheetDelta, DeltaEntry, FilingChange, FullBalanceSheet, UpdateSummary
+
+AMOUNTS = {"Repaid $1,000,000 promissory note to the lender": 1_000_000,
+           "Repaid $2,500,000 promissory note to the lender": 2_500_000}
+
+
+def _delta(amount: float) -> BalanceSheetDelta:
+    return BalanceSheetDelta(assets=[DeltaEntry(line_item="Cash", value=-amount)],
+                             liabilities=[DeltaEntry(line_item="Notes payable", value=-amount)])
+
+
+def test_scan_and_price_matches_deltas_by_change_not_similarity(monkeypatch):
+    monkeypatch.setattr(orchestrator, "make_record_change_tool", lambda on_change: on_change)
+    logs = list(AMOUNTS)
+    found, priced_logs = [], []
+
+    async def scan(record):
+        for log in logs:
+            record(FilingChange(date="2025-03-03", update_log=log, citation="8-K"))
+            record(FilingChange(date="2025-03-03", update_log=log, citation="8-K"))   # re-run
+            await asyncio.sleep(0)
+        return UpdateSummary(changes=[
+            FilingChange(date="2025-03-03", update_log=log, citation="8-K") for log in logs
+        ] + [FilingChange(date="2025-03-04", update_log="Issued 10,000 shares", citation="8-K")])
+
+    async def price(change):
+        priced_logs.append(change.update_log)
+        return change.model_copy(update={"delta": _delta(AMOUNTS[change.update_log])})
+
+    updates = asyncio.run(orchestrator._scan_and_price(scan, price, on_found=found.append))
+
+    assert sorted(priced_logs) == sorted(logs)               # each recorded change priced once
+    assert [ch.delta.sum_assets() if ch.delta else None for ch in updates.changes] == \
+        [-1_000_000, -2_500_000, None]
+    assert [ch.update_log for ch in found] == [*logs, "Issued 10,000 shares"]
+
+
+def test_scan_and_price_leaves_failed_pricing_to_the_accountant(monkeypatch):
+    monkeypatch.setattr(orchestrator, "make_record_change_tool", lambda on_change: on_change)
+    change = FilingChange(date="2025-03-03", update_log="Repaid $1,000,000 note", citation="8-K")
+    messages = []
+
+    async def scan(record):
+        record(change)
+        await asyncio.sleep(0)
+        return UpdateSummary(changes=[change])
+
+    async def price(change):
+        raise RuntimeError("boom")
+
+    updates = asyncio.run(orchestrator._scan_and_price(scan, price, write=messages.append))
+
+    assert updates.changes[0].delta is None
+    assert messages and "boom" in messages[0]
+
+
+def test_scan_and_price_does_not_reuse_a_delta_for_a_reworded_change(monkeypatch):
+    monkeypatch.setattr(orchestrator, "make_record_change_tool", lambda on_change: on_change)
+    recorded = FilingChange(date="2025-03-03", citation="8-K",
+                            update_log="Issued 1,000,000 shares to Investor A for $2.0 million")
+    final = FilingChange(date="2025-03-05", citation="10-Q",
+                         update_log="Sold 1,000,000 common shares to Investor A for $2,000,000")
+
+    async def scan(record):
+        record(recorded)
+        await asyncio.sleep(0)
+        return UpdateSummary(changes=[final])
+
+    async def price(change):
+        return change.model_copy(update={"delta": _delta(2_000_000)})
+
+    updates = asyncio.run(orchestrator._scan_and_price(scan, price))
+
+    assert updates.changes[0].delta is None        # priced again by the accountant stage
+
+
+def test_build_options_default_to_the_original_pipeline():
+    options = orchestrator.BuildOptions()
+    assert (options.assembler, options.extraction, options.retrieval) == ("llm", "llm", "hosted")
+    assert not any([options.checkpoint, options.preprocess, options.incremental_updates,
+                    options.cover_shares, options.pipeline_pricing])
+
+    with pytest.raises(TypeError):                  # overrides must name a BuildOptions field
+        asyncio.run(orchestrator.build_balance_sheet(1, "index.html", None, no_such_option=True))
+
+
+def test_degraded_pro_forma_names_the_stage_or_says_there_was_none():
+    sheet = FullBalanceSheet(company_name="Acme", cik="1", filing_date="2025-02-10",
+                             period_end="2024-12-31", tables=[])
+    result = PipelineResult(timings={
+        "cover":   StageTiming("cover", 0, status="skipped", error="sub_filings unavailable"),
+        "updates": StageTiming("updates", 0, status="timeout", error="exceeded its 5.0s budget"),
+    })
+
+    degraded = orchestrator._degraded_pro_forma(sheet, result, None)
+    assert (degraded.update_status, degraded.update_error) == \
+        ("timeout", "updates: exceeded its 5.0s budget")
+
+    nothing = orchestrator._degraded_pro_forma(sheet, PipelineResult(), None)
+    assert nothing.update_status == "failed" and nothing.update_error.startswith("pro_forma")
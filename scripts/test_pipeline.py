@@ -0,0 +1,191 @@
+# balancesheet/test_pipeline.py
+"""Offline tests of the stage scheduler (pipeline.py) with stub stages."""
+
+import asyncio
+import time
+
+import pytest
+
+from pipeline import Stage, run_stages
+
+
+def _run(stages, **kw):
+    return asyncio.run(run_stages(stages, **kw))
+
+
+# ---------------------------------------------------------------------------
+# time budgets
+# ---------------------------------------------------------------------------
+
+async def _slow():
+    await asyncio.sleep(1)
+
+
+async def _http_timeout():
+    raise TimeoutError("read timed out")
+
+
+def test_budget_expiry_is_a_timeout():
+    result = _run([Stage("slow", _slow, timeout=0.2, optional=True)])
+    assert result.status("slow") == "timeout"
+    assert "budget" in result.timings["slow"].error
+
+    with pytest.raises(TimeoutError, match="exceeded its 0.2s budget"):
+        _run([Stage("slow", _slow, timeout=0.2)])
+
+
+def test_timeout_error_raised_by_the_stage_is_a_failure():
+    result = _run([Stage("fetch", _http_timeout, timeout=10, optional=True)], deadline=10)
+    assert result.status("fetch") == "failed"
+    assert result.timings["fetch"].error == "TimeoutError: read timed out"
+
+    with pytest.raises(TimeoutError, match="read timed out"):
+        _run([Stage("fetch", _http_timeout)], deadline=10)
+
+
+# ---------------------------------------------------------------------------
+# dependency order and overlap
+# ---------------------------------------------------------------------------
+
+def test_stages_get_their_dependencies_results():
+    order = []
+
+    def stage(name, value):
+        def fn(**deps):
+            order.append(name)
+            return value + sum(deps.values())
+        return fn
+
+    result = _run([
+        Stage("total", stage("total", 0), ("left", "right")),   # declared before its deps
+        Stage("left",  stage("left", 1), ("base",)),
+        Stage("right", stage("right", 2), ("base",), blocking=True),
+        Stage("base",  stage("base", 10)),
+    ])
+
+    assert result["total"] == 11 + 12
+    assert order[0] == "base" and order[-1] == "total"
+
+
+def test_independent_branches_overlap():
+    async def branch():
+        await asyncio.sleep(0.2)
+        return 1
+
+    def upload():
+        time.sleep(0.2)
+        return 1
+
+    result = _run([Stage("a", branch), Stage("b", branch), Stage("c", upload, blocking=True),
+                   Stage("join", lambda a, b, c: a + b + c, ("a", "b", "c"))])
+
+    assert result["join"] == 3
+    assert result.critical_path() < 0.4          # three 0.2s stages side by side
+    starts = [result.timings[n].start for n in "abc"]
+    assert max(starts) - min(starts) < 0.1
+
+
+def test_unknown_dependency_and_cycles_are_rejected():
+    with pytest.raises(ValueError, match="unknown stage"):
+        _run([Stage("a", lambda x: x, ("x",))])
+    with pytest.raises(ValueError, match="dependency cycle"):
+        _run([Stage("a", lambda b: b, ("b",)), Stage("b", lambda a: a, ("a",))])
+
+
+# ---------------------------------------------------------------------------
+# failures and degraded stages
+# ---------------------------------------------------------------------------
+
+def _boom(**deps):
+    raise RuntimeError("boom")
+
+
+def test_failure_propagates_unwrapped_and_cancels_the_rest():
+    cancelled = []
+
+    async def long_running():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(RuntimeError, match="boom"):
+        _run([Stage("long", long_running), Stage("bad", _boom),
+              Stage("after", lambda bad: bad, ("bad",))])
+    assert cancelled == [True]
+
+
+def test_optional_failure_skips_optional_dependents():
+    done = []
+    result = _run([
+        Stage("base",     lambda: 1),
+        Stage("updates",  _boom, ("base",), optional=True),
+        Stage("deltas",   lambda updates: updates, ("updates",), optional=True),
+        Stage("cover",    lambda base: base, ("base",), optional=True),
+        Stage("pro_forma", lambda updates, cover: (updates, cover), ("updates", "cover"),
+              optional=True, tolerates=("updates",)),
+    ], on_stage_done=lambda timing, value: done.append(timing.name))
+
+    assert result.status("updates") == "failed"
+    assert result.timings["updates"].error == "RuntimeError: boom"
+    assert result.status("deltas") == "skipped" and result["deltas"] is None
+    assert result["pro_forma"] == (None, 1)                      # tolerated None
+    assert [t.name for t in result.degraded()] == ["updates", "deltas"]
+    assert sorted(done) == sorted(["base", "updates", "deltas", "cover", "pro_forma"])
+
+
+def test_required_stage_receives_none_from_a_degraded_dependency():
+    result = _run([Stage("updates", _boom, optional=True),
+                   Stage("report", lambda updates: updates is None, ("updates",))])
+    assert result["report"] is True
+
+
+# ---------------------------------------------------------------------------
+# checkpoint resume
+# ---------------------------------------------------------------------------
+
+class MemoryCheckpoint:
+    def __init__(self, saved=None):
+        self.saved = dict(saved or {})
+
+    def load(self, name):
+        return (name in self.saved), self.saved.get(name)
+
+    def save(self, name, value, elapsed):
+        self.saved[name] = value
+
+
+def test_resume_loads_finished_stages_without_running_them():
+    calls = []
+
+    def stage(name, fn):
+        def run(**deps):
+            calls.append(name)
+            return fn(**deps)
+        return run
+
+    stages = [
+        Stage("filing",   stage("filing", lambda: "f")),
+        Stage("sections", stage("sections", lambda filing: filing + "s"), ("filing",)),
+        Stage("store",    stage("store", lambda filing: "vs_1"), ("filing",),
+              reuse=lambda vs_id: vs_id != "vs_1"),            # checkpointed store expired
+        Stage("deltas",   stage("deltas", lambda sections, store: sections + store),
+              ("sections", "store")),
+        Stage("progress", stage("progress", lambda deltas: deltas), ("deltas",), persist=False),
+    ]
+    checkpoint = MemoryCheckpoint({"sections": "fs", "store": "vs_1"})
+
+    result = _run(stages, checkpoint=checkpoint)
+
+    assert calls == ["filing", "store", "deltas", "progress"]
+    assert result.timings["sections"].resumed and result.status("sections") == "resumed"
+    assert result["deltas"] == "fsvs_1"
+    assert "progress" not in checkpoint.saved and checkpoint.saved["deltas"] == "fsvs_1"
+
+
+def test_failed_stages_are_not_checkpointed():
+    checkpoint = MemoryCheckpoint()
+    _run([Stage("base", lambda: 1), Stage("updates", _boom, ("base",), optional=True)],
+         checkpoint=checkpoint)
+    assert checkpoint.saved == {"base": 1}
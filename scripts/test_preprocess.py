@@ -0,0 +1,127 @@
+# balancesheet/test_preprocess.py
+"""Offline tests of the HTML -> markdown preprocessing stage (preprocess.py)."""
+
+import re
+
+import bs4
+
+from preprocess import (_table_rows, html_to_markdown, preprocess_document,
+                        summarize_preprocessing)
+
+URL = "https://www.sec.gov/Archives/edgar/data/1/000000000125000001/q.htm"
+
+BALANCE_SHEET = """
+<table>
+  <tr><td>(in thousands)</td><td></td><td>March 31, 2025</td><td></td><td>December 31, 2024</td></tr>
+  <tr><td>Cash</td><td>$</td><td>1,200</td><td>$</td><td>900</td></tr>
+  <tr><td>Accumulated deficit</td><td>(</td><td>200</td><td>)</td><td>(150</td><td>)</td></tr>
+  <tr><td>&nbsp;</td><td></td><td></td></tr>
+  <tr><td>Gross margin | adjusted</td><td>12.5</td><td>%</td></tr>
+</table>
+"""
+
+FILING = f"""
+<html><head><style>td {{ color: red }}</style><script>track()</script></head><body>
+<ix:header><ix:resources><xbrli:context id="c1">2025-03-31</xbrli:context></ix:resources></ix:header>
+<div style="display: none">hidden fact</div>
+<p>CONDENSED   BALANCE&nbsp;SHEETS</p>
+<img src="data:image/png;base64,iVBORw0KGgo=" alt="Acme logo"><img src="spacer.gif">
+{BALANCE_SHEET}
+<p>The notes are an integral part<br>of these statements.</p>
+</body></html>
+"""
+
+
+def _table(html: str) -> bs4.Tag:
+    return bs4.BeautifulSoup(html, "lxml").find("table")
+
+
+def _grid(md: str) -> list:
+    """Cells of each markdown table row, padding and the separator row dropped."""
+    return [[c.strip() for c in line.strip("|").split("|")]
+            for line in md.splitlines() if line.startswith("|") and not re.match(r"\|-", line)]
+
+
+# ---------------------------------------------------------------------------
+# tables
+# ---------------------------------------------------------------------------
+
+def test_table_rows_fold_sec_layout_noise():
+    assert _table_rows(_table(BALANCE_SHEET)) == [
+        ["(in thousands)", "March 31, 2025", "December 31, 2024"],
+        ["Cash", "$1,200", "$900"],
+        ["Accumulated deficit", "(200)", "(150)"],
+        ["Gross margin / adjusted", "12.5%"],              # pipes would break the grid
+    ]
+
+
+def test_tables_become_markdown_grids():
+    md = html_to_markdown(FILING)
+
+    assert _grid(md) == [
+        ["(in thousands)", "March 31, 2025", "December 31, 2024"],
+        ["Cash", "$1,200", "$900"],
+        ["Accumulated deficit", "(200)", "(150)"],
+        ["Gross margin / adjusted", "12.5%", ""],
+    ]
+    assert re.search(r"^\|-+\|-+\|-+\|$", md, re.M)          # header separator
+
+
+def test_nested_layout_tables_collapse():
+    nested = (f"<html><body><table><tr><td>Page 3</td></tr>"
+              f"<tr><td>{BALANCE_SHEET}</td><td>See notes</td></tr></table></body></html>")
+    md = html_to_markdown(nested)
+
+    assert _grid(md) == _grid(html_to_markdown(BALANCE_SHEET))
+    assert md.startswith("Page 3\n\n| (in thousands)")
+    assert md.endswith("|\n\nSee notes\n")
+
+
+# ---------------------------------------------------------------------------
+# markup that is dropped or rewritten
+# ---------------------------------------------------------------------------
+
+def test_markup_scripts_and_hidden_xbrl_are_dropped():
+    md = html_to_markdown(FILING)
+
+    for gone in ("color: red", "track()", "2025-03-31", "hidden fact", "base64", "spacer.gif"):
+        assert gone not in md
+    assert md.startswith("CONDENSED BALANCE SHEETS\n\n[image: Acme logo]\n\n|")
+
+
+def test_line_breaks_and_whitespace_are_normalized():
+    md = html_to_markdown(FILING)
+
+    assert md.endswith("\n\nThe notes are an integral part\nof these statements.\n")
+    assert "\n\n\n" not in md
+
+
+# ---------------------------------------------------------------------------
+# preprocess_document
+# ---------------------------------------------------------------------------
+
+def test_html_is_converted_once_and_then_served_from_the_cache(tmp_path):
+    raw = FILING.encode()
+    first = preprocess_document(URL, raw, root=str(tmp_path))
+    again = preprocess_document(URL, raw, root=str(tmp_path))
+
+    assert first.name == "q.md" and not first.cached
+    assert first.content == html_to_markdown(FILING).encode()
+    assert first.text_bytes < first.raw_bytes and first.ratio < 1
+    assert again.cached and again.content == first.content
+
+
+def test_other_documents_pass_through(tmp_path):
+    pdf = b"%PDF-1.7 exhibit"
+    result = preprocess_document(URL.replace("q.htm", "ex99.pdf"), pdf, root=str(tmp_path))
+
+    assert (result.content, result.name, result.ratio) == (pdf, "ex99.pdf", 1.0)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_summary_reports_the_size_reduction(tmp_path):
+    results = [preprocess_document(URL, FILING.encode(), root=str(tmp_path)) for _ in range(2)]
+
+    summary = summarize_preprocessing(results)
+    assert summary.startswith("Preprocessed 2 documents (1 cached): ")
+    assert summary.endswith("smaller)")
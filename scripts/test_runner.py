@@ -0,0 +1,223 @@
+# balancesheet/test_runner.py
+"""Offline tests of the agent-run choke point (runner.py) with a stubbed Runner.run."""
+
+import asyncio
+import types
+
+import openai
+import pytest
+
+import runner
+from my_agents.tiers import FAST, MEDIUM, STRONG
+from runner import (CascadeRecord, HedgePolicy, HedgeStats, RetryPolicy, is_transient, run_agent,
+                    run_cascade, run_hedged)
+
+
+def _agent(tier):
+    return types.SimpleNamespace(name="Accountant", model=tier.model, tier=tier.name)
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """
+    Runner.run stub.  Each run is logged by tier name in `runs.made`; the
+    agent answers with its tier name unless `runs.answers[tier]` says
+    otherwise (an exception is raised, a callable gets the run's index).
+    Run i first sleeps `runs.delays[i]`; cancelled runs go to `runs.cancelled`.
+    """
+    stub = types.SimpleNamespace(made=[], answers={}, delays=[], cancelled=[])
+
+    async def run(agent, input, **kwargs):
+        index = len(stub.made)
+        stub.made.append(agent.tier)
+        try:
+            await asyncio.sleep(stub.delays[index] if index < len(stub.delays) else 0)
+        except asyncio.CancelledError:
+            stub.cancelled.append(index)
+            raise
+        answer = stub.answers.get(agent.tier, agent.tier)
+        if callable(answer):
+            answer = answer(index)
+        if isinstance(answer, BaseException):
+            raise answer
+        return types.SimpleNamespace(final_output=answer)
+
+    monkeypatch.setattr(runner, "Runner", types.SimpleNamespace(run=run))
+    return stub
+
+
+# ---------------------------------------------------------------------------
+# cascade
+# ---------------------------------------------------------------------------
+
+def _cascade(tiers, validate=None, log=None):
+    return asyncio.run(run_cascade("deltas", _agent, "{}", tiers, validate, log=log))
+
+
+def _reject(*tiers):
+    return lambda output: [f"{output} output rejected"] if output in tiers else []
+
+
+def test_cascade_stops_at_the_first_valid_tier(runs):
+    log = []
+    result = _cascade((FAST, MEDIUM, STRONG), validate=_reject(), log=log)
+
+    assert result.final_output == "fast" and runs.made == ["fast"]
+    assert log == [CascadeRecord("deltas", "fast", 1)]
+
+
+def test_cascade_escalates_while_the_validator_rejects(runs):
+    log = []
+    result = _cascade((FAST, MEDIUM, STRONG), validate=_reject("fast", "medium"), log=log)
+
+    assert result.final_output == "strong"
+    assert runs.made == ["fast", "medium", "strong"]
+    assert log == [CascadeRecord("deltas", "strong", 3, ["fast: fast output rejected",
+                                                         "medium: medium output rejected"])]
+
+
+def test_cascade_escalates_past_a_tier_that_raises(runs):
+    runs.answers["fast"] = RuntimeError("bad schema")
+    log = []
+    result = _cascade((FAST, STRONG), log=log)
+
+    assert result.final_output == "strong"
+    assert log[0].rejected == ["fast: RuntimeError: bad schema"]
+
+
+def test_last_tier_is_returned_unaccepted_or_raises(runs):
+    log = []
+    result = _cascade((FAST, STRONG), validate=_reject("fast", "strong"), log=log)
+
+    assert result.final_output == "strong"
+    assert log[0].tier == "strong" and not log[0].accepted
+
+    runs.answers["strong"] = RuntimeError("bad schema")
+    with pytest.raises(RuntimeError, match="bad schema"):
+        _cascade((FAST, STRONG), validate=_reject("fast"))
+    with pytest.raises(ValueError, match="no model tiers"):
+        _cascade(())
+
+
+# ---------------------------------------------------------------------------
+# hedging
+# ---------------------------------------------------------------------------
+
+HEDGE = HedgePolicy(initial_delay=0.05)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_hedge_stats():
+    runner.reset_hedge_stats()
+    yield
+    runner.reset_hedge_stats()
+
+
+def _hedged(validate=None):
+    return asyncio.run(run_hedged("deltas", _agent(STRONG), "{}", HEDGE, validate))
+
+
+def test_fast_run_is_not_hedged(runs):
+    result = _hedged()
+
+    assert result.final_output == "strong" and runs.made == ["strong"]
+    stats = runner.hedge_stats()["deltas/o3"]
+    assert (stats.runs, stats.hedged) == (1, 0) and len(stats.latencies) == 1
+
+
+def test_slow_run_is_duplicated_and_the_loser_cancelled(runs):
+    runs.delays = [5, 0]
+    runs.answers["strong"] = lambda index: f"run {index}"
+
+    result = _hedged()
+
+    assert result.final_output == "run 1"
+    assert runs.made == ["strong", "strong"] and runs.cancelled == [0]
+    stats = runner.hedge_stats()["deltas/o3"]
+    assert (stats.runs, stats.hedged, stats.hedge_wins) == (1, 1, 1)
+    assert "1/1 runs hedged (100%), duplicate won 1 (100%)" in runner.format_hedge_stats()
+
+
+def test_duplicate_that_fails_validation_does_not_win(runs):
+    runs.delays = [0.2, 0]
+    runs.answers["strong"] = lambda index: f"run {index}"
+
+    result = _hedged(validate=lambda output: ["rejected"] if output == "run 1" else [])
+
+    assert result.final_output == "run 0" and runs.cancelled == []
+    assert runner.hedge_stats()["deltas/o3"].hedge_wins == 0
+
+
+def test_hedge_delay_follows_the_observed_latency():
+    policy = HedgePolicy(percentile=0.9, min_samples=10, initial_delay=60, min_delay=1)
+    stats = HedgeStats()
+    stats.latencies.extend(range(1, 10))
+    assert stats.delay(policy) == 60                 # too few samples yet
+
+    stats.latencies.extend(range(10, 101))
+    assert stats.delay(policy) == pytest.approx(90, abs=1)
+
+    stats.latencies.clear()
+    stats.latencies.extend([0.1] * 20)
+    assert stats.delay(policy) == 1                  # never below min_delay
+
+
+# ---------------------------------------------------------------------------
+# transient-error retries
+# ---------------------------------------------------------------------------
+
+NOW = RetryPolicy(attempts=3, base_delay=0)
+
+
+def _status_error(status: int) -> openai.APIStatusError:
+    response = types.SimpleNamespace(status_code=status, headers={}, request=None)
+    return openai.APIStatusError(f"HTTP {status}", response=response, body=None)
+
+
+def _flaky(*errors):
+    """Answer for run i: raises errors[i] while there is one, then returns "ok"."""
+    def answer(index):
+        return errors[index] if index < len(errors) else "ok"
+    return answer
+
+
+def _retried(retry=NOW):
+    return asyncio.run(run_agent(_agent(STRONG), "{}", retry=retry))
+
+
+@pytest.mark.parametrize("status, transient", [(429, True), (500, True), (503, True),
+                                               (408, True), (400, False), (404, False)])
+def test_transient_statuses(status, transient):
+    assert is_transient(_status_error(status)) is transient
+    assert not is_transient(ValueError("bad output"))
+
+
+def test_transient_errors_are_retried(runs):
+    runs.answers["strong"] = _flaky(_status_error(429), _status_error(503))
+
+    assert _retried().final_output == "ok"
+    assert len(runs.made) == 3
+
+
+def test_other_errors_are_raised_at_once(runs):
+    runs.answers["strong"] = _flaky(_status_error(400))
+
+    with pytest.raises(openai.APIStatusError, match="HTTP 400"):
+        _retried()
+    assert len(runs.made) == 1
+
+
+def test_last_transient_error_is_raised(runs):
+    runs.answers["strong"] = _flaky(*[_status_error(503)] * 3)
+
+    with pytest.raises(openai.APIStatusError, match="HTTP 503"):
+        _retried()
+    assert len(runs.made) == 3
+
+
+def test_backoff_doubles_up_to_the_cap_with_jitter():
+    policy = RetryPolicy(base_delay=2, max_delay=5)
+
+    assert 1 <= policy.backoff(0) <= 2
+    assert 2 <= policy.backoff(1) <= 4
+    assert 2.5 <= policy.backoff(5) <= 5
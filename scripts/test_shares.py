@@ -0,0 +1,118 @@
+# balancesheet/test_shares.py
+"""Offline tests of the cover-page shares-outstanding refresh (shares.py)."""
+
+import datetime as dt
+
+import pytest
+
+pytest.importorskip("EdgarCache")
+
+import shares
+from models import FilingChange, FullBalanceSheet, SectionTable
+from shares import find_latest_cover_shares, merge_share_counts, refresh_shares_outstanding
+from tools import FetchResult
+from xbrl import CoverShares
+
+BASE = "https://www.sec.gov/Archives/edgar/data/1"
+
+
+def _cover_page(as_of: str, common: str) -> bytes:
+    return (f'<html><body><ix:header><ix:resources><xbrli:context id="c"><xbrli:entity>'
+            f'</xbrli:entity><xbrli:period><xbrli:instant>{as_of}</xbrli:instant></xbrli:period>'
+            f'</xbrli:context></ix:resources></ix:header>'
+            f'<ix:nonFraction name="dei:EntityCommonStockSharesOutstanding" contextRef="c" '
+            f'unitRef="shares">{common}</ix:nonFraction></body></html>').encode()
+
+
+def _change(date: str, common=None, preferred=None) -> FilingChange:
+    return FilingChange(date=date, update_log="shares", citation="8-K",
+                        shares_common=common, shares_preferred=preferred)
+
+
+COVER = CoverShares(as_of=dt.date(2025, 5, 1), common=1_000, preferred=None)
+
+
+# ---------------------------------------------------------------------------
+# merge_share_counts
+# ---------------------------------------------------------------------------
+
+def test_changes_after_the_cover_date_are_added():
+    changes = [_change("2025-04-15", common=500),             # already in the cover count
+               _change("2025-05-01", common=500),             # same day: counted by the cover
+               _change("2025-05-20", common=200, preferred=10),
+               _change("2025-06-02T00:00:00", common=-50),
+               _change("sometime in June", common=999)]       # unparseable: ignored
+
+    assert merge_share_counts(COVER, changes) == (1_150, 10)
+
+
+def test_counts_without_later_changes_are_the_cover_counts():
+    assert merge_share_counts(COVER, []) == (1_000, None)
+
+
+# ---------------------------------------------------------------------------
+# find_latest_cover_shares / refresh_shares_outstanding
+# ---------------------------------------------------------------------------
+
+FILINGS = {
+    f"{BASE}/a-index.html": [f"{BASE}/a/10q.htm", f"{BASE}/a/ex31.txt"],
+    f"{BASE}/b-index.html": [f"{BASE}/b/10k.htm"],
+    f"{BASE}/c-index.html": [f"{BASE}/c/8k.htm"],                   # no share count
+    f"{BASE}/d-index.html": [f"{BASE}/d/10q.htm"],                  # download fails
+}
+PAGES = {
+    f"{BASE}/a/10q.htm": _cover_page("2025-05-01", "1,200"),
+    f"{BASE}/b/10k.htm": _cover_page("2025-02-20", "1,000"),
+    f"{BASE}/c/8k.htm":  b"<html><body>Item 8.01 Other Events</body></html>",
+}
+
+
+@pytest.fixture
+def edgar(monkeypatch):
+    fetched = []
+
+    def fetch(ec, urls, **kw):
+        fetched.extend(urls)
+        return [FetchResult(u, PAGES[u]) if u in PAGES else FetchResult(u, error="timeout")
+                for u in urls]
+
+    monkeypatch.setattr(shares, "get_filing_doc_urls", lambda ec, url: FILINGS[url])
+    monkeypatch.setattr(shares, "fetch_documents", fetch)
+    return fetched
+
+
+def test_latest_cover_page_of_the_primary_documents_wins(edgar):
+    cover = find_latest_cover_shares(None, FILINGS)
+
+    assert (cover.as_of, cover.common) == (dt.date(2025, 5, 1), 1_200)
+    assert cover.source == f"{BASE}/a/10q.htm"
+    assert f"{BASE}/a/ex31.txt" not in edgar                  # only the primary document
+
+
+def test_no_cover_page_means_no_shares(edgar):
+    assert find_latest_cover_shares(None, [f"{BASE}/c-index.html", f"{BASE}/d-index.html"]) is None
+
+
+def _sheet(**kw) -> FullBalanceSheet:
+    return FullBalanceSheet(company_name="Acme", cik="1", filing_date="2025-02-20",
+                            period_end="2024-12-31",
+                            tables=[SectionTable(section=s, lines=[])
+                                    for s in ("assets", "liabilities", "equity")], **kw)
+
+
+def test_refresh_merges_the_cover_with_applied_changes(edgar):
+    bs = _sheet(shares_outstanding_common=900, shares_outstanding_preferred=5,
+                applied_updates=[_change("2025-05-10", common=300)])
+
+    out = refresh_shares_outstanding(bs, None, index_urls=FILINGS)
+
+    assert (out.shares_outstanding_common, out.shares_outstanding_preferred) == (1_500, 5)
+    assert bs.shares_outstanding_common == 900                    # input left untouched
+
+
+def test_refresh_without_a_cover_page_keeps_the_counts(edgar):
+    bs = _sheet(shares_outstanding_common=900)
+
+    out = refresh_shares_outstanding(bs, None, index_urls=[f"{BASE}/c-index.html"])
+
+    assert out.shares_outstanding_common == 900 and out is not bs
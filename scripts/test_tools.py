@@ -0,0 +1,134 @@
+# balancesheet/test_tools.py
+"""Offline tests of the search-tool and incremental updates-store helpers (tools.py)."""
+
+import datetime as dt
+import threading
+import time
+import types
+
+import pytest
+
+pytest.importorskip("EdgarCache")
+
+import tools
+from tools import (FetchResult, ThreadLocalEdgarClient, fetch_documents, make_file_search_tool,
+                   sync_updates_vector_store)
+from vs_registry import UpdatesStoreState
+
+BASE  = "https://www.sec.gov/Archives/edgar/data/1"
+EMPTY = f"{BASE}/000000000125000001/0000000001-25-000001-index.html"
+FULL  = f"{BASE}/000000000125000002/0000000001-25-000002-index.html"
+DOC   = f"{BASE}/000000000125000002/q.htm"
+
+
+def test_file_search_filters():
+    assert make_file_search_tool("vs_1").filters is None
+    assert make_file_search_tool("vs_1", accessions=[]).filters is None
+    assert make_file_search_tool("vs_1", accessions=["a"]).filters == \
+        {"type": "eq", "key": "accession", "value": "a"}
+    either = make_file_search_tool("vs_1", accessions=["a", "b"]).filters
+    assert either["type"] == "or" and [f["value"] for f in either["filters"]] == ["a", "b"]
+
+
+# ---------------------------------------------------------------------------
+# fetch_documents and EdgarCache clients
+# ---------------------------------------------------------------------------
+
+class SessionClient:
+    """EdgarCache stand-in that counts how many calls overlap, overall and on itself."""
+    created, in_flight, peak = [], 0, 0
+    guard = threading.Lock()
+
+    def __init__(self):
+        self.busy = False
+        SessionClient.created.append(self)
+
+    def Get(self, url):
+        assert not self.busy, "one client used by two threads at once"
+        self.busy = True
+        with SessionClient.guard:
+            SessionClient.in_flight += 1
+            SessionClient.peak = max(SessionClient.peak, SessionClient.in_flight)
+        time.sleep(0.02)
+        with SessionClient.guard:
+            SessionClient.in_flight -= 1
+        self.busy = False
+        return types.SimpleNamespace(content=url.encode())
+
+
+@pytest.fixture
+def session_clients(monkeypatch):
+    monkeypatch.setattr(SessionClient, "created", [])
+    monkeypatch.setattr(SessionClient, "peak", 0)
+    return SessionClient.created
+
+
+def test_shared_client_is_called_one_at_a_time(session_clients):
+    urls = [f"u{i}" for i in range(8)]
+    results = fetch_documents(SessionClient(), urls, max_workers=4)
+
+    assert [r.content for r in results] == [u.encode() for u in urls]
+    assert all(r.ok for r in results) and SessionClient.peak == 1
+
+
+def test_thread_local_clients_fetch_in_parallel(session_clients):
+    urls = [f"u{i}" for i in range(8)]
+    results = fetch_documents(ThreadLocalEdgarClient(SessionClient), urls, max_workers=4)
+
+    assert [r.content for r in results] == [u.encode() for u in urls]
+    assert all(r.ok for r in results)
+    assert SessionClient.peak > 1 and len(session_clients) > 1
+
+
+# ---------------------------------------------------------------------------
+# incremental updates store
+# ---------------------------------------------------------------------------
+
+class FakeClient:
+    """Just enough of openai.OpenAI for sync_updates_vector_store."""
+
+    def __init__(self):
+        self.batches = []
+        self.vector_stores = types.SimpleNamespace(
+            create=lambda name, **kw: types.SimpleNamespace(id="vs_1", status="completed"),
+            retrieve=lambda vs_id: types.SimpleNamespace(id=vs_id, status="completed"),
+            delete=lambda vs_id: None,
+            file_batches=types.SimpleNamespace(
+                create_and_poll=lambda **kw: self.batches.append(kw["attributes"]["accession"])),
+        )
+        self.files = types.SimpleNamespace(create=lambda file, purpose: types.SimpleNamespace(id="f"))
+
+
+def test_sync_records_a_filing_without_documents_as_seen(tmp_path, monkeypatch):
+    fetched = []
+    pages = {EMPTY: b"", FULL: b"<a href='q.htm'>q</a>", DOC: b"<html>Cash 100</html>"}
+
+    def fetch(ec, urls, **kw):
+        fetched.extend(urls)
+        return [FetchResult(u, pages[u]) for u in urls]
+
+    monkeypatch.setattr(tools, "fetch_documents", fetch)
+    monkeypatch.setattr(tools, "_related_urls", lambda content: [DOC] if content else [])
+    state, client = UpdatesStoreState(1, root=str(tmp_path)), FakeClient()
+
+    digests = {}
+    sync_updates_vector_store(None, 1, [EMPTY, FULL], dt.date(2025, 1, 1), client=client,
+                              state=state, digests=digests)
+
+    assert client.batches == ["0000000001-25-000002"]
+    assert set(state.load()["accessions"]) == {"0000000001-25-000001", "0000000001-25-000002"}
+    assert set(digests) == set(state.load()["accessions"])
+
+    fetched.clear()
+    sync_updates_vector_store(None, 1, [EMPTY, FULL], dt.date(2025, 1, 1), client=client, state=state)
+    assert fetched == []                           # nothing left to fetch
+
+
+def test_sync_retries_a_filing_whose_index_failed(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "fetch_documents",
+                        lambda ec, urls, **kw: [FetchResult(u, error="timeout") for u in urls])
+    state = UpdatesStoreState(1, root=str(tmp_path))
+
+    sync_updates_vector_store(None, 1, [FULL], dt.date(2025, 1, 1), client=FakeClient(), state=state)
+
+    assert state.load()["accessions"] == {}
@@ -0,0 +1,87 @@
+# balancesheet/test_updates.py
+"""Offline tests of event identity and shard merging (updates.py)."""
+
+import pytest
+
+from models import FilingChange, UpdateSummary
+from updates import drop_known, merge_update_summaries, same_event, same_report, shard_filings
+
+
+def _change(date: str, log: str, citation: str = "", **kw) -> FilingChange:
+    return FilingChange(date=date, update_log=log, citation=citation, **kw)
+
+
+DIFFERENT_EVENTS = [
+    (_change("2025-03-01", "Issued 1,000,000 shares of common stock to Investor A for $2,000,000 cash"),
+     _change("2025-03-03", "Issued 500,000 shares of common stock to Investor B for $1,000,000 cash")),
+    (_change("2025-03-01", "Repaid $1,000,000 promissory note"),
+     _change("2025-03-02", "Repaid $2,500,000 promissory note")),
+    (_change("2025-03-01", "Granted 10,000 restricted shares to the CEO", shares_common=10_000),
+     _change("2025-03-04", "Granted 10,000 restricted shares to the CFO", shares_common=10_000)),
+    (_change("2025-03-01", "Issued $1,000,000 promissory note"),
+     _change("2025-03-02", "Repaid $1,000,000 promissory note")),
+]
+
+
+@pytest.mark.parametrize("a, b", DIFFERENT_EVENTS)
+def test_similar_wording_with_different_figures_or_details_is_two_events(a, b):
+    assert not same_event(a, b)
+    assert not same_event(b, a)
+
+
+def test_same_figures_and_details_reported_twice_is_one_event():
+    announced = _change("2025-03-01", "Issued 1,000,000 shares of common stock to Investor A "
+                                      "for $2.0 million", "8-K 0001234567-25-000010")
+    reported = _change("2025-03-05", "Sold 1,000,000 common shares to Investor A for gross "
+                                     "proceeds of $2,000,000", "10-Q", shares_common=1_000_000)
+
+    assert same_event(announced, reported)
+    assert not same_report(announced, reported)
+
+
+def test_matching_figures_outside_the_window_are_two_events():
+    a = _change("2025-03-01", "Repaid $1,000,000 promissory note")
+    b = _change("2025-04-01", "Repaid $1,000,000 promissory note")
+    assert not same_event(a, b)
+
+
+def test_events_without_figures_only_match_exactly():
+    a = _change("2025-03-01", "Entered into a lease for office space")
+    assert same_event(a, _change("2025-03-01", "entered into a  LEASE for office space"))
+    assert not same_event(a, _change("2025-03-02", "Entered into a lease for office space"))
+
+
+def test_same_report_by_accession_and_text():
+    a = _change("2025-03-01", "Repaid $1,000,000 promissory note", "8-K (0001234567-25-000010)")
+    b = _change("2025-03-03", "repaid $1,000,000  promissory note", "0001234567-25-000010, Item 2.04")
+    c = _change("2025-03-03", "repaid $1,000,000 promissory note", "0001234567-25-000099")
+    assert same_report(a, b)
+    assert not same_report(a, c)
+
+
+def test_merge_keeps_different_events_and_folds_duplicates():
+    first = UpdateSummary(changes=[*DIFFERENT_EVENTS[0],
+                                   _change("2025-03-10", "Repaid $1,000,000 promissory note", "8-K")])
+    second = UpdateSummary(changes=[_change("2025-03-12", "Repaid $1,000,000 of promissory notes",
+                                            "10-Q")])
+
+    merged = merge_update_summaries([first, second])
+
+    assert [ch.date for ch in merged.changes] == ["2025-03-01", "2025-03-03", "2025-03-10"]
+    assert merged.changes[-1].citation == "8-K; 10-Q"
+
+
+def test_drop_known_only_drops_exact_repeats():
+    applied = _change("2025-03-01", "Repaid $1,000,000 promissory note", "8-K (0001234567-25-000010)")
+    again   = _change("2025-03-02", "Repaid $1,000,000 promissory note", "0001234567-25-000010")
+    similar = _change("2025-03-04", "Repaid $1,000,000 of promissory notes",
+                      "8-K (0001234567-25-000020)")
+
+    assert drop_known([again, similar, DIFFERENT_EVENTS[1][1]], [applied]) == \
+        [similar, DIFFERENT_EVENTS[1][1]]
+
+
+def test_shard_filings():
+    assert shard_filings(["a", "b", "c"], 2) == [["a", "b"], ["c"]]
+    assert shard_filings(["a", "b"], 0) == [["a", "b"]]
+    assert shard_filings([], 0) == []
@@ -0,0 +1,159 @@
+# balancesheet/test_vs_registry.py
+"""Offline tests of VectorStoreRegistry against a fake vector_stores client."""
+
+import json
+import multiprocessing
+import time
+import types
+
+import pytest
+
+import conftest  # noqa: F401  settings fallback, also needed in spawned workers
+from vs_registry import UpdatesStoreState, VectorStoreRegistry, document_set_key
+
+_DAY = 24 * 60 * 60
+
+
+class FakeVectorStores:
+    """Stand-in for openai.OpenAI().vector_stores: retrieve + delete only."""
+
+    def __init__(self, stores=()):
+        self.stores    = {vs_id: "completed" for vs_id in stores}
+        self.deleted   = []
+        self.retrieved = []
+
+    def retrieve(self, vs_id):
+        self.retrieved.append(vs_id)
+        if vs_id not in self.stores:
+            raise LookupError(f"no vector store {vs_id}")
+        return types.SimpleNamespace(id=vs_id, status=self.stores[vs_id])
+
+    def delete(self, vs_id):
+        self.deleted.append(vs_id)
+        self.stores.pop(vs_id, None)
+
+
+def _registry(tmp_path, stores=(), **kw):
+    client = types.SimpleNamespace(vector_stores=FakeVectorStores(stores))
+    return VectorStoreRegistry(path=str(tmp_path / "vector_stores.json"), client=client, **kw), client
+
+
+def _entries(registry) -> dict:
+    with open(registry.path) as f:
+        return json.load(f)
+
+
+def test_document_set_key_ignores_order_but_not_content_or_variant():
+    a = [("a.htm", b"one"), ("b.htm", b"two")]
+    assert document_set_key(a) == document_set_key(reversed(a))
+    assert document_set_key(a) != document_set_key([("a.htm", b"one"), ("b.htm", b"2")])
+    assert document_set_key(a, "md") != document_set_key(a, "raw")
+
+
+def test_lookup_reuses_registered_store(tmp_path):
+    registry, client = _registry(tmp_path, stores=["vs_1"])
+    registry.register("k", "vs_1", name="1_10Q_vector")
+    before = _entries(registry)["k"]["last_used"]
+
+    time.sleep(0.01)
+    vs = registry.lookup("k")
+
+    assert vs.id == "vs_1"
+    assert client.vector_stores.retrieved == ["vs_1"]
+    assert _entries(registry)["k"]["last_used"] > before
+    assert registry.lookup("missing") is None
+
+
+@pytest.mark.parametrize("remote", ["deleted", "expired"])
+def test_lookup_drops_stores_gone_remotely(tmp_path, remote):
+    registry, client = _registry(tmp_path, stores=["vs_1"])
+    registry.register("k", "vs_1")
+    if remote == "deleted":
+        del client.vector_stores.stores["vs_1"]
+    else:
+        client.vector_stores.stores["vs_1"] = "expired"
+
+    assert registry.lookup("k") is None
+    assert "k" not in _entries(registry)
+
+
+def test_evict_drops_entries_past_ttl(tmp_path):
+    registry, client = _registry(tmp_path, stores=["vs_old", "vs_new"], ttl_days=30)
+    registry.register("old", "vs_old")
+    registry.register("new", "vs_new")
+    entries = _entries(registry)
+    entries["old"]["last_used"] -= 31 * _DAY
+    registry._save(entries)
+
+    assert registry.evict() == ["vs_old"]
+    assert client.vector_stores.deleted == ["vs_old"]
+    assert set(_entries(registry)) == {"new"}
+
+
+def test_register_evicts_least_recently_used_over_capacity(tmp_path):
+    registry, client = _registry(tmp_path, stores=["vs_1", "vs_2", "vs_3"], max_entries=2)
+    registry.register("k1", "vs_1")
+    time.sleep(0.01)
+    registry.register("k2", "vs_2")
+    time.sleep(0.01)
+    registry.lookup("k1")                 # k2 is now the least recently used
+    time.sleep(0.01)
+    registry.register("k3", "vs_3")
+
+    assert client.vector_stores.deleted == ["vs_2"]
+    assert set(_entries(registry)) == {"k1", "k3"}
+
+
+def _register_many(path: str, worker: int, n: int) -> None:
+    client = types.SimpleNamespace(vector_stores=FakeVectorStores())
+    registry = VectorStoreRegistry(path=path, client=client)
+    for i in range(n):
+        registry.register(f"{worker}-{i}", f"vs_{worker}_{i}")
+
+
+def test_concurrent_processes_keep_every_entry(tmp_path):
+    path = str(tmp_path / "vector_stores.json")
+    ctx  = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_register_many, args=(path, w, 20)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+    with open(path) as f:
+        assert len(json.load(f)) == 80
+
+
+# ---------------------------------------------------------------------------
+# UpdatesStoreState
+# ---------------------------------------------------------------------------
+
+def test_record_filing_keeps_filings_recorded_by_another_run(tmp_path):
+    mine, theirs = UpdatesStoreState(1, root=str(tmp_path)), UpdatesStoreState(1, root=str(tmp_path))
+    mine.save({"id": "vs_1", "since": "2025-01-01", "accessions": {}})
+
+    mine.record_filing("vs_1", "acc-1", {"files": 2})
+    theirs.record_filing("vs_1", "acc-2", {"files": 0})
+    theirs.record_filing("vs_old", "acc-3", {"files": 1})    # store replaced meanwhile
+
+    assert mine.load()["accessions"] == {"acc-1": {"files": 2}, "acc-2": {"files": 0}}
+
+
+def _record_many(root: str, worker: int, n: int) -> None:
+    state = UpdatesStoreState(1, root=root)
+    for i in range(n):
+        state.record_filing("vs_1", f"{worker}-{i}", {"files": 1})
+
+
+def test_concurrent_processes_keep_every_filing(tmp_path):
+    UpdatesStoreState(1, root=str(tmp_path)).save({"id": "vs_1", "since": None, "accessions": {}})
+    ctx   = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_record_many, args=(str(tmp_path), w, 20)) for w in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(60)
+        assert p.exitcode == 0
+
+    assert len(UpdatesStoreState(1, root=str(tmp_path)).load()["accessions"]) == 80
@@ -0,0 +1,261 @@
+# balancesheet/test_xbrl.py
+"""Offline tests of the inline-XBRL fast path (xbrl.py) on small hand-written documents."""
+
+import bs4
+import pytest
+
+from assemble import assemble_balance_sheet
+from xbrl import XbrlExtractionError, extract_balance_sheet, extract_cover_shares, fact_value
+
+CONTEXTS = """
+<xbrli:context id="c2024"><xbrli:entity></xbrli:entity>
+  <xbrli:period><xbrli:instant>2024-12-31</xbrli:instant></xbrli:period></xbrli:context>
+<xbrli:context id="c2025"><xbrli:entity></xbrli:entity>
+  <xbrli:period><xbrli:instant>2025-03-31</xbrli:instant></xbrli:period></xbrli:context>
+<xbrli:context id="c2025_pref"><xbrli:entity><xbrli:segment>
+  <xbrldi:explicitMember dimension="us-gaap:StatementClassOfStockAxis">
+    us-gaap:PreferredStockMember</xbrldi:explicitMember>
+  </xbrli:segment></xbrli:entity>
+  <xbrli:period><xbrli:instant>2025-03-31</xbrli:instant></xbrli:period></xbrli:context>
+"""
+
+
+def _cell(concept: str, ctx: str, text: str, negative: bool = False, **attrs) -> str:
+    extra = " ".join(f'{k}="{v}"' for k, v in attrs.items())
+    fact = (f'<ix:nonFraction name="us-gaap:{concept}" contextRef="{ctx}" unitRef="usd" {extra}>'
+            f'{text}</ix:nonFraction>')
+    return f"<td>$</td><td>({fact})</td>" if negative else f"<td>$</td><td>{fact}</td>"
+
+
+def _row(label: str, concept: str, current: str, prior: str = "1", negative: bool = False,
+         **attrs) -> str:
+    return (f"<tr><td>{label}</td>{_cell(concept, 'c2025', current, negative, **attrs)}"
+            f"{_cell(concept, 'c2024', prior, negative, **attrs)}</tr>")
+
+
+def _document(*rows: str) -> str:
+    return f"<html><body><ix:header><ix:resources>{CONTEXTS}</ix:resources></ix:header>" \
+           f"<table>{''.join(rows)}</table></body></html>"
+
+
+BALANCE_SHEET = _document(
+    _row("Cash", "CashAndCashEquivalentsAtCarryingValue", "1,200"),
+    _row("Accounts receivable, net", "AccountsReceivableNetCurrent", "300"),
+    _row("Total assets", "Assets", "1,500"),
+    _row("Accounts payable", "AccountsPayableCurrent", "400"),
+    _row("Total liabilities", "Liabilities", "400"),
+    _row("Common stock", "CommonStockValue", "50"),
+    _row("Additional paid-in capital", "AdditionalPaidInCapital", "1,250"),
+    _row("Accumulated deficit", "RetainedEarningsAccumulatedDeficit", "200", negative=True),
+    _row("Total stockholders' equity", "StockholdersEquity", "1,100"),
+    _row("Total liabilities and stockholders' equity", "LiabilitiesAndStockholdersEquity", "1,500"),
+)
+
+
+def test_reads_latest_context_and_drops_total_rows():
+    sheet = extract_balance_sheet(BALANCE_SHEET)
+
+    assert sheet.period_end == "2025-03-31" and sheet.context == "c2025"
+    assert [(l.line_item, l.value) for l in sheet.assets.lines] == \
+        [("Cash", 1_200), ("Accounts receivable, net", 300)]
+    assert [l.line_item for l in sheet.liabilities.lines] == ["Accounts payable"]
+    assert [(l.line_item, l.value) for l in sheet.equity.lines][-1] == ("Accumulated deficit", -200)
+    assert (sheet.assets.subtotal, sheet.liabilities.subtotal, sheet.equity.subtotal) == \
+        (1_500, 400, 1_100)
+    assert sheet.rounding == 0.0
+
+
+def test_fact_value_scale_sign_and_formats():
+    def fact(text: str, **attrs) -> bs4.Tag:
+        extra = " ".join(f'{k}="{v}"' for k, v in attrs.items())
+        html = f'<ix:nonFraction name="us-gaap:Cash" {extra}>{text}</ix:nonFraction>'
+        return bs4.BeautifulSoup(html, "lxml").find("ix:nonfraction")
+
+    assert fact_value(fact("1,234", scale="3")) == 1_234_000
+    assert fact_value(fact("1.5", scale="6", sign="-")) == -1_500_000
+    assert fact_value(fact("1.234,5", format="ixt:num-comma-decimal")) == 1_234.5
+    assert fact_value(fact("—", format="ixt:fixed-zero")) == 0.0
+    with pytest.raises(XbrlExtractionError):
+        fact_value(fact("n/a"))
+
+
+def test_sign_attribute_makes_a_line_negative():
+    concept = "RetainedEarningsAccumulatedDeficit"
+    doc = BALANCE_SHEET.replace(_cell(concept, "c2025", "200", negative=True),
+                                _cell(concept, "c2025", "200", sign="-"))
+    assert doc != BALANCE_SHEET
+
+    assert extract_balance_sheet(doc).equity.lines[-1].value == -200
+
+
+def test_rejects_a_sheet_whose_lines_do_not_add_up():
+    doc = BALANCE_SHEET.replace(">300<", ">350<", 1)
+    with pytest.raises(XbrlExtractionError, match="assets lines sum to 1,550"):
+        extract_balance_sheet(doc)
+
+
+def test_rejects_a_document_without_a_balance_sheet():
+    with pytest.raises(XbrlExtractionError, match="no inline-XBRL balance-sheet table"):
+        extract_balance_sheet(_document(_row("Cash", "Cash", "1")))
+
+
+# ---------------------------------------------------------------------------
+# scale / decimals and the shared rounding rule
+# ---------------------------------------------------------------------------
+
+def _thousands(*rows) -> str:
+    return _document(*(_row(label, concept, value, scale="3", decimals="-3")
+                       for label, concept, value in rows))
+
+
+ROUNDED = _thousands(
+    ("Cash", "Cash", "1,001"),                    # three lines rounded to the thousand
+    ("Receivables", "AccountsReceivableNetCurrent", "1,001"),
+    ("Prepaids", "PrepaidExpenseCurrent", "1,001"),
+    ("Total assets", "Assets", "3,004"),          # sum is 3,003: off by one rounding unit
+    ("Accounts payable", "AccountsPayableCurrent", "1,000"),
+    ("Total liabilities", "Liabilities", "1,000"),
+    ("Common stock", "CommonStockValue", "2,004"),
+    ("Total liabilities and stockholders' equity", "LiabilitiesAndStockholdersEquity", "3,004"),
+)
+
+
+def test_rounded_facts_are_accepted_within_half_a_unit_each():
+    sheet = extract_balance_sheet(ROUNDED)
+
+    assert sheet.rounding == 1_000
+    assert sheet.assets.lines[0].value == 1_001_000
+    assert sheet.assets.subtotal == 3_004_000
+
+
+def test_assembly_accepts_what_the_fast_path_accepted():
+    sheet = extract_balance_sheet(ROUNDED)
+
+    assembled = assemble_balance_sheet("Acme", "1", "2025-05-10", sheet.period_end, *sheet.tables,
+                                       rounding=sheet.rounding)
+
+    assert assembled.diagnostics is None
+    assert "Imbalance detected" not in [l.line_item for l in assembled.equity.lines]
+
+
+def test_exact_facts_get_no_rounding_allowance():
+    doc = ROUNDED.replace('decimals="-3"', 'decimals="INF"')
+    with pytest.raises(XbrlExtractionError, match="assets lines sum to 3,003,000"):
+        extract_balance_sheet(doc)
+
+
+def test_difference_beyond_the_rounding_allowance_is_rejected():
+    doc = ROUNDED.replace(">3,004<", ">3,010<")
+    with pytest.raises(XbrlExtractionError):
+        extract_balance_sheet(doc)
+
+
+# ---------------------------------------------------------------------------
+# liabilities / equity split without a Total liabilities row
+# ---------------------------------------------------------------------------
+
+def _no_total_liabilities(equity_total: str) -> str:
+    return _document(
+        _row("Cash", "Cash", "1,000"),
+        _row("Total assets", "Assets", "1,000"),
+        _row("Accounts payable", "AccountsPayableCurrent", "300"),
+        _row("Operating lease liability", "OperatingLeaseLiability", "100"),
+        _row("Common stock", "CommonStockValue", "700"),
+        _row("Accumulated deficit", "RetainedEarningsAccumulatedDeficit", "100", negative=True),
+        _row("Total stockholders' equity", "StockholdersEquity", equity_total),
+        _row("Total liabilities and stockholders' equity", "LiabilitiesAndStockholdersEquity", "1,000"),
+    )
+
+
+def test_split_by_concept_when_it_matches_the_equity_total():
+    sheet = extract_balance_sheet(_no_total_liabilities("600"))
+
+    assert [l.line_item for l in sheet.liabilities.lines] == \
+        ["Accounts payable", "Operating lease liability"]
+    assert sheet.liabilities.subtotal == 400 and sheet.equity.subtotal == 600
+
+
+def test_split_that_disagrees_with_the_equity_total_is_rejected():
+    with pytest.raises(XbrlExtractionError, match="liabilities / equity split is off"):
+        extract_balance_sheet(_no_total_liabilities("500"))
+
+
+# ---------------------------------------------------------------------------
+# cover page
+# ---------------------------------------------------------------------------
+
+def test_cover_shares_by_class():
+    doc = _document() + (
+        '<ix:nonFraction name="dei:EntityCommonStockSharesOutstanding" contextRef="c2025" '
+        'unitRef="shares">12,500,000</ix:nonFraction>'
+        '<ix:nonFraction name="dei:EntityCommonStockSharesOutstanding" contextRef="c2025_pref" '
+        'unitRef="shares">1,000</ix:nonFraction>'
+        '<ix:nonFraction name="us-gaap:Other" contextRef="c2025" unitRef="usd">None</ix:nonFraction>'
+    )
+    shares = extract_cover_shares(doc)
+
+    assert str(shares.as_of) == "2025-03-31"
+    assert (shares.common, shares.preferred) == (12_500_000, 1_000)
+
+
+COVER_CONTEXTS = """
+<xbrli:context id="cover"><xbrli:entity></xbrli:entity>
+  <xbrli:period><xbrli:instant>2025-05-01</xbrli:instant></xbrli:period></xbrli:context>
+<xbrli:context id="fy"><xbrli:entity></xbrli:entity>
+  <xbrli:period><xbrli:startDate>2024-01-01</xbrli:startDate>
+  <xbrli:endDate>2024-12-31</xbrli:endDate></xbrli:period></xbrli:context>
+"""
+
+
+def _class_context(cid: str, member: str, instant: str = "2025-05-01") -> str:
+    return (f'<xbrli:context id="{cid}"><xbrli:entity><xbrli:segment>'
+            f'<xbrldi:explicitMember dimension="us-gaap:StatementClassOfStockAxis">'
+            f'us-gaap:{member}</xbrldi:explicitMember></xbrli:segment></xbrli:entity>'
+            f'<xbrli:period><xbrli:instant>{instant}</xbrli:instant></xbrli:period></xbrli:context>')
+
+
+SHARES = "dei:EntityCommonStockSharesOutstanding"
+
+
+def _shares(ctx: str, text: str, name: str = SHARES, **attrs) -> str:
+    extra = " ".join(f'{k}="{v}"' for k, v in attrs.items())
+    return f'<ix:nonFraction name="{name}" contextRef="{ctx}" unitRef="shares" {extra}>{text}</ix:nonFraction>'
+
+
+def _cover(*facts: str, contexts: str = "") -> str:
+    return (f"<html><body><ix:header><ix:resources>{COVER_CONTEXTS}{contexts}</ix:resources>"
+            f"</ix:header><p>Shares outstanding: {''.join(facts)}</p></body></html>")
+
+
+def test_cover_sums_common_classes():
+    doc = _cover(_shares("a", "30,000,000"), _shares("b", "5,000,000"),
+                 contexts=_class_context("a", "CommonClassAMember") +
+                          _class_context("b", "CommonClassBMember"))
+    shares = extract_cover_shares(doc)
+
+    assert (shares.common, shares.preferred) == (35_000_000, None)
+    assert shares.by_class == {"us-gaap:commonclassamember": 30_000_000,
+                               "us-gaap:commonclassbmember": 5_000_000}
+
+
+def test_non_dimensional_cover_fact_is_the_common_total():
+    doc = _cover(_shares("cover", "36,000,000"), _shares("a", "30,000,000"),
+                 contexts=_class_context("a", "CommonClassAMember"))
+
+    assert extract_cover_shares(doc).common == 36_000_000
+
+
+def test_cover_uses_the_latest_date_and_scale():
+    doc = _cover(_shares("old", "9,000,000"), _shares("cover", "12.5", scale="6"),
+                 contexts=_class_context("old", "CommonStockMember", "2024-12-31"))
+    shares = extract_cover_shares(doc)
+
+    assert str(shares.as_of) == "2025-05-01"
+    assert (shares.common, shares.by_class) == (12_500_000, {})
+
+
+def test_cover_without_a_share_count_is_rejected():
+    with pytest.raises(XbrlExtractionError, match="no dei:EntityCommonStockSharesOutstanding"):
+        extract_cover_shares(_cover(_shares("fy", "1,000,000", name="dei:EntityPublicFloat")))
+    with pytest.raises(XbrlExtractionError):                 # fact with an undeclared context
+        extract_cover_shares(_cover(_shares("missing", "1,000")))
@@ -78,9 +78,14 @@ file search tool wrapper, HTML utils, etc.
 import io
 import os
 import re
+import time
+import threading
+import contextvars
 import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import date
-from typing import Iterable, List
+from typing import Dict, Iterable, List
 
 import bs4
 import openai
@@ -89,8 +94,14 @@ from openai.types import VectorStore
 from agents import FileSearchTool  # ← your wrapper from the prototype
 from EdgarCache.Client.Client import Client as EdgarCacheClient
 from EdgarCache.Sec.Submissions import Submission, Submissions
+from EdgarCache.Sec.Util import Util
 from models import FullBalanceSheet
 from settings import get_openai_client  # ← your OpenAI client from settings.py
+from vs_registry import VectorStoreRegistry, UpdatesStoreState, document_set_key
+from preprocess import PREPROCESS_VERSION, PreprocessResult, preprocess_document
+from local_search import BM25Index, build_local_index
+from runner import upload_slot
+from telemetry import span
 
 # ---------------------------------------------------------------------------
 # 1.  VectorStore helpers
@@ -101,10 +112,10 @@ class _VectorStoreItem:
     Wraps raw bytes + name to satisfy openai.vector_stores.file_batches.upload
     which expects a file-like object with .name attr.
     """
-    def __init__(self, content: bytes, url: str):
+    def __init__(self, content: bytes, url: str, name: str | None = None):
         self.content = content
         self.url     = url
-        self.name    = self._format_for_openai(url)
+        self.name    = name or self._format_for_openai(url)
 
     def _format_for_openai(self, url: str) -> str:
         return url.replace('.htm', '.html') if url.endswith('.htm') else url
@@ -124,70 +135,438 @@ def format_for_openai(url:str) -> str:
 
 
 
+_SKIP_EXTENSIONS = ('.xsd', '.xml', '.jpg', '.gif')
+
+
+def _filter_urls(urls: Iterable[str]) -> List[str]:
+    return [u for u in urls if not u.endswith(_SKIP_EXTENSIONS)]
+
+
+def _as_upload_files(
+        docs: Iterable[tuple[str, bytes]],
+        preprocess: bool,
+        prep_log: List[PreprocessResult] | None = None
+) -> List[io.BytesIO]:
+    if not preprocess:
+        return [_VectorStoreItem(content, url).as_file() for url, content in docs]
+    prepped = [preprocess_document(url, content) for url, content in docs]
+    if prep_log is not None:
+        prep_log.extend(prepped)
+    return [_VectorStoreItem(p.content, p.url, p.name).as_file() for p in prepped if p.content]
+
+
+def _upload_documents(
+        ec: EdgarCacheClient,
+        name: str,
+        urls: List[str],
+        client: openai.OpenAI,
+        fetch_log: List["FetchResult"] | None = None,
+        registry: VectorStoreRegistry | None = None,
+        preprocess: bool = False,
+        prep_log: List[PreprocessResult] | None = None,
+        **fetch_kw
+) -> VectorStore:
+    results = fetch_documents(ec, urls, **fetch_kw)
+    if fetch_log is not None:
+        fetch_log.extend(results)
+
+    docs = [(r.url, r.content) for r in results if r.content]
+    if not docs:
+        raise ValueError(f"No valid files found in URLs: {urls}")
+
+    key = None
+    if registry is not None:
+        key = document_set_key(docs, variant=PREPROCESS_VERSION if preprocess else "")
+        vs  = registry.lookup(key)
+        if vs is not None:
+            return vs
+
+    files = _as_upload_files(docs, preprocess, prep_log)
+    create_kw = {"expires_after": registry.expires_after()} if registry is not None else {}
+    with upload_slot(), span("vector_store.upload", "upload", store=name, files=len(files),
+                             bytes=sum(f.getbuffer().nbytes for f in files)):
+        vs = client.vector_stores.create(name=name, **create_kw)
+        client.vector_stores.file_batches.upload_and_poll(
+            vector_store_id=vs.id,
+            files=files
+        )
+    if registry is not None:
+        registry.register(key, vs.id, name)
+    return vs
+
+
 def create_vector_store(
         ec: EdgarCacheClient,
         name: str,
         urls: Iterable[str],
-        client: openai.OpenAI | None = None
+        client: openai.OpenAI | None = None,
+        fetch_log: List["FetchResult"] | None = None,
+        registry: VectorStoreRegistry | None = None,
+        preprocess: bool = False,
+        prep_log: List[PreprocessResult] | None = None,
+        **fetch_kw
 ) -> VectorStore:
     """
-    1. downloads each URL via EdgarCache
+    1. downloads each URL via EdgarCache (concurrently, see fetch_documents)
     2. creates an OpenAI vector-store
     3. uploads all documents and blocks until ready
+
+    Pass a list as `fetch_log` to get the per-document FetchResults back;
+    any other keyword (max_workers, timeout, retries) goes to fetch_documents.
+    With a `registry`, a store already holding the identical document set
+    is returned instead of steps 2-3.  With `preprocess`, HTML documents are
+    converted to compact markdown first (see preprocess.py) and their
+    before/after sizes appended to `prep_log`.
     """
     client = client or get_openai_client()
-    vs = client.vector_stores.create(name=name)
-
-    tmp = []
-    for u in urls:
-        if not u.endswith('.xsd') and not u.endswith('.xml') and not u.endswith('.jpg') and not u.endswith('.gif'):
-            tmp.append(u)
-    urls = tmp
-
-    files = []
-    for u in urls:
-        content = ec.Get(u).content
-        if content:
-            files.append(_VectorStoreItem(content, u).as_file())
-    if not files:
-        raise ValueError(f"No valid files found in URLs: {urls}")
-    client.vector_stores.file_batches.upload_and_poll(vector_store_id=vs.id,
-                                                      files=files)
-    return vs
+    return _upload_documents(ec, name, _filter_urls(urls), client,
+                             fetch_log=fetch_log, registry=registry,
+                             preprocess=preprocess, prep_log=prep_log, **fetch_kw)
+
 
 def create_vector_store_for_updates(
         ec: EdgarCacheClient,
         name: str,
-        urls: Iterable[str],
-        client: openai.OpenAI | None = None
+        urls: Iterable[Iterable[str]],
+        client: openai.OpenAI | None = None,
+        fetch_log: List["FetchResult"] | None = None,
+        registry: VectorStoreRegistry | None = None,
+        preprocess: bool = False,
+        prep_log: List[PreprocessResult] | None = None,
+        **fetch_kw
 ) -> VectorStore:
     """
-    1. downloads each URL via EdgarCache
-    2. creates an OpenAI vector-store
-    3. uploads all documents and blocks until ready
+    Same as create_vector_store but `urls` is one list of document URLs
+    per subsequent filing; the lists are flattened into a single store.
     """
     client = client or get_openai_client()
-    vs = client.vector_stores.create(name=name)
-
-    tmp = []
-    for sublist in urls:
-        for u in sublist:
-            if not u.endswith('.xsd') and not u.endswith('.xml') and not u.endswith('.jpg') and not u.endswith('.gif'):
-                tmp.append(u)
-    urls = tmp
-
-    files = []
-    for u in urls:
-        content = ec.Get(u).content
-        if content:
-            files.append(_VectorStoreItem(content, u).as_file())
-    if not files:
-        raise ValueError(f"No valid files found in URLs: {urls}")
-    client.vector_stores.file_batches.upload_and_poll(vector_store_id=vs.id,
-                                                      files=files)
+    flat = _filter_urls(u for sublist in urls for u in sublist)
+    return _upload_documents(ec, name, flat, client,
+                             fetch_log=fetch_log, registry=registry,
+                             preprocess=preprocess, prep_log=prep_log, **fetch_kw)
+
+
+def sync_updates_vector_store(
+        ec: EdgarCacheClient,
+        cik: int | str,
+        index_urls: Iterable[str],
+        since: date,
+        client: openai.OpenAI | None = None,
+        state: UpdatesStoreState | None = None,
+        fetch_log: List["FetchResult"] | None = None,
+        preprocess: bool = False,
+        prep_log: List[PreprocessResult] | None = None,
+        registry: VectorStoreRegistry | None = None,
+        digests: Dict[str, str] | None = None,
+        **fetch_kw
+) -> VectorStore:
+    """
+    Persistent per-CIK store of subsequent filings.
+
+    `index_urls` are the EDGAR index pages of every filing after `since`
+    (see get_all_sub_filings).  Filings whose accession number is already
+    recorded in `state` are skipped; only the new ones are fetched and
+    appended to the existing store, one file batch per filing tagged with
+    an `accession` attribute.
+
+    A store started from a different `since` (or preprocessing variant)
+    replaces the previous one, which is deleted.  Stores are created with
+    the `expires_after` policy of `registry` (default: a fresh
+    VectorStoreRegistry's TTL), so an abandoned one still expires.
+
+    Pass a dict as `digests` to get {accession: content digest} (see
+    filing_digests) of every filing of `index_urls` the store holds;
+    filings indexed before digests were recorded count by accession.
+    """
+    index_urls = list(index_urls)
+    client = client or get_openai_client()
+    state  = state or UpdatesStoreState(cik)
+    record = state.load()
+
+    vs = None
+    variant = PREPROCESS_VERSION if preprocess else ""
+    if record["id"] and record["since"] == since.isoformat() and record.get("variant", "") == variant:
+        try:
+            vs = client.vector_stores.retrieve(record["id"])
+        except Exception:
+            vs = None
+        if vs is not None and getattr(vs, "status", None) == "expired":
+            vs = None
+    if vs is None:
+        replaced = record["id"]
+        vs = client.vector_stores.create(name=f"{cik}_updates_vector",
+                                         expires_after=(registry or VectorStoreRegistry()).expires_after())
+        record = {"id": vs.id, "since": since.isoformat(), "variant": variant, "accessions": {}}
+        state.save(record)
+        if replaced:
+            try:
+                client.vector_stores.delete(replaced)
+            except Exception:
+                pass                      # already expired or deleted remotely
+
+    new_filings = {}
+    for u in index_urls:
+        acc = accession_from_url(u)
+        if acc not in record["accessions"]:
+            new_filings.setdefault(acc, u)
+    if not new_filings:
+        _held_digests(record, index_urls, digests)
+        return vs
+
+    index_pages = fetch_documents(ec, new_filings.values(), **fetch_kw)
+    doc_urls = {                          # failed fetches are retried on the next run
+        acc: _filter_urls(_related_urls(page.content)) if page.content else []
+        for acc, page in zip(new_filings, index_pages) if page.error is None
+    }
+    docs = fetch_documents(ec, [u for urls in doc_urls.values() for u in urls], **fetch_kw)
+    if fetch_log is not None:
+        fetch_log.extend(index_pages)
+        fetch_log.extend(docs)
+    by_url = {r.url: r for r in docs}
+
+    for acc, urls in doc_urls.items():
+        results = [by_url[u] for u in urls]
+        if any(r.error for r in results):
+            continue                      # retried on the next run
+        files = _as_upload_files([(r.url, r.content) for r in results if r.content],
+                                 preprocess, prep_log)
+        if files:
+            with upload_slot(), \
+                    span("vector_store.upload", "upload", store=f"{cik}_updates_vector", accession=acc,
+                         files=len(files), bytes=sum(f.getbuffer().nbytes for f in files)), \
+                    ThreadPoolExecutor(max_workers=FETCH_MAX_WORKERS) as pool:
+                file_ids = list(pool.map(
+                    lambda f: client.files.create(file=f, purpose="assistants").id, files
+                ))
+                client.vector_stores.file_batches.create_and_poll(
+                    vector_store_id=vs.id,
+                    file_ids=file_ids,
+                    attributes={"accession": acc, "cik": str(cik)},
+                )
+        # recorded even without files, so an empty filing is not fetched again
+        record["accessions"][acc] = {
+            "index_url":  new_filings[acc],
+            "files":      len(files),
+            "digest":     document_set_key([(r.url, r.content) for r in results if r.content]),
+            "indexed_at": dt.datetime.now().isoformat(timespec="seconds"),
+        }
+        state.record_filing(vs.id, acc, record["accessions"][acc])
+    _held_digests(record, index_urls, digests)
     return vs
 
 
+def _held_digests(record: dict, index_urls: List[str], out: Dict[str, str] | None) -> None:
+    if out is None:
+        return
+    for u in index_urls:
+        acc  = accession_from_url(u)
+        held = record["accessions"].get(acc)
+        if held is not None:
+            out[acc] = held.get("digest", acc)
+
+
+def create_local_index(
+        ec: EdgarCacheClient,
+        urls: Iterable[str],
+        fetch_log: List["FetchResult"] | None = None,
+        prep_log: List[PreprocessResult] | None = None,
+        **fetch_kw
+) -> BM25Index:
+    """
+    Local counterpart of create_vector_store: fetches and preprocesses the
+    documents, then builds an in-process BM25 index (see local_search.py).
+    """
+    results = fetch_documents(ec, _filter_urls(urls), **fetch_kw)
+    if fetch_log is not None:
+        fetch_log.extend(results)
+    prepped = [preprocess_document(r.url, r.content) for r in results if r.content]
+    if prep_log is not None:
+        prep_log.extend(prepped)
+    return build_local_index(
+        (p.name, p.content.decode('utf-8', errors='replace'), accession_from_url(p.url)) for p in prepped
+    )
+
+
+# ---------------------------------------------------------------------------
+# 1b. Concurrent document fetching
+# ---------------------------------------------------------------------------
+
+FETCH_MAX_WORKERS = 8       # EdgarCache round-trips in flight at once
+FETCH_TIMEOUT     = 60.0    # seconds per attempt
+FETCH_RETRIES     = 2       # extra attempts after the first failure
+FETCH_BACKOFF     = 0.5     # seconds, doubled after every failed attempt
+
+# threads that run the EdgarCache calls themselves, shared by every fetch so
+# that abandoned (timed-out) calls cannot pile up threads
+_CALL_POOL = ThreadPoolExecutor(max_workers=2 * FETCH_MAX_WORKERS, thread_name_prefix="edgar-get")
+
+# one lock per client that is not thread_safe: its calls run one at a time
+_client_locks: dict[int, threading.Lock] = {}
+_client_locks_guard = threading.Lock()
+
+
+class ThreadLocalEdgarClient:
+    """
+    One EdgarCache client per thread, made by `factory` on first use.  A
+    client's session and rate limiter are not safe to share between the
+    fetch workers, so fetch_documents only runs calls in parallel through a
+    client marked `thread_safe`; a plain client is called one at a time.
+    Every other attribute is forwarded to the calling thread's client.
+
+        ec = ThreadLocalEdgarClient(partial(EC, host, port))
+    """
+    thread_safe = True
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._local   = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self._factory()
+        return client
+
+    def Get(self, url: str):
+        return self._client().Get(url)
+
+    def __getattr__(self, name):
+        return getattr(self._client(), name)
+
+
+def _client_lock(ec) -> threading.Lock | None:
+    if getattr(ec, "thread_safe", False):
+        return None
+    with _client_locks_guard:
+        return _client_locks.setdefault(id(ec), threading.Lock())
+
+
+@dataclass
+class FetchResult:
+    """Outcome of one EdgarCache download. `content` is b'' on failure."""
+    url:      str
+    content:  bytes      = b''
+    elapsed:  float      = 0.0     # wall seconds including retries
+    attempts: int        = 0
+    error:    str | None = None
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.content)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and bool(self.content)
+
+
+def _call_with_timeout(fn, timeout: float | None):
+    """
+    Runs fn() on the bounded _CALL_POOL and raises TimeoutError if it has
+    not returned after `timeout` seconds.  The EdgarCache client has no
+    timeout of its own, so a stuck call is abandoned rather than cancelled;
+    it keeps one of the pool's threads until it returns, and once all of
+    them are stuck further calls time out instead of starting new threads.
+    """
+    if not timeout:
+        return fn()
+    future = _CALL_POOL.submit(contextvars.copy_context().run, fn)
+    try:
+        return future.result(timeout=timeout)
+    except TimeoutError:
+        future.cancel()                       # still queued: never runs
+        raise TimeoutError(f"no response after {timeout:.1f}s") from None
+
+
+def _fetch_one(ec: EdgarCacheClient, url: str, timeout: float | None,
+               retries: int, backoff: float) -> FetchResult:
+    result = FetchResult(url)
+    start  = time.perf_counter()
+    lock   = _client_lock(ec)
+
+    def get() -> bytes:
+        if lock is None:
+            return ec.Get(url).content
+        with lock:
+            return ec.Get(url).content
+
+    with span("edgar.get", "fetch", url=url) as s:
+        for attempt in range(retries + 1):
+            result.attempts = attempt + 1
+            try:
+                result.content = _call_with_timeout(get, timeout) or b''
+                result.error   = None
+                break
+            except Exception as exc:
+                result.error = f"{type(exc).__name__}: {exc}"
+                if attempt < retries:
+                    time.sleep(backoff * 2 ** attempt)
+        s.set(bytes=result.nbytes, attempts=result.attempts, failed=result.error)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def fetch_documents(
+        ec: EdgarCacheClient,
+        urls: Iterable[str],
+        max_workers: int = FETCH_MAX_WORKERS,
+        timeout: float | None = FETCH_TIMEOUT,
+        retries: int = FETCH_RETRIES,
+        backoff: float = FETCH_BACKOFF,
+) -> List[FetchResult]:
+    """
+    Downloads every URL through EdgarCache with at most `max_workers`
+    requests in flight (one at a time unless `ec` is thread_safe, see
+    ThreadLocalEdgarClient).  Each request gets `timeout` seconds per
+    attempt and up to `retries` retries with exponential backoff.  Failures
+    never raise; they come back as FetchResults with `error` set.
+
+    Results are returned in the same order as `urls`.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as pool:
+        # copy_context per task so fetch spans nest under the caller's span
+        futures = [pool.submit(contextvars.copy_context().run,
+                               _fetch_one, ec, u, timeout, retries, backoff) for u in urls]
+        return [f.result() for f in futures]
+
+
+def filing_digests(results: Iterable[FetchResult]) -> Dict[str, str]:
+    """
+    {accession: content digest of that filing's fetched documents}; the
+    digest is vs_registry.document_set_key, so it changes with any byte.
+    """
+    by_filing: Dict[str, list] = {}
+    for r in results:
+        if r.content:
+            by_filing.setdefault(accession_from_url(r.url), []).append((r.url, r.content))
+    return {acc: document_set_key(docs) for acc, docs in by_filing.items()}
+
+
+def summarize_fetches(results: Iterable[FetchResult], per_document: bool = False) -> str:
+    """
+    One-line summary (count, bytes, latency) of a batch of fetches, optionally
+    followed by one line per document.
+    """
+    results = list(results)
+    if not results:
+        return "Fetched 0 documents"
+    ok      = [r for r in results if r.ok]
+    total   = sum(r.nbytes for r in results)
+    slowest = max(results, key=lambda r: r.elapsed)
+    lines = [
+        f"Fetched {len(ok)}/{len(results)} documents, {total / 1e6:.2f} MB, "
+        f"mean {sum(r.elapsed for r in results) / len(results):.2f}s, "
+        f"slowest {slowest.elapsed:.2f}s ({slowest.url.rsplit('/', 1)[-1]})"
+    ]
+    if per_document:
+        for r in results:
+            status = "ok" if r.ok else (r.error or "empty")
+            lines.append(f"  {r.elapsed:6.2f}s {r.nbytes:>10,d} B  x{r.attempts}  {r.url}  [{status}]")
+    return "\n".join(lines)
+
+
 
 # ---------------------------------------------------------------------------
 # 2.  EDGAR index parsing
@@ -221,13 +600,52 @@ def get_plain_text(html: bytes) -> str:
 # 4.  Build a FileSearchTool in one line
 # ---------------------------------------------------------------------------
 
-def make_file_search_tool(vs_id: str, max_k: int = 12) -> FileSearchTool:
+def make_file_search_tool(vs_id: str, max_k: int = 12,
+                          accessions: Iterable[str] | None = None) -> FileSearchTool:
+    """
+    Hosted file search over `vs_id`; with `accessions`, restricted to the
+    files tagged with those accession numbers (sync_updates_vector_store).
+    None or an empty list searches the whole store.
+    """
+    filters = None
+    clauses = [{"type": "eq", "key": "accession", "value": acc} for acc in accessions or ()]
+    if clauses:
+        filters = clauses[0] if len(clauses) == 1 else {"type": "or", "filters": clauses}
     return FileSearchTool(
         max_num_results=max_k,
         vector_store_ids=[vs_id],
-        include_search_results=False
+        include_search_results=False,
+        filters=filters,
     )
 
+_ACCESSION_RE        = re.compile(r'(\d{10}-\d{2}-\d{6})')
+_ACCESSION_FOLDER_RE = re.compile(r'/(\d{18})/')
+
+
+def accession_from_url(url: str) -> str:
+    """
+    '.../000121390025042977/0001213900-25-042977-index.html' -> '0001213900-25-042977'
+    Falls back to the URL itself when no accession number is present.
+    """
+    m = _ACCESSION_RE.search(url)
+    if m:
+        return m.group(1)
+    m = _ACCESSION_FOLDER_RE.search(url)
+    if m:
+        d = m.group(1)
+        return f"{d[:10]}-{d[10:12]}-{d[12:]}"
+    return url
+
+
+def _related_urls(index_html: bytes) -> List[str]:
+    return list(Util.GetRelatedUrls(str(index_html).replace("/ix?doc=", "")))
+
+
+def get_filing_doc_urls(ec: EdgarCacheClient, index_url: str) -> List[str]:
+    """All document URLs linked from one filing's EDGAR index page."""
+    return _related_urls(ec.Get(index_url).content)
+
+
 def get_all_sub_filings(client: EdgarCacheClient, cik: int, start: dt.date) -> List[str]:
     """
     Returns a list of all filings for a given CIK after a given date.
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+# balancesheet/updates.py
+"""
+Sharding the subsequent-filings scan and merging the results.
+
+One update agent over every filing after the 10-Q has to discover dozens of
+8-Ks through a single search tool.  Instead the orchestrator splits the
+filings into shards (shard_filings), runs one update agent per shard with
+search restricted to that shard's accession numbers, and merges the
+UpdateSummary objects here.
+
+The same event is often reported twice, e.g. in the 8-K that announced it
+and again in the next 10-Q.  merge_update_summaries keeps the first report
+(shards are in filing order) and folds the duplicate's citation into it.
+Two changes are the same report (same_report) when
+
+    * their date and normalized log text match exactly, or
+    * they cite the same accession number with the same normalized log text,
+
+and the same event (same_event) when they are the same report or
+
+    * their dates are within DEDUPE_WINDOW_DAYS, they state the same dollar
+      amounts and share counts (at least one of them), and the words left
+      once figures and boilerplate ("shares", "common", "note", ...) are
+      removed in one log all appear in the other ("to the CEO" and "to the
+      CFO" are two grants; "to Investor A" and no counterparty may be one).
+
+Merging two different events drops a real change from the pro forma, so
+any difference in the figures or the details keeps both.
+
+make_record_change_tool gives the update agent a way to hand over each
+event while it is still scanning, so the accountant can start pricing
+(pipelined mode in orchestrator.build_balance_sheet).
+"""
+
+import datetime as dt
+import re
+from typing import Awaitable, Callable, Iterable, List, Optional, Sequence
+
+from models import FilingChange, UpdateSummary
+from local_search import tokenize
+from telemetry import span
+
+DEDUPE_WINDOW_DAYS = 7
+
+_STOPWORDS = {"a", "an", "and", "as", "at", "by", "company", "for", "from", "in", "its",
+              "of", "on", "the", "to", "with"}
+# words every equity or debt event shares; they say nothing about which one it is
+_BOILERPLATE = {"share", "shares", "common", "preferred", "stock", "note", "notes",
+                "promissory", "cash", "aggregate", "total", "principal", "amount",
+                "gross", "net", "proceeds", "of", "thousand", "million", "billion",
+                "per", "approximately", "was", "were", "has", "had", "been"}
+# the verbs 8-Ks and 10-Qs use for the same transaction
+_SYNONYMS = {"sold": "issued", "issue": "issued", "issuance": "issued", "sale": "issued",
+             "repayment": "repaid", "repay": "repaid", "paid": "repaid",
+             "grant": "granted", "awarded": "granted"}
+
+_ACCESSION_RE = re.compile(r"\b\d{10}-\d{2}-\d{6}\b")
+_NUMBER       = r"(\d[\d,]*(?:\.\d+)?)(?:\s*(thousand|million|billion)\b)?"
+_DOLLARS_RE   = re.compile(r"\$\s?" + _NUMBER, re.I)
+_SHARES_RE    = re.compile(r"(?<![$\d.,])(?<!\$\s)" + _NUMBER + r"\s+(?:[a-z-]+\s+){0,2}?shares?\b",
+                           re.I)
+_SCALE        = {None: 1, "thousand": 1e3, "million": 1e6, "billion": 1e9}
+
+
+def shard_filings(index_urls: Iterable[str], size: int = 1) -> List[List[str]]:
+    """Consecutive groups of `size` filings (size < 1: one shard with everything)."""
+    urls = list(index_urls)
+    if size < 1:
+        return [urls] if urls else []
+    return [urls[i:i + size] for i in range(0, len(urls), size)]
+
+
+# ---------------------------------------------------------------------------
+# 1. Event identity
+# ---------------------------------------------------------------------------
+
+def _parse_date(value: str | None) -> dt.date | None:
+    try:
+        return dt.date.fromisoformat((value or "").strip()[:10])
+    except ValueError:
+        return None
+
+
+def _detail_words(text: str) -> set:
+    """Words that tell events apart: no stopwords, boilerplate or figures."""
+    return {_SYNONYMS.get(t, t) for t in tokenize(text)
+            if t not in _STOPWORDS and t not in _BOILERPLATE and not t[0].isdigit()}
+
+
+def _amounts(regex: re.Pattern, text: str) -> set:
+    return {round(float(n.replace(",", "")) * _SCALE[(unit or "").lower() or None])
+            for n, unit in regex.findall(text)}
+
+
+def _figures(change: FilingChange) -> tuple:
+    """(dollar amounts, share counts) stated in the log or the share fields."""
+    shares = _amounts(_SHARES_RE, change.update_log)
+    shares |= {abs(n) for n in (change.shares_common, change.shares_preferred) if n}
+    return frozenset(_amounts(_DOLLARS_RE, change.update_log)), frozenset(shares)
+
+
+def change_key(change: FilingChange) -> tuple:
+    """Exact identity: date + whitespace/case-normalized log text."""
+    return change.date.strip(), " ".join(change.update_log.lower().split())
+
+
+def same_report(a: FilingChange, b: FilingChange) -> bool:
+    """The same change recorded twice: same key, or same accession and log text."""
+    if change_key(a) == change_key(b):
+        return True
+    return (change_key(a)[1] == change_key(b)[1]
+            and bool(set(_ACCESSION_RE.findall(a.citation)) & set(_ACCESSION_RE.findall(b.citation))))
+
+
+def same_event(a: FilingChange, b: FilingChange) -> bool:
+    if same_report(a, b):
+        return True
+    da, db = _parse_date(a.date), _parse_date(b.date)
+    if da is None or db is None or abs((da - db).days) > DEDUPE_WINDOW_DAYS:
+        return False
+    figures = _figures(a)
+    if not any(figures) or figures != _figures(b):
+        return False
+    wa, wb = _detail_words(a.update_log), _detail_words(b.update_log)
+    return wa <= wb or wb <= wa
+
+
+def drop_known(changes: Iterable[FilingChange], known: Iterable[FilingChange]) -> List[FilingChange]:
+    """
+    `changes` minus those that are the same report as one in `known`.  Only
+    exact repeats are dropped, so a similar-looking change from a new filing
+    is never mistaken for one already applied.
+    """
+    known = list(known)
+    return [ch for ch in changes if not any(same_report(ch, k) for k in known)]
+
+
+# ---------------------------------------------------------------------------
+# 2. Merging shard results
+# ---------------------------------------------------------------------------
+
+def _fold(kept: FilingChange, dup: FilingChange) -> None:
+    if dup.citation and dup.citation not in kept.citation:
+        kept.citation = f"{kept.citation}; {dup.citation}" if kept.citation else dup.citation
+    if kept.shares_common is None:
+        kept.shares_common = dup.shares_common
+    if kept.shares_preferred is None:
+        kept.shares_preferred = dup.shares_preferred
+    if kept.delta is None:
+        kept.delta = dup.delta
+
+
+def _latest_total(summaries: Sequence[UpdateSummary], field: str) -> int | None:
+    """The total reported by the shard whose changes are the most recent."""
+    best, best_date = None, dt.date.min
+    for s in summaries:
+        value = getattr(s, field)
+        if value is None:
+            continue
+        dates = [d for d in (_parse_date(ch.date) for ch in s.changes) if d]
+        when  = max(dates, default=dt.date.min)
+        if best is None or when >= best_date:
+            best, best_date = value, when
+    return best
+
+
+def merge_update_summaries(summaries: Sequence[UpdateSummary]) -> UpdateSummary:
+    """One UpdateSummary from per-shard summaries, duplicates folded, date-ordered."""
+    merged: List[FilingChange] = []
+    for summary in summaries:
+        for change in summary.changes:
+            kept = next((m for m in merged if same_event(m, change)), None)
+            if kept is None:
+                merged.append(change.model_copy(deep=True))
+            else:
+                _fold(kept, change)
+    merged.sort(key=lambda ch: _parse_date(ch.date) or dt.date.max)
+    return UpdateSummary(
+        changes=merged,
+        total_common_shares=_latest_total(summaries, "total_common_shares"),
+        total_preferred_shares=_latest_total(summaries, "total_preferred_shares"),
+    )
+
+
+# ---------------------------------------------------------------------------
+# 3. Incremental hand-over from the update agent
+# ---------------------------------------------------------------------------
+
+def make_record_change_tool(on_change: Callable[[FilingChange], Awaitable[None] | None]):
+    """FunctionTool the update agent calls once per event it has confirmed."""
+    from agents import function_tool
+
+    async def record_change(
+            date: str,
+            update_log: str,
+            citation: str,
+            shares_common: Optional[int] = None,
+            shares_preferred: Optional[int] = None,
+    ) -> str:
+        """
+        Record one settled balance-sheet event as soon as it is confirmed.
+
+        Args:
+            date: effective date of the event, YYYY-MM-DD.
+            update_log: what happened, with the amounts involved.
+            citation: which filing and where in it the event is described.
+            shares_common: net common shares issued (+) or retired (-), if any.
+            shares_preferred: net preferred shares issued (+) or retired (-), if any.
+        """
+        change = FilingChange(date=date, update_log=update_log, citation=citation,
+                              shares_common=shares_common, shares_preferred=shares_preferred)
+        with span("record_change", "tool", date=date):
+            result = on_change(change)
+            if result is not None:
+                await result
+        return "Recorded."
+
+    return function_tool(record_change, name_override="record_change")
@@ -0,0 +1,217 @@
+from __future__ import annotations
+
+# balancesheet/validation.py
+"""
+Deterministic checks on agent outputs.
+
+Each validator returns a list of human-readable problems; an empty list
+means the output passed.  They gate the model cascade (runner.run_cascade):
+a cheap tier's output is accepted only when its stage validator is happy.
+check_delta also gates every delta in apply_updates.
+"""
+
+import re
+from typing import Iterable, List, Sequence, Tuple
+
+from models import (
+    BalanceSheetDelta,
+    BalanceSheetDeltaList,
+    BalanceSheetLine,
+    BalanceSheetSections,
+    FullBalanceSheet,
+    SectionTable,
+    UpdateSummary,
+)
+
+TOLERANCE = 0.01
+_SECTIONS = ("assets", "liabilities", "equity")
+
+# which section to re-extract first when the three do not balance: equity
+# tables trip most often (deficits, NCI, mezzanine items), assets least
+_BALANCE_SUSPECTS = ("equity", "liabilities", "assets")
+
+# asset / liability lines that are negative by nature
+_CONTRA = ("accumulated", "allowance", "discount", "less", "reserve", "treasury")
+
+
+def _close(a: float, b: float, tolerance: float = TOLERANCE) -> bool:
+    return abs(a - b) <= tolerance
+
+
+# ---------------------------------------------------------------------------
+# 1. Section extraction
+# ---------------------------------------------------------------------------
+
+def check_section(table: SectionTable, section: str | None = None) -> List[str]:
+    problems = []
+    if section is not None and table.section != section:
+        problems.append(f"expected the {section} section, got {table.section!r}")
+    if not table.lines:
+        problems.append(f"{table.section}: no line items")
+    if table.subtotal is not None and not _close(table.subtotal, table.total):
+        problems.append(f"{table.section}: lines sum to {table.total:,.0f}, "
+                        f"reported total is {table.subtotal:,.0f}")
+    return problems
+
+
+def check_sections(tables: Sequence[SectionTable]) -> List[str]:
+    """All three sections (assets, liabilities, equity order) + the balance."""
+    if len(tables) != 3:
+        return [f"expected 3 section tables, got {len(tables)}"]
+    problems = []
+    for table, section in zip(tables, _SECTIONS):
+        problems.extend(check_section(table, section))
+    assets, liabilities, equity = tables
+    if not _close(assets.total, liabilities.total + equity.total):
+        problems.append(f"assets {assets.total:,.0f} != liabilities + equity "
+                        f"{liabilities.total + equity.total:,.0f}")
+    return problems
+
+
+def check_combined(sections: BalanceSheetSections) -> List[str]:
+    return check_sections((sections.assets, sections.liabilities, sections.equity))
+
+
+def section_suspects(tables: Sequence[SectionTable]) -> List[Tuple[str, List[str]]]:
+    """
+    The sections to re-extract, most likely culprit first, each with the
+    problems to show its agent.  Tables that fail their own checks come
+    first (and alone: the balance is judged once they pass).  When only
+    the balance fails, every section is a suspect; those without a reported
+    subtotal (nothing in the filing vouches for them) lead, then
+    _BALANCE_SUSPECTS order.
+    """
+    if len(tables) != 3:
+        return []
+    own = [(section, check_section(table, section)) for table, section in zip(tables, _SECTIONS)]
+    own = [(section, problems) for section, problems in own if problems]
+    if own:
+        return own
+    assets, liabilities, equity = tables
+    diff = assets.total - (liabilities.total + equity.total)
+    if _close(diff, 0):
+        return []
+    problem = (f"total assets {assets.total:,.0f} != liabilities {liabilities.total:,.0f} "
+               f"+ equity {equity.total:,.0f} (off by {diff:,.0f})")
+    subtotal = {section: table.subtotal is not None for table, section in zip(tables, _SECTIONS)}
+    order = sorted(_SECTIONS, key=lambda s: (subtotal[s], _BALANCE_SUSPECTS.index(s)))
+    return [(section, [problem]) for section in order]
+
+
+# ---------------------------------------------------------------------------
+# 2. Assembled sheet
+# ---------------------------------------------------------------------------
+
+def check_sheet(sheet: FullBalanceSheet) -> List[str]:
+    sections = [t.section for t in sheet.tables]
+    if sorted(sections) != sorted(_SECTIONS):
+        return [f"expected one table per section, got {sections}"]
+    if not sheet.balanced:
+        return [f"sheet is out of balance by {sheet.balance_difference():,.0f}"]
+    return []
+
+
+# ---------------------------------------------------------------------------
+# 3. Updates and deltas
+# ---------------------------------------------------------------------------
+
+def check_update_summary(summary: UpdateSummary) -> List[str]:
+    problems = []
+    for i, change in enumerate(summary.changes):
+        if not change.update_log.strip():
+            problems.append(f"change {i}: empty update_log")
+        if not change.citation.strip():
+            problems.append(f"change {i}: empty citation")
+    for name in ("total_common_shares", "total_preferred_shares"):
+        value = getattr(summary, name)
+        if value is not None and value < 0:
+            problems.append(f"{name} is negative")
+    return problems
+
+
+def check_deltas(deltas: BalanceSheetDeltaList, changes: int | None = None) -> List[str]:
+    """Every delta balanced and, when `changes` is given, one delta per change."""
+    problems = []
+    if changes is not None and len(deltas.deltas) != changes:
+        problems.append(f"{len(deltas.deltas)} deltas for {changes} changes")
+    for i, delta in enumerate(deltas.deltas):
+        if not delta.balanced:
+            problems.append(
+                f"delta {i} unbalanced: assets {delta.sum_assets():,.0f} vs "
+                f"liabilities + equity {delta.sum_liabilities() + delta.sum_equity():,.0f}"
+            )
+    return problems
+
+
+def _normalize(name: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", name.lower()))
+
+
+def _candidates(table: SectionTable, name: str) -> List[BalanceSheetLine]:
+    exact = [l for l in table.lines if l.line_item == name]
+    if exact:
+        return exact[:1]
+    key = _normalize(name)
+    if not key:
+        return []
+    same = [l for l in table.lines if _normalize(l.line_item) == key]
+    if same:
+        return same
+    return [l for l in table.lines
+            if f"{_normalize(l.line_item)} ".startswith(f"{key} ")
+            or f"{key} ".startswith(f"{_normalize(l.line_item)} ")]
+
+
+def resolve_line_item(table: SectionTable, name: str) -> BalanceSheetLine | None:
+    """
+    The line of `table` a delta entry named `name` refers to: an exact
+    match, else a case/punctuation-insensitive one, else the only line whose
+    name starts with `name` (or the other way round), e.g. "Cash" ->
+    "Cash and cash equivalents".  None when nothing or several lines match.
+    """
+    lines = _candidates(table, name)
+    return lines[0] if len(lines) == 1 else None
+
+
+def check_delta(delta: BalanceSheetDelta, sheet: FullBalanceSheet) -> List[str]:
+    """
+    One delta against the sheet it is about to be applied to: balanced,
+    every entry named and resolvable without ambiguity, and no asset or
+    liability line (other than contra accounts) driven below zero.  A line
+    is judged on its own `value`, the field apply_updates changes, not on
+    `total_value` with its components.
+    """
+    problems = []
+    if not delta.balanced:
+        problems.append(f"unbalanced: assets {delta.sum_assets():,.0f} vs "
+                        f"liabilities + equity {delta.sum_liabilities() + delta.sum_equity():,.0f}")
+    for section in _SECTIONS:
+        table = getattr(sheet, section)
+        after = {}                              # resolved line -> value after the delta
+        for entry in getattr(delta, section):
+            if not entry.line_item.strip():
+                problems.append(f"{section}: entry of {entry.value:,.0f} has no line item")
+                continue
+            lines = _candidates(table, entry.line_item)
+            if len(lines) > 1:
+                names = ", ".join(repr(l.line_item) for l in lines[:3])
+                problems.append(f"{section}: {entry.line_item!r} matches several line items ({names})")
+                continue
+            line = lines[0] if lines else None
+            name = line.line_item if line is not None else entry.line_item
+            base = line.value if line is not None else 0.0
+            after[name] = after.get(name, base) + entry.value
+        if section == "equity":
+            continue                            # deficits and treasury stock are normal
+        for name, value in after.items():
+            if value < -TOLERANCE and not any(w in _normalize(name).split() for w in _CONTRA):
+                problems.append(f"{section}: {name!r} would be negative ({value:,.0f})")
+    return problems
+
+
+def summarize_problems(problems: Iterable[str], limit: int = 3) -> str:
+    problems = list(problems)
+    text = "; ".join(problems[:limit])
+    if len(problems) > limit:
+        text += f" (+{len(problems) - limit} more)"
+    return text
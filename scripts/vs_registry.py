@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+# balancesheet/vs_registry.py
+"""
+Local registry of OpenAI vector stores keyed by the documents they hold.
+
+Re-running a CIK uploads exactly the same filing documents again, so the
+registry maps a content hash of the document set to the id of the store
+that already indexes it.  A hit skips upload-and-poll entirely; only a
+changed document set creates a new store.
+
+Eviction: entries unused for `ttl_days` or beyond `max_entries` (least
+recently used first) are dropped and their remote stores deleted.  Stores
+are also created with an OpenAI `expires_after` policy of the same length
+so nothing leaks if the registry file is lost.
+
+The client only needs `vector_stores.retrieve` / `vector_stores.delete`,
+so any stand-in object with those methods can be passed instead of
+openai.OpenAI.
+
+The file is shared by every process on the machine (batch workers, a
+refresh running alongside a build), so each read-modify-write holds an OS
+file lock (file_lock) and re-reads the file under it; the lock is never
+held across a network call.
+
+UpdatesStoreState is the per-CIK counterpart for the subsequent-filings
+store: it remembers which accession numbers are already indexed so each
+run only uploads filings that appeared since the last one.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, Tuple
+
+from settings import CACHE_DIR
+
+_DEFAULT_PATH = os.path.join(CACHE_DIR, "vector_stores.json")
+_DAY = 24 * 60 * 60
+
+
+# flock is per open file, so threads of one process serialize here first
+_thread_lock = threading.RLock()
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock on `path` + ".lock" across processes (and threads)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _thread_lock, open(path + ".lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:       # LK_LOCK gives up after ~10s; keep waiting
+                    pass
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def document_set_key(docs: Iterable[Tuple[str, bytes]], variant: str = "") -> str:
+    """
+    sha256 over the sorted (url, sha256(content)) pairs of a document set.
+    `variant` distinguishes different treatments of the same raw bytes.
+    """
+    h = hashlib.sha256(variant.encode())
+    for url, digest in sorted((u, hashlib.sha256(c).hexdigest()) for u, c in docs):
+        h.update(url.encode())
+        h.update(b"\0")
+        h.update(digest.encode())
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+class VectorStoreRegistry:
+    """
+    JSON file of {key: {"id", "name", "created", "last_used"}}.
+
+    Writes go through a temp file + os.replace so concurrent readers never
+    see a half-written registry, and every read-modify-write runs under
+    file_lock(path) so concurrent processes do not drop each other's
+    entries.
+    """
+
+    def __init__(
+            self,
+            path: str | None = None,
+            ttl_days: float = 30,
+            max_entries: int = 200,
+            client=None,
+    ):
+        self.path        = path or _DEFAULT_PATH
+        self.ttl_days    = ttl_days
+        self.max_entries = max_entries
+        self._client     = client
+
+    # -- persistence --------------------------------------------------------
+
+    @property
+    def client(self):
+        if self._client is None:
+            from settings import get_openai_client
+            self._client = get_openai_client()
+        return self._client
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self, entries: dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f, indent=1)
+        os.replace(tmp, self.path)
+
+    # -- public API ---------------------------------------------------------
+
+    def lookup(self, key: str):
+        """
+        Returns the live remote VectorStore registered under `key`, or None.
+        Entries whose store has expired or been deleted remotely are dropped.
+        """
+        entry = self._load().get(key)
+        if entry is None:
+            return None
+
+        try:
+            vs = self.client.vector_stores.retrieve(entry["id"])
+        except Exception:
+            vs = None
+        alive = vs is not None and getattr(vs, "status", None) != "expired"
+
+        with file_lock(self.path):
+            entries = self._load()
+            current = entries.get(key)
+            if current is not None and current["id"] == entry["id"]:   # not replaced meanwhile
+                if alive:
+                    current["last_used"] = time.time()
+                else:
+                    del entries[key]
+                self._save(entries)
+        return vs if alive else None
+
+    def register(self, key: str, vs_id: str, name: str = "") -> None:
+        with file_lock(self.path):
+            entries = self._load()
+            now = time.time()
+            entries[key] = {"id": vs_id, "name": name, "created": now, "last_used": now}
+            self._save(entries)
+        self.evict()
+
+    def evict(self) -> list[str]:
+        """
+        Drops expired and over-capacity entries (LRU) and deletes their
+        remote stores.  Returns the evicted vector store ids.
+        """
+        with file_lock(self.path):
+            entries = self._load()
+            cutoff  = time.time() - self.ttl_days * _DAY
+            by_age  = sorted(entries.items(), key=lambda kv: kv[1]["last_used"], reverse=True)
+
+            keep, evicted = {}, []
+            for key, entry in by_age:
+                if entry["last_used"] < cutoff or len(keep) >= self.max_entries:
+                    evicted.append(entry["id"])
+                else:
+                    keep[key] = entry
+            if evicted:
+                self._save(keep)
+
+        for vs_id in evicted:
+            try:
+                self.client.vector_stores.delete(vs_id)
+            except Exception:
+                pass          # already gone remotely
+        return evicted
+
+    def expires_after(self) -> dict:
+        """`expires_after` argument for vector_stores.create matching the TTL."""
+        return {"anchor": "last_active_at", "days": max(1, int(self.ttl_days))}
+
+
+class UpdatesStoreState:
+    """
+    JSON file per CIK:
+        {"id": vector store id, "since": yyyy-mm-dd,
+         "accessions": {accession: {"index_url", "files", "digest", "indexed_at"}}}
+
+    `since` is the base filing date the store was started from; a run with
+    a different base date starts a fresh store, otherwise events predating
+    the new base filing would leak into the update agent's search results.
+
+    Writes hold file_lock(path) like VectorStoreRegistry; record_filing
+    re-reads the file under it so two runs syncing the same CIK keep each
+    other's filings.
+    """
+
+    def __init__(self, cik: int | str, root: str | None = None):
+        self.cik  = str(cik)
+        self.path = os.path.join(root or os.path.join(CACHE_DIR, "updates_stores"),
+                                 f"{self.cik}.json")
+
+    def load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {"id": None, "since": None, "accessions": {}}
+
+    def save(self, state: dict) -> None:
+        with file_lock(self.path):
+            self._write(state)
+
+    def record_filing(self, store_id: str, accession: str, entry: dict) -> None:
+        """Adds one indexed filing, unless the file now names another store."""
+        with file_lock(self.path):
+            state = self.load()
+            if state["id"] == store_id:
+                state["accessions"][accession] = entry
+                self._write(state)
+
+    def _write(self, state: dict) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f, indent=1)
+        os.replace(tmp, self.path)
@@ -0,0 +1,416 @@
+from __future__ import annotations
+
+# balancesheet/xbrl.py
+"""
+Deterministic balance-sheet extraction from inline XBRL.
+
+Most 10-Q / 10-K primary documents tag every number on the face of the
+balance sheet with <ix:nonFraction>.  This module locates the statement
+table (the one tagging both us-gaap:Assets and
+us-gaap:LiabilitiesAndStockholdersEquity), picks the most recent
+non-dimensional instant context, and reads the rows in presentation order
+into the same three SectionTable objects the section agents return:
+
+  * values are in whole USD (scale applied), negative when the filing
+    shows them in parentheses or tags them with sign="-";
+  * total / subtotal rows are dropped, mirroring the section prompt;
+  * mezzanine (temporary) equity is placed in the equity section.
+
+The result is only returned when it passes validation (section sums match
+the tagged totals, the sheet balances, and assemble.check_tables passes
+with the same rounding allowance, assemble.rounding_tolerance, that
+assembly will use); otherwise XbrlExtractionError is raised and the caller
+falls back to the LLM agents.  Without a "Total
+liabilities" row the liabilities / equity split is guessed from concept
+names, so it must then match a tagged stockholders' equity total.
+"""
+
+import datetime as dt
+import re
+from dataclasses import dataclass, field
+from typing import Collection, Dict, List, Optional
+
+import bs4
+
+from assemble import check_tables, rounding_tolerance
+from models import BalanceSheetLine, SectionTable
+
+
+class XbrlExtractionError(ValueError):
+    """The document has no usable inline-XBRL balance sheet."""
+
+
+ASSETS       = 'us-gaap:assets'
+LIABILITIES  = 'us-gaap:liabilities'
+LIAB_AND_EQ  = ('us-gaap:liabilitiesandstockholdersequity',)
+EQUITY_TOTALS = (
+    'us-gaap:stockholdersequity',
+    'us-gaap:stockholdersequityincludingportionattributabletononcontrollinginterest',
+)
+_TOTAL_CONCEPTS = {
+    ASSETS, LIABILITIES, *LIAB_AND_EQ, *EQUITY_TOTALS,
+    'us-gaap:assetscurrent', 'us-gaap:assetsnoncurrent',
+    'us-gaap:liabilitiescurrent', 'us-gaap:liabilitiesnoncurrent',
+}
+# concepts that start the equity block when there is no "Total liabilities" row
+_EQUITY_CONCEPT_RE = re.compile(
+    r'(stock(?!holder)|capital|earnings|deficit|comprehensive|equity|minorityinterest|'
+    r'treasury|temporaryequity)', re.I
+)
+_ZERO_FORMATS = ('fixed-zero', 'fixedzero', 'zerodash', 'fixed-empty')
+
+
+# ---------------------------------------------------------------------------
+# 1.  Facts and contexts
+# ---------------------------------------------------------------------------
+
+@dataclass
+class XbrlContext:
+    id:          str
+    instant:     Optional[dt.date] = None
+    start:       Optional[dt.date] = None
+    end:         Optional[dt.date] = None
+    dimensional: bool = False
+    members:     Dict[str, str] = field(default_factory=dict)   # axis -> member
+
+
+@dataclass
+class XbrlFact:
+    name:     str                   # lower-cased qname, e.g. 'us-gaap:assets'
+    context:  str
+    value:    float                 # signed, whole units
+    unit:     Optional[str] = None
+    decimals: Optional[str] = None
+    tag:      Optional[bs4.Tag] = field(default=None, repr=False)
+
+
+def _parse_date(text: str | None) -> Optional[dt.date]:
+    if not text:
+        return None
+    try:
+        return dt.date.fromisoformat(text.strip()[:10])
+    except ValueError:
+        return None
+
+
+def parse_contexts(soup: bs4.BeautifulSoup) -> Dict[str, XbrlContext]:
+    contexts = {}
+    for ctx in soup.find_all('xbrli:context'):
+        cid = ctx.get('id')
+        if not cid:
+            continue
+        contexts[cid] = XbrlContext(
+            id          = cid,
+            instant     = _parse_date(getattr(ctx.find('xbrli:instant'), 'text', None)),
+            start       = _parse_date(getattr(ctx.find('xbrli:startdate'), 'text', None)),
+            end         = _parse_date(getattr(ctx.find('xbrli:enddate'), 'text', None)),
+            dimensional = ctx.find(['xbrli:segment', 'xbrli:scenario']) is not None,
+            members     = {
+                (m.get('dimension') or '').lower(): m.get_text(strip=True).lower()
+                for m in ctx.find_all('xbrldi:explicitmember')
+            },
+        )
+    return contexts
+
+
+def fact_value(tag: bs4.Tag) -> float:
+    """
+    Numeric value of an <ix:nonFraction>: display text parsed according to
+    its `format`, multiplied by 10**scale, negated when sign="-".
+    """
+    fmt  = (tag.get('format') or '').lower()
+    text = tag.get_text(strip=True)
+    if any(z in fmt for z in _ZERO_FORMATS) or text in ('', '-', '—', '–'):
+        number = 0.0
+    else:
+        if 'comma' in fmt:                          # 1.234,56
+            text = text.replace('.', '').replace(' ', '').replace(',', '.')
+        else:                                       # 1,234.56
+            text = text.replace(',', '').replace(' ', '')
+        try:
+            number = float(text)
+        except ValueError as exc:
+            raise XbrlExtractionError(f"unparseable fact {tag.get('name')}: {text!r}") from exc
+    number *= 10 ** int(tag.get('scale') or 0)
+    if tag.get('sign') == '-':
+        number = -number
+    return number
+
+
+def parse_facts(soup: bs4.BeautifulSoup, names: Collection[str] | None = None) -> List[XbrlFact]:
+    """
+    Every numeric fact, or only those whose lower-cased concept is in
+    `names`; other facts are not parsed at all, so an unparseable value
+    elsewhere in the document cannot fail the lookup.
+    """
+    facts = []
+    for tag in soup.find_all('ix:nonfraction'):
+        if tag.find('ix:nonfraction') is not None:      # nested wrapper
+            continue
+        if names is not None and (tag.get('name') or '').lower() not in names:
+            continue
+        facts.append(XbrlFact(
+            name     = (tag.get('name') or '').lower(),
+            context  = tag.get('contextref') or '',
+            value    = fact_value(tag),
+            unit     = tag.get('unitref'),
+            decimals = tag.get('decimals'),
+            tag      = tag,
+        ))
+    return facts
+
+
+# ---------------------------------------------------------------------------
+# 2.  Balance-sheet table
+# ---------------------------------------------------------------------------
+
+@dataclass
+class XbrlBalanceSheet:
+    period_end:  str
+    context:     str
+    assets:      SectionTable
+    liabilities: SectionTable
+    equity:      SectionTable
+    totals:      Dict[str, float] = field(default_factory=dict)
+    rounding:    float = 0.0        # coarsest rounding of the facts (see _rounding_unit)
+
+    @property
+    def tables(self) -> List[SectionTable]:
+        return [self.assets, self.liabilities, self.equity]
+
+
+def _displayed_negative(tag: bs4.Tag) -> bool:
+    """True when the number is shown in parentheses on the statement."""
+    td = tag.find_parent(['td', 'th'])
+    if td is None:
+        return False
+    if '(' in td.get_text():
+        return True
+    prev_td = td.find_previous_sibling(['td', 'th'])
+    next_td = td.find_next_sibling(['td', 'th'])
+    return bool(
+        (prev_td is not None and prev_td.get_text(strip=True).endswith('(')) or
+        (next_td is not None and next_td.get_text(strip=True).startswith(')'))
+    )
+
+
+def _row_label(tr: bs4.Tag) -> str:
+    for td in tr.find_all(['td', 'th']):
+        if td.find('ix:nonfraction') is not None:
+            break
+        text = ' '.join(td.get_text(' ', strip=True).split())
+        if text and text not in ('$', '(', ')'):
+            return text
+    return ''
+
+
+def _find_statement_table(soup: bs4.BeautifulSoup) -> bs4.Tag:
+    for table in soup.find_all('table'):
+        names = {(t.get('name') or '').lower() for t in table.find_all('ix:nonfraction')}
+        if ASSETS in names and names & set(LIAB_AND_EQ):
+            return table
+    raise XbrlExtractionError("no inline-XBRL balance-sheet table found")
+
+
+def _latest_context(table: bs4.Tag, contexts: Dict[str, XbrlContext]) -> XbrlContext:
+    candidates = [
+        contexts[t.get('contextref')]
+        for t in table.find_all('ix:nonfraction')
+        if (t.get('name') or '').lower() == ASSETS and t.get('contextref') in contexts
+    ]
+    candidates = [c for c in candidates if c.instant and not c.dimensional]
+    if not candidates:
+        raise XbrlExtractionError("no instant context for us-gaap:Assets")
+    return max(candidates, key=lambda c: c.instant)
+
+
+def _rounding_unit(decimals: str | None) -> float:
+    """decimals="-3" -> 1000: the fact is only exact to the thousand."""
+    if not decimals or decimals.upper() == 'INF':
+        return 0.0
+    try:
+        return 10.0 ** -int(decimals)
+    except ValueError:
+        return 0.0
+
+
+def extract_balance_sheet(html: bytes | str) -> XbrlBalanceSheet:
+    """
+    Parses the balance sheet out of one inline-XBRL document.
+    Raises XbrlExtractionError when the statement is missing or does not
+    validate.
+    """
+    soup     = bs4.BeautifulSoup(html, 'lxml')
+    contexts = parse_contexts(soup)
+    table    = _find_statement_table(soup)
+    ctx      = _latest_context(table, contexts)
+    period   = ctx.instant.isoformat()
+
+    sections: Dict[str, List[BalanceSheetLine]] = {'assets': [], 'liabilities': [], 'equity': []}
+    concepts: Dict[str, List[str]] = {'assets': [], 'liabilities': [], 'equity': []}
+    totals:   Dict[str, float] = {}
+    current = 'assets'
+    unit    = 0.0                   # coarsest rounding among the facts read
+
+    for tr in table.find_all('tr'):
+        tags = [t for t in tr.find_all('ix:nonfraction') if t.get('contextref') == ctx.id]
+        if not tags:
+            continue
+        tag   = tags[0]
+        name  = (tag.get('name') or '').lower()
+        label = _row_label(tr)
+        value = abs(fact_value(tag))
+        if _displayed_negative(tag) or tag.get('sign') == '-':
+            value = -value
+        unit = max(unit, _rounding_unit(tag.get('decimals')))
+
+        if name in _TOTAL_CONCEPTS or label.lower().startswith('total'):
+            totals.setdefault(name, value)
+            if name == ASSETS:
+                current = 'liabilities'
+            elif name == LIABILITIES:
+                current = 'equity'
+            continue
+
+        if current == 'liabilities' and LIABILITIES not in totals and _EQUITY_CONCEPT_RE.search(name.split(':')[-1]):
+            current = 'equity'
+
+        sections[current].append(
+            BalanceSheetLine(line_item=label or name.split(':')[-1], value=value, as_of_date=period)
+        )
+        concepts[current].append(name)
+
+    total_assets = totals.get(ASSETS)
+    total_le     = next((totals[n] for n in LIAB_AND_EQ if n in totals), None)
+    if total_assets is None or total_le is None:
+        raise XbrlExtractionError("statement is missing Total assets or Total liabilities and equity")
+
+    sum_a = sum(l.value for l in sections['assets'])
+    sum_l = sum(l.value for l in sections['liabilities'])
+    sum_e = sum(l.value for l in sections['equity'])
+
+    # a sum of n rounded facts can be off by n half-units from its rounded total
+    def close(a: float, b: float, lines: int) -> bool:
+        return abs(a - b) <= rounding_tolerance(lines + 1, unit)
+
+    n_a, n_l, n_e = (len(sections[k]) for k in ('assets', 'liabilities', 'equity'))
+    problems = []
+    if not close(sum_a, total_assets, n_a):
+        problems.append(f"assets lines sum to {sum_a:,.0f}, Total assets is {total_assets:,.0f}")
+    if not close(sum_l + sum_e, total_le, n_l + n_e):
+        problems.append(f"liabilities + equity lines sum to {sum_l + sum_e:,.0f}, "
+                        f"total liabilities and equity is {total_le:,.0f}")
+    if not close(total_assets, total_le, 1):
+        problems.append("Total assets does not equal total liabilities and equity")
+    total_liab = totals.get(LIABILITIES)
+    if total_liab is not None and not close(sum_l, total_liab, n_l):
+        problems.append(f"liabilities lines sum to {sum_l:,.0f}, Total liabilities is {total_liab:,.0f}")
+    if total_liab is None:
+        # the split came from _EQUITY_CONCEPT_RE: the equity lines must add up to a
+        # tagged equity total, allowing for mezzanine / noncontrolling rows outside it
+        def part(pattern: str) -> float:
+            return sum(l.value for l, c in zip(sections['equity'], concepts['equity'])
+                       if re.search(pattern, c))
+        candidates = [totals[n] + extra for n in EQUITY_TOTALS if n in totals
+                      for extra in (0.0, part('temporaryequity'),
+                                    part('temporaryequity|minorityinterest|noncontrolling'))]
+        if not candidates:
+            problems.append("no Total liabilities or stockholders' equity total to check the "
+                            "liabilities / equity split against")
+        elif not any(close(sum_e, c, n_e) for c in candidates):
+            problems.append(f"equity lines sum to {sum_e:,.0f}, stockholders' equity total is "
+                            f"{candidates[0]:,.0f}: liabilities / equity split is off")
+    if not sections['liabilities'] and not sections['equity']:
+        problems.append("no liability or equity lines found")
+    if problems:
+        raise XbrlExtractionError("; ".join(problems))
+
+    liab_subtotal = total_liab if total_liab is not None else sum_l
+    sheet = XbrlBalanceSheet(
+        period_end  = period,
+        context     = ctx.id,
+        assets      = SectionTable(section='assets', lines=sections['assets'], subtotal=total_assets),
+        liabilities = SectionTable(section='liabilities', lines=sections['liabilities'],
+                                   subtotal=liab_subtotal),
+        equity      = SectionTable(section='equity', lines=sections['equity'],
+                                   subtotal=total_le - liab_subtotal),
+        totals      = totals,
+        rounding    = unit,
+    )
+    diagnostics = check_tables(sheet.tables, rounding=unit)       # what assembly will check
+    if diagnostics:
+        raise XbrlExtractionError("; ".join(d.message for d in diagnostics))
+    return sheet
+
+
+# ---------------------------------------------------------------------------
+# 3.  Cover page (dei) share counts
+# ---------------------------------------------------------------------------
+
+SHARES_OUTSTANDING = 'dei:entitycommonstocksharesoutstanding'
+
+
+@dataclass
+class CoverShares:
+    as_of:     dt.date
+    common:    Optional[int]
+    preferred: Optional[int]
+    by_class:  Dict[str, int] = field(default_factory=dict)   # class member -> shares
+    source:    Optional[str] = None
+
+
+def extract_cover_shares(html: bytes | str) -> CoverShares:
+    """
+    Shares outstanding from dei:EntityCommonStockSharesOutstanding on the
+    cover page.  Filers with several classes tag one fact per
+    StatementClassOfStockAxis member; members naming a preferred class
+    count as preferred, everything else as common.  A non-dimensional
+    fact, when present, is taken as the common total.
+    """
+    soup     = bs4.BeautifulSoup(html, 'lxml')
+    contexts = parse_contexts(soup)
+    facts    = [f for f in parse_facts(soup, {SHARES_OUTSTANDING}) if f.context in contexts]
+    if not facts:
+        raise XbrlExtractionError("no dei:EntityCommonStockSharesOutstanding on the cover page")
+
+    def as_of(f: XbrlFact) -> dt.date:
+        c = contexts[f.context]
+        return c.instant or c.end or dt.date.min
+
+    latest = max(as_of(f) for f in facts)
+    facts  = [f for f in facts if as_of(f) == latest]
+
+    total, by_class = None, {}
+    for f in facts:
+        members = contexts[f.context].members
+        if not members:
+            total = int(round(f.value))
+        else:
+            member = next(iter(members.values()))
+            by_class[member] = by_class.get(member, 0) + int(round(f.value))
+
+    preferred = sum(v for k, v in by_class.items() if 'preferred' in k) or None
+    common    = total if total is not None else (
+        sum(v for k, v in by_class.items() if 'preferred' not in k) or None
+    )
+    return CoverShares(as_of=latest, common=common, preferred=preferred, by_class=by_class)
+
+
+def extract_from_filing(ec, doc_urls: List[str]) -> XbrlBalanceSheet:
+    """
+    Tries each .htm document of a filing in index order (the primary
+    document comes first) and returns the first balance sheet that
+    validates.  `ec` is anything with EdgarCacheClient.Get semantics.
+    """
+    errors = []
+    for url in doc_urls:
+        if not url.lower().endswith(('.htm', '.html')):
+            continue
+        content = ec.Get(url).content
+        if not content or b'ix:nonfraction' not in content.lower():
+            continue
+        try:
+            return extract_balance_sheet(content)
+        except XbrlExtractionError as exc:
+            errors.append(f"{url.rsplit('/', 1)[-1]}: {exc}")
+    raise XbrlExtractionError("; ".join(errors) or "no inline-XBRL documents in filing")